@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+
+'''
+Seminumerical exchange (chain-of-spheres, COSX) for HF and hybrid DFT.
+
+The SCF iterations start on coarse grids (grids_level_i).  The grids are
+switched to the fine grids (grids_level_f) when the density matrix is close
+to convergence.
+'''
+
+from pyscf import gto, scf, dft, sgx
+
+mol = gto.M(atom='''
+O    0    0.       0.
+H    0    -0.757   0.587
+H    0    0.757    0.587''',
+            basis = 'ccpvdz')
+
+mf = sgx.sgx_fit(scf.RHF(mol))
+mf.kernel()
+
+#
+# The COSX method of SCF object is the same to sgx.sgx_fit function
+#
+mf = dft.RKS(mol)
+mf.xc = 'b3lyp'
+mf = mf.COSX()
+mf.with_df.grids_level_i = 1
+mf.with_df.grids_level_f = 3
+mf.kernel()
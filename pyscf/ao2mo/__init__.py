@@ -21,7 +21,8 @@ from pyscf.ao2mo import incore
 from pyscf.ao2mo import outcore
 from pyscf.ao2mo import r_outcore
 
-from pyscf.ao2mo.addons import load, restore
+from pyscf.ao2mo.addons import load, restore, load_mo_block
+from pyscf.ao2mo.addons import restore_outcore, LazyERI
 
 def full(eri_or_mol, mo_coeff, *args, **kwargs):
     r'''MO integral transformation. The four indices (ij|kl) are transformed
@@ -41,6 +41,81 @@ class load(object):
             self.feri.close()
 
 
+def load_mo_block(eri, mo_slice, dataname='eri_mo'):
+    r'''Read the orbital sub-block (i0:i1,j0:j1|k0:k1,l0:l1) of the MO
+    integrals which are saved by :func:`ao2mo.outcore.general`.
+
+    The orbital ranges are mapped to the smallest contiguous ranges of the ij
+    and kl pairs which cover them.  The pair block is read with one HDF5
+    hyperslab read, then unpacked in memory.  Only the chunks overlapping
+    with the pair block are loaded from disk.
+
+    Args:
+        eri : str, h5py File/Group or h5py Dataset
+            The HDF5 file which holds the MO integrals
+        mo_slice : 8-item tuple of int
+            (i0, i1, j0, j1, k0, k1, l0, l1)
+
+    Kwargs:
+        dataname : str
+            The dataset name of the MO integrals in the file
+
+    Returns:
+        ndarray of shape (i1-i0,j1-j0,k1-k0,l1-l0) without permutation
+        symmetry.  For the integrals of multiple components, the shape is
+        (comp,i1-i0,j1-j0,k1-k0,l1-l0).
+
+    Examples:
+
+    >>> from pyscf import gto, ao2mo
+    >>> mol = gto.M(atom='O 0 0 0; H 0 1 0; H 0 0 1', basis='ccpvdz')
+    >>> mo = numpy.random.random((mol.nao_nr(), 24))
+    >>> ao2mo.outcore.full(mol, mo, 'full.h5')
+    >>> eri_ovov = ao2mo.load_mo_block('full.h5', (0,5,5,24,0,5,5,24))
+    >>> print(eri_ovov.shape)
+    (5, 19, 5, 19)
+    '''
+    with load(eri, dataname) as h5d:
+        if isinstance(h5d, h5py.Group):
+            h5d = h5d[dataname]
+        if 'mo_shape' not in h5d.attrs:
+            raise KeyError('Orbital index of %s not found.  The MO integrals '
+                           'need to be generated by ao2mo.outcore.general'
+                           % h5d.name)
+        nmoi, nmoj, nmok, nmol = h5d.attrs['mo_shape']
+        ij_tril, kl_tril = h5d.attrs['mo_tril']
+        i0, i1, j0, j1, k0, k1, l0, l1 = mo_slice
+        shape = (i1-i0, j1-j0, k1-k0, l1-l0)
+        if h5d.ndim == 3:
+            shape = (h5d.shape[0],) + shape
+        if numpy.prod(shape) == 0:
+            return numpy.zeros(shape)
+
+        row0, row1, ridx = _pair_block(i0, i1, j0, j1, nmoj, ij_tril)
+        col0, col1, cidx = _pair_block(k0, k1, l0, l1, nmol, kl_tril)
+        if h5d.ndim == 2:
+            blk = numpy.asarray(h5d[row0:row1,col0:col1])
+            out = pyscf.lib.take_2d(blk, ridx, cidx)
+        else:
+            blk = numpy.asarray(h5d[:,row0:row1,col0:col1])
+            out = numpy.asarray([pyscf.lib.take_2d(x, ridx, cidx) for x in blk])
+    return out.reshape(shape)
+
+def _pair_block(p0, p1, q0, q1, nq, tril):
+    '''The contiguous range [start,stop) of the pair indices which covers the
+    orbital block [p0:p1,q0:q1], and the pair indices of the block relative to
+    start'''
+    p = numpy.arange(p0, p1).reshape(-1,1)
+    q = numpy.arange(q0, q1)
+    if tril:
+        idx = numpy.maximum(p, q)
+        idx = idx*(idx+1)//2 + numpy.minimum(p, q)
+    else:
+        idx = p * nq + q
+    idx = idx.ravel()
+    start = idx.min()
+    return start, idx.max()+1, idx-start
+
 def restore(symmetry, eri, norb, tao=None):
     r'''Convert the 2e integrals between different level of permutation symmetry
     (8-fold, 4-fold, or no symmetry)
@@ -135,6 +210,232 @@ def restore(symmetry, eri, norb, tao=None):
 
     return _call_restore(origsym, targetsym, eri, eri1, norb)
 
+class LazyERI(object):
+    '''A lazy view of the 2e integrals which are stored with 8-fold, 4-fold
+    or no permutation symmetry.  The view behaves like a read-only
+    (norb,norb,norb,norb) array.  Only the elements covered by the
+    requested block are read from the storage (HDF5 dataset or numpy array).
+
+    Examples:
+
+    >>> from pyscf import ao2mo
+    >>> feri = h5py.File('fcidump.h5', 'r')
+    >>> eri = ao2mo.LazyERI(feri['eri_mo'], 250)
+    >>> eri[:10,:10,3,3].shape
+    (10, 10)
+    >>> eri1 = numpy.asarray(eri[:,:,:5,:5])
+    '''
+    def __init__(self, eri, norb):
+        self.norb = norb
+        self.symmetry = _guess_sym(eri.shape, norb)
+        if isinstance(eri, numpy.ndarray):
+            npair = norb*(norb+1)//2
+            if self.symmetry == '1':
+                eri = eri.reshape(norb,norb,norb,norb)
+            elif self.symmetry == '4':
+                eri = eri.reshape(npair,npair)
+            else:
+                eri = eri.ravel()
+        self.eri = eri
+        self.shape = (norb,) * 4
+        self.ndim = 4
+        self.dtype = eri.dtype
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) > 4:
+            raise IndexError('too many indices for %s' % self.__class__)
+        key = key + (slice(None),) * (4-len(key))
+        orbs = numpy.arange(self.norb)
+        idx = [orbs[k] for k in key]
+        box = []
+        for x in idx:
+            x = numpy.atleast_1d(x)
+            if x.size == 0:
+                box.extend((0, 0))
+            else:
+                box.extend((x.min(), x.max()+1))
+        blk = self.box(*box)
+        sub = numpy.ix_(*[numpy.atleast_1d(x)-box[2*i] for i, x in enumerate(idx)])
+        blk = blk[sub]
+        # Remove the dimensions of the integer indices
+        return blk.reshape([x.size for x in idx if numpy.ndim(x) > 0])
+
+    def __array__(self, dtype=None):
+        return numpy.asarray(self.box(0, self.norb, 0, self.norb,
+                                      0, self.norb, 0, self.norb), dtype=dtype)
+
+    def box(self, i0, i1, j0, j1, k0, k1, l0, l1):
+        '''The block (i0:i1,j0:j1|k0:k1,l0:l1) as a 4D array'''
+        shape = (i1-i0, j1-j0, k1-k0, l1-l0)
+        if numpy.prod(shape) == 0:
+            return numpy.zeros(shape, dtype=self.dtype)
+
+        if self.symmetry == '1':
+            if self.eri.ndim == 4:
+                return numpy.asarray(self.eri[i0:i1,j0:j1,k0:k1,l0:l1])
+            # (norb**2,norb**2) dataset
+            row0, row1, ridx = _pair_block(i0, i1, j0, j1, self.norb, False)
+            col0, col1, cidx = _pair_block(k0, k1, l0, l1, self.norb, False)
+            blk = numpy.asarray(self.eri[row0:row1,col0:col1])
+            blk = pyscf.lib.take_2d(blk, ridx, cidx)
+        else:
+            row0, row1, ridx = _pair_block(i0, i1, j0, j1, None, True)
+            col0, col1, cidx = _pair_block(k0, k1, l0, l1, None, True)
+            blk = self.pair_block(row0, row1, col0, col1)
+            blk = pyscf.lib.take_2d(blk, ridx, cidx)
+        return blk.reshape(shape)
+
+    def pair_block(self, r0, r1, c0, c1):
+        '''The block [r0:r1,c0:c1] of the integrals with 4-fold symmetry'''
+        if r0 >= r1 or c0 >= c1:
+            return numpy.zeros((max(0,r1-r0),max(0,c1-c0)), dtype=self.dtype)
+
+        if self.symmetry == '4':
+            return numpy.asarray(self.eri[r0:r1,c0:c1])
+
+        elif self.symmetry == '8':
+            rows = numpy.arange(r0, r1).reshape(-1,1)
+            cols = numpy.arange(c0, c1)
+            idx = numpy.maximum(rows, cols)
+            idx = idx*(idx+1)//2 + numpy.minimum(rows, cols)
+            return _read_packed(self.eri, idx)
+
+        else:
+            i, j = numpy.tril_indices(self.norb)
+            i0, i1 = i[r0], i[r1-1]+1
+            k0, k1 = i[c0], i[c1-1]+1
+            blk = self.box(i0, i1, 0, i1, k0, k1, 0, k1)
+            return blk[(i[r0:r1]-i0, j[r0:r1])][:,i[c0:c1]-k0,j[c0:c1]]
+
+def _guess_sym(shape, norb):
+    size = numpy.prod(shape)
+    npair = norb*(norb+1)//2
+    if size == norb**4:
+        return '1'
+    elif size == npair**2:
+        return '4'
+    elif size == npair*(npair+1)//2:
+        return '8'
+    else:
+        raise ValueError('eri.shape = %s, norb = %d' % (shape, norb))
+
+# Contiguous runs of the required elements are merged into one read if the
+# gap between them is smaller than READ_GAP
+READ_GAP = 4096
+def _read_packed(h5d, idx):
+    '''Read the elements h5d[idx] of an 1D dataset with contiguous reads'''
+    uidx, inv = numpy.unique(idx.ravel(), return_inverse=True)
+    seg = numpy.append(0, numpy.where(numpy.diff(uidx) > READ_GAP)[0] + 1)
+    seg = numpy.append(seg, uidx.size)
+    buf = numpy.empty(uidx.size, dtype=h5d.dtype)
+    for s0, s1 in zip(seg[:-1], seg[1:]):
+        lo, hi = uidx[s0], uidx[s1-1]+1
+        dat = numpy.asarray(h5d[lo:hi])
+        buf[s0:s1] = dat[uidx[s0:s1]-lo]
+    return buf[inv].reshape(idx.shape)
+
+def restore_outcore(symmetry, eri, norb, erifile, dataname='eri_mo',
+                    max_memory=2000, compression=None):
+    r'''Out-of-core version of :func:`restore`.  The 2e integrals are read
+    and written in tiles of orbital blocks.
+
+    Args:
+        symmetry : int or str
+            The target symmetry, 8, 4 or 1
+        eri : h5py Dataset, ndarray or :class:`LazyERI`
+            The 2e integrals of 8-fold, 4-fold or no symmetry.  The symmetry
+            is determined by the size of eri and norb.
+        norb : int
+        erifile : str or h5py File or h5py Group object
+            To store the converted integrals.  The shape of the dataset is
+
+            | 8 : (norb*(norb+1)/2)*(norb*(norb+1)/2+1)/2
+            | 4 : (norb*(norb+1)/2, norb*(norb+1)/2)
+            | 1 : (norb, norb, norb, norb)
+
+    Kwargs:
+        dataname : str
+            The dataset name in erifile.
+        max_memory : float or int
+            The memory (in MB) to hold the tiles.
+        compression : str
+            HDF5 compression filter ('gzip' or 'lzf') for the dataset.
+
+    Examples:
+
+    >>> with h5py.File('eri.h5', 'r') as f:
+    ...     ao2mo.restore_outcore(1, f['eri_mo'], norb, 'eri_s1.h5')
+    >>> with h5py.File('eri_s1.h5', 'r') as f:
+    ...     eri = ao2mo.LazyERI(f['eri_mo'], norb)
+    ...     print(eri[0,0,:2,:2])
+    '''
+    targetsym = _stand_sym_code(symmetry)
+    if targetsym not in ('8', '4', '1'):
+        raise ValueError('symmetry = %s' % symmetry)
+    if not isinstance(eri, LazyERI):
+        eri = LazyERI(eri, norb)
+
+    npair = norb*(norb+1)//2
+    if targetsym == '1':
+        shape = (norb,norb,norb,norb)
+    elif targetsym == '4':
+        shape = (npair,npair)
+    else:
+        shape = (npair*(npair+1)//2,)
+    if compression is None:
+        kwargs = {}
+    else:
+        kwargs = {'compression': compression, 'shuffle': True}
+
+    if isinstance(erifile, str):
+        feri = h5py.File(erifile, 'a')
+    else:
+        feri = erifile
+    if dataname in feri:
+        del(feri[dataname])
+    out = feri.create_dataset(dataname, shape, eri.dtype, **kwargs)
+
+# The tile of orbitals i0:i1 holds the 4-fold integrals (ij|kl) of i in
+# [i0,i1), j <= i and k <= l < i1.  The other elements are obtained by the
+# permutation symmetry.
+    if targetsym == '1':
+        blk_words = 3 * norb**3
+    else:
+        blk_words = 2 * norb * npair
+    blksize = max(1, int(max_memory*1e6/8 / blk_words))
+    for i0, i1 in pyscf.lib.prange(0, norb, blksize):
+        p0 = i0*(i0+1)//2
+        p1 = i1*(i1+1)//2
+        tile = eri.pair_block(p0, p1, 0, p1)
+
+        if targetsym == '4':
+            out[p0:p1,:p1] = tile
+            if p0 > 0:
+                out[:p0,p0:p1] = tile[:,:p0].T
+
+        elif targetsym == '8':
+            rows = numpy.arange(p0, p1).reshape(-1,1)
+            out[p0*(p0+1)//2:p1*(p1+1)//2] = tile[rows >= numpy.arange(p1)]
+
+        else:
+            tile = pyscf.lib.unpack_tril(tile, filltriu=pyscf.lib.SYMMETRIC)
+            i = numpy.arange(i0, i1).reshape(-1,1)
+            j = numpy.arange(i1)
+            ij = numpy.maximum(i, j)
+            ij = ij*(ij+1)//2 + numpy.minimum(i, j) - p0
+            tile = tile[ij]  # (i1-i0,i1,i1,i1)
+            out[i0:i1,:i1,:i1,:i1] = tile
+            out[:i1,i0:i1,:i1,:i1] = tile.transpose(1,0,2,3)
+            out[:i1,:i1,i0:i1,:i1] = tile.transpose(2,3,0,1)
+            out[:i1,:i1,:i1,i0:i1] = tile.transpose(2,3,1,0)
+        tile = None
+
+    if isinstance(erifile, str):
+        feri.close()
+    return erifile
+
 def _call_restore(origsym, targetsym, eri, eri1, norb, tao=None):
     if numpy.iscomplexobj(eri):
         raise RuntimeError('TODO')
@@ -6,6 +6,7 @@
 import sys
 import numpy
 import ctypes
+from pyscf import lib
 from pyscf.lib import logger
 from pyscf.ao2mo import _ao2mo
 
@@ -48,10 +49,11 @@ def full(eri_ao, mo_coeff, verbose=0, compact=True, **kwargs):
     (100, 100)
 
     '''
-    return general(eri_ao, (mo_coeff,)*4, verbose, compact)
+    return general(eri_ao, (mo_coeff,)*4, verbose, compact, **kwargs)
 
 # It consumes two times of the memory needed by MO integrals
-def general(eri_ao, mo_coeffs, verbose=0, compact=True, **kwargs):
+def general(eri_ao, mo_coeffs, verbose=0, compact=True, ao_pair_tol=None,
+            **kwargs):
     r'''For the given four sets of orbitals, transfer the 8-fold or 4-fold 2e
     AO integrals to MO integrals.
 
@@ -70,6 +72,16 @@ def general(eri_ao, mo_coeffs, verbose=0, compact=True, **kwargs):
             returned MO integrals has (up to 4-fold) permutation symmetry.
             If it's False, the function will abandon any permutation symmetry,
             and return the "plain" MO integrals
+        ao_pair_tol : float
+            If given, the AO pairs |kl) with max_ij |(ij|kl)| < ao_pair_tol
+            are dropped before the first half transformation.  The half
+            transformed integrals are held for the significant AO pairs only.
+            This is the exact size of the integrals, not a Schwarz bound (see
+            :func:`_significant_ao_pairs`).  It costs one pass over eri_ao,
+            which is a python loop over the rows for 8-fold integrals.  Only
+            the first half transformation is screened.  The AO pairs |ij) are
+            not screened, and the second half transformation runs on the full
+            AO-pair layout.
 
     Returns:
         2D array of transformed MO integrals.  The MO integrals may or may not
@@ -116,21 +128,39 @@ def general(eri_ao, mo_coeffs, verbose=0, compact=True, **kwargs):
     assert(eri_ao.size in (nao_pair**2, nao_pair*(nao_pair+1)//2))
 
 # transform e1
-    eri1 = half_e1(eri_ao, mo_coeffs, compact)
+    if ao_pair_tol is None:
+        ao_pairs = None
+    else:
+        ao_pairs = _significant_ao_pairs(eri_ao, nao, ao_pair_tol)
+        log.debug('AO pair screening: %d significant AO pairs out of %d',
+                  len(ao_pairs), nao_pair)
+    eri1 = half_e1(eri_ao, mo_coeffs, compact, ao_pairs)
     klmosym, nkl_pair, mokl, klshape = _conc_mos(mo_coeffs[2], mo_coeffs[3], compact)
 
     if eri1.shape[0] == 0 or nkl_pair == 0:
         # 0 dimension sometimes causes blas problem
-        return numpy.zeros((nij_pair,nkl_pair))
+        return numpy.zeros((eri1.shape[0],nkl_pair))
 
 #    if nij_pair > nkl_pair:
 #        log.warn('low efficiency for AO to MO trans!')
 
 # transform e2
-    eri1 = _ao2mo.nr_e2(eri1, mokl, klshape, aosym='s4', mosym=klmosym)
-    return eri1
+    if ao_pairs is None:
+        eri1 = _ao2mo.nr_e2(eri1, mokl, klshape, aosym='s4', mosym=klmosym)
+        return eri1
 
-def half_e1(eri_ao, mo_coeffs, compact=True):
+    nij_pair = eri1.shape[0]
+    eri_mo = numpy.empty((nij_pair,nkl_pair))
+    buf = numpy.zeros((min(BLOCK,nij_pair),nao_pair))
+    for p0 in range(0, nij_pair, BLOCK):
+        p1 = min(p0+BLOCK, nij_pair)
+        # The columns of the negligible AO pairs are kept zero
+        buf[:p1-p0,ao_pairs] = eri1[p0:p1]
+        _ao2mo.nr_e2(buf[:p1-p0], mokl, klshape, aosym='s4', mosym=klmosym,
+                     out=eri_mo[p0:p1])
+    return eri_mo
+
+def half_e1(eri_ao, mo_coeffs, compact=True, ao_pairs=None):
     r'''Given two set of orbitals, half transform the (ij| pair of 8-fold or
     4-fold AO integrals (ij|kl)
 
@@ -147,11 +177,15 @@ def half_e1(eri_ao, mo_coeffs, compact=True):
             possible permutation symmetry.  If it's False, the function will
             abandon any permutation symmetry, and return the "plain" MO
             integrals
+        ao_pairs : 1D array of int
+            Indices of the AO pairs |kl) (in the lower triangular order) to
+            be transformed.  By default, all AO pairs are transformed.
 
     Returns:
         ndarray of transformed MO integrals.  The MO integrals may or may not
         have the permutation symmetry, depending on the given orbitals, and
-        the kwargs compact.
+        the kwargs compact.  If ao_pairs is given, the returned array has
+        len(ao_pairs) columns.
 
     Examples:
 
@@ -180,8 +214,12 @@ def half_e1(eri_ao, mo_coeffs, compact=True):
     ijshape = (ijshape[0], ijshape[1]-ijshape[0],
                ijshape[2], ijshape[3]-ijshape[2])
 
-    eri1 = numpy.empty((nij_pair,nao_pair))
-    if nij_pair == 0:
+    if ao_pairs is None:
+        ao_pairs = numpy.arange(nao_pair)
+    else:
+        ao_pairs = numpy.asarray(ao_pairs)
+    eri1 = numpy.empty((nij_pair,ao_pairs.size))
+    if nij_pair == 0 or ao_pairs.size == 0:
         return eri1
 
     if eri_ao.size == nao_pair**2: # 4-fold symmetry
@@ -201,8 +239,8 @@ def half_e1(eri_ao, mo_coeffs, compact=True):
     fdrv = getattr(_ao2mo.libao2mo, 'AO2MOnr_e1incore_drv')
 
     bufs = numpy.empty((BLOCK, nij_pair))
-    for blk0 in range(0, nao_pair, BLOCK):
-        blk1 = min(blk0+BLOCK, nao_pair)
+    p1 = 0
+    for blk0, blk1 in _contiguous_blocks(ao_pairs, BLOCK):
         buf = bufs[:blk1-blk0]
         fdrv(ftrans, fmmm,
              buf.ctypes.data_as(ctypes.c_void_p),
@@ -212,9 +250,48 @@ def half_e1(eri_ao, mo_coeffs, compact=True):
              ctypes.c_int(nao),
              ctypes.c_int(ijshape[0]), ctypes.c_int(ijshape[1]),
              ctypes.c_int(ijshape[2]), ctypes.c_int(ijshape[3]))
-        eri1[:,blk0:blk1] = buf.T
+        p0, p1 = p1, p1 + blk1 - blk0
+        eri1[:,p0:p1] = buf.T
     return eri1
 
+def _contiguous_blocks(idx, blksize):
+    '''Split the sorted indices into the ranges [i0,i1) of consecutive
+    indices.  Each range has at most blksize elements.'''
+    if len(idx) == 0:
+        return []
+    seg = numpy.where(numpy.diff(idx) != 1)[0] + 1
+    starts = idx[numpy.append(0, seg)]
+    stops = idx[numpy.append(seg, len(idx))-1] + 1
+    return [(i0, min(i0+blksize, i1))
+            for i, i1 in zip(starts, stops)
+            for i0 in range(i, i1, blksize)]
+
+def _significant_ao_pairs(eri_ao, nao, tol):
+    '''Indices of the AO pairs kl with max_ij |(ij|kl)| >= tol.
+
+    The row maximum is read from the given AO integrals, which takes one
+    pass over eri_ao.  The Schwarz bound sqrt((kl|kl)) * max(sqrt((ij|ij)))
+    cannot be taken from the diagonal of eri_ao.  The 8-fold integrals of
+    mol.intor are screened with the Schwarz conditions sqrt((ij|ij)(kl|kl))
+    of the shell quartets.  A tiny diagonal (kl|kl) of a distant AO pair is
+    dropped there while the (ij|kl) of the compact pairs ij are kept.
+    ao2mo.outcore computes the Schwarz bounds from the integral library
+    instead (see outcore._significant_ao_pairs).
+    '''
+    nao_pair = nao*(nao+1)//2
+    eri_ao = numpy.asarray(eri_ao)
+    if eri_ao.size == nao_pair**2:
+        eri_ao = eri_ao.reshape(nao_pair,nao_pair)
+        rowmax = numpy.empty(nao_pair)
+        for p0 in range(0, nao_pair, BLOCK):
+            p1 = min(p0+BLOCK, nao_pair)
+            rowmax[p0:p1] = abs(eri_ao[p0:p1]).max(axis=1)
+    else:
+        eri_ao = eri_ao.ravel()
+        rowmax = numpy.array([abs(lib.unpack_row(eri_ao, i)).max()
+                              for i in range(nao_pair)])
+    return numpy.where(rowmax >= tol)[0]
+
 def iden_coeffs(mo1, mo2):
     return (id(mo1) == id(mo2) or
             (mo1.shape==mo2.shape and numpy.linalg.norm(mo1-mo2) < 1e-13))
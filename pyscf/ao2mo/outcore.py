@@ -4,6 +4,7 @@
 
 import time
 import tempfile
+import threading
 import numpy
 import h5py
 from pyscf import lib
@@ -16,10 +17,16 @@ from pyscf.ao2mo import incore
 IOBUF_WORDS_PREFER = 1e8 # 800 MB
 IOBLK_SIZE = 256  # MB
 IOBUF_ROW_MIN = 160
+# Number of IO blocks to prefetch or write asynchronously
+PREFETCH_DEPTH = 2
+# Size (in words) of the HDF5 chunks of the MO integrals.  Each chunk holds a
+# block of orbitals i x k, see _orbital_chunks
+CHUNK_WORDS = 2**17
 
 def full(mol, mo_coeff, erifile, dataname='eri_mo', tmpdir=None,
          intor='int2e_sph', aosym='s4', comp=1,
-         max_memory=2000, ioblk_size=IOBLK_SIZE, verbose=logger.WARN, compact=True):
+         max_memory=2000, ioblk_size=IOBLK_SIZE, verbose=logger.WARN, compact=True,
+         schwarz_tol=None, compression=None):
     r'''Transfer arbitrary spherical AO integrals to MO integrals for given orbitals
 
     Args:
@@ -71,6 +78,20 @@ def full(mol, mo_coeff, erifile, dataname='eri_mo', tmpdir=None,
             returned MO integrals has (up to 4-fold) permutation symmetry.
             If it's False, the function will abandon any permutation symmetry,
             and return the "plain" MO integrals
+        schwarz_tol : float
+            If given, the AO pairs whose Schwarz bounds
+            sqrt((kl|kl)) * max(sqrt((ij|ij))) are smaller than schwarz_tol
+            are dropped before the first half transformation.  Only the
+            first half transformation is screened.  Its CPU time and the disk
+            space of the half transformed integrals scale with the number of
+            significant AO pairs.  In the second half transformation the
+            integrals are scattered back to the full AO-pair layout, so its
+            CPU time and memory do not depend on the screening.  The indices
+            of the significant AO pairs are saved in the dataset
+            dataname+'_ao_pairs'.
+        compression : str
+            HDF5 compression filter ('gzip' or 'lzf') for the MO integrals.
+            The shuffle filter is enabled with the compression.
 
     Returns:
         None
@@ -100,12 +121,14 @@ def full(mol, mo_coeff, erifile, dataname='eri_mo', tmpdir=None,
     dataset ['eri_mo', 'new'], shape (3, 100, 55)
     '''
     general(mol, (mo_coeff,)*4, erifile, dataname, tmpdir,
-            intor, aosym, comp, max_memory, ioblk_size, verbose, compact)
+            intor, aosym, comp, max_memory, ioblk_size, verbose, compact,
+            schwarz_tol, compression)
     return erifile
 
 def general(mol, mo_coeffs, erifile, dataname='eri_mo', tmpdir=None,
             intor='int2e_sph', aosym='s4', comp=1,
-            max_memory=2000, ioblk_size=IOBLK_SIZE, verbose=logger.WARN, compact=True):
+            max_memory=2000, ioblk_size=IOBLK_SIZE, verbose=logger.WARN, compact=True,
+            schwarz_tol=None, compression=None):
     r'''For the given four sets of orbitals, transfer arbitrary spherical AO
     integrals to MO integrals on the fly.
 
@@ -159,6 +182,20 @@ def general(mol, mo_coeffs, erifile, dataname='eri_mo', tmpdir=None,
             returned MO integrals has (up to 4-fold) permutation symmetry.
             If it's False, the function will abandon any permutation symmetry,
             and return the "plain" MO integrals
+        schwarz_tol : float
+            If given, the AO pairs whose Schwarz bounds
+            sqrt((kl|kl)) * max(sqrt((ij|ij))) are smaller than schwarz_tol
+            are dropped before the first half transformation.  Only the
+            first half transformation is screened.  Its CPU time and the disk
+            space of the half transformed integrals scale with the number of
+            significant AO pairs.  In the second half transformation the
+            integrals are scattered back to the full AO-pair layout, so its
+            CPU time and memory do not depend on the screening.  The indices
+            of the significant AO pairs are saved in the dataset
+            dataname+'_ao_pairs'.
+        compression : str
+            HDF5 compression filter ('gzip' or 'lzf') for the MO integrals.
+            The shuffle filter is enabled with the compression.
 
     Returns:
         None
@@ -218,8 +255,10 @@ def general(mol, mo_coeffs, erifile, dataname='eri_mo', tmpdir=None,
 
     if (compact and iden_coeffs(mo_coeffs[0], mo_coeffs[1]) and
         aosym in ('s4', 's2ij')):
+        ijmosym = 's2'
         nij_pair = nmoi*(nmoi+1) // 2
     else:
+        ijmosym = 's1'
         nij_pair = nmoi*nmoj
 
     klmosym, nkl_pair, mokl, klshape = \
@@ -234,19 +273,30 @@ def general(mol, mo_coeffs, erifile, dataname='eri_mo', tmpdir=None,
             feri = h5py.File(erifile)
             if dataname in feri:
                 del(feri[dataname])
+            if dataname+'_ao_pairs' in feri:
+                del(feri[dataname+'_ao_pairs'])
         else:
             feri = h5py.File(erifile, 'w')
     else:
         assert(isinstance(erifile, h5py.Group))
         feri = erifile
+    if compression is None:
+        kwargs = {}
+    else:
+        kwargs = {'compression': compression, 'shuffle': True}
+    chunks, blksize = _orbital_chunks(nmoi, nmoj, ijmosym, nmok, nmol, klmosym)
     if comp == 1:
-        chunks = (nmoj,nmol)
         h5d_eri = feri.create_dataset(dataname, (nij_pair,nkl_pair),
-                                      'f8', chunks=chunks)
+                                      'f8', chunks=chunks, **kwargs)
     else:
-        chunks = (1,nmoj,nmol)
+        chunks = (1,) + chunks
         h5d_eri = feri.create_dataset(dataname, (comp,nij_pair,nkl_pair),
-                                      'f8', chunks=chunks)
+                                      'f8', chunks=chunks, **kwargs)
+# The index of the orbital blocks.  ao2mo.load_mo_block reads an orbital
+# sub-block (i0:i1,j0:j1|k0:k1,l0:l1) from the contiguous pair ranges
+    h5d_eri.attrs['mo_shape'] = (nmoi, nmoj, nmok, nmol)
+    h5d_eri.attrs['mo_tril'] = (ijmosym == 's2', klmosym == 's2')
+    h5d_eri.attrs['orb_blksize'] = blksize
 
     if nij_pair == 0 or nkl_pair == 0:
         if isinstance(erifile, str):
@@ -262,32 +312,50 @@ def general(mol, mo_coeffs, erifile, dataname='eri_mo', tmpdir=None,
     swapfile = tempfile.NamedTemporaryFile(dir=tmpdir)
     fswap = h5py.File(swapfile.name, 'w')
     half_e1(mol, mo_coeffs, fswap, intor, aosym, comp, max_memory, ioblk_size,
-            log, compact)
+            log, compact, schwarz_tol=schwarz_tol)
+    if 'ao_pairs' in fswap:
+        ao_pairs = numpy.asarray(fswap['ao_pairs'])
+        feri[dataname+'_ao_pairs'] = ao_pairs
+        nkl_sig = len(ao_pairs)
+    else:
+        ao_pairs = None
+        nkl_sig = nao_pair
 
     time_1pass = log.timer('AO->MO transformation for %s 1 pass'%intor,
                            *time_0pass)
 
-    def load(icomp, row0, row1, buf):
-        if icomp+1 < comp:
-            icomp += 1
-        else:  # move to next row-block
-            row0, row1 = row1, min(nij_pair, row1+iobuflen)
-            icomp = 0
-        if row0 < row1:
-            _load_from_h5g(fswap['%d'%icomp], row0, row1, buf)
+    # The swap file is read PREFETCH_DEPTH blocks ahead of the transformation
+    # and the results are written asynchronously.  The buffers are used in
+    # rotation, see lib.prefetch_iter and lib.call_in_background.  They share
+    # the memory of the four buffers of the synchronous transformation.
+    nbuf = (PREFETCH_DEPTH+2) + (PREFETCH_DEPTH+1)
+    if ao_pairs is not None:
+        nbuf += 1
+    ioblk_size = max(max_memory*.1, ioblk_size) * 4 / nbuf
+    iobuflen = guess_e2bufsize(ioblk_size, nij_pair, max(nao_pair,nkl_pair))[0]
+    bufs = [numpy.empty((iobuflen,nkl_sig)) for i in range(PREFETCH_DEPTH+2)]
+    outbufs = [numpy.empty((iobuflen,nkl_pair)) for i in range(PREFETCH_DEPTH+1)]
+    if ao_pairs is not None:
+        # Only the significant AO pairs are stored in the swap file.  They
+        # are scattered to the full AO-pair buffer before the transformation.
+        # The columns of the negligible AO pairs are kept zero.
+        fullbuf = numpy.zeros((iobuflen,nao_pair))
+
+    def load():
+        istep = 0
+        for row0, row1 in prange(0, nij_pair, iobuflen):
+            for icomp in range(comp):
+                buf = bufs[istep % len(bufs)]
+                _load_from_h5g(fswap['%d'%icomp], row0, row1, buf)
+                yield icomp, row0, row1, buf
+                istep += 1
 
     def save(icomp, row0, row1, buf):
         if comp == 1:
             h5d_eri[row0:row1] = buf[:row1-row0]
         else:
             h5d_eri[icomp,row0:row1] = buf[:row1-row0]
-
-    ioblk_size = max(max_memory*.1, ioblk_size)
-    iobuflen = guess_e2bufsize(ioblk_size, nij_pair, max(nao_pair,nkl_pair))[0]
-    buf = numpy.empty((iobuflen,nao_pair))
-    buf_prefetch = numpy.empty_like(buf)
-    outbuf = numpy.empty((iobuflen,nkl_pair))
-    buf_write = numpy.empty_like(outbuf)
+        logger.count_io(nwritten=buf[:row1-row0].nbytes)
 
     log.debug('step2: kl-pair (ao %d, mo %d), mem %.8g MB, ioblock %.8g MB',
               nao_pair, nkl_pair, iobuflen*nao_pair*8/1e6,
@@ -298,29 +366,25 @@ def general(mol, mo_coeffs, erifile, dataname='eri_mo', tmpdir=None,
     ao_loc = mol.ao_loc_nr('cart' in intor)
     ti0 = time_1pass
     istep = 0
-    with lib.call_in_background(load) as prefetch:
-        with lib.call_in_background(save) as async_write:
-            _load_from_h5g(fswap['0'], 0, min(nij_pair, iobuflen), buf_prefetch)
-
-            for row0, row1 in prange(0, nij_pair, iobuflen):
-                nrow = row1 - row0
-
-                for icomp in range(comp):
-                    istep += 1
-                    log.debug1('step 2 [%d/%d], [%d,%d:%d], row = %d',
-                               istep, ijmoblks, icomp, row0, row1, nrow)
-
-                    buf, buf_prefetch = buf_prefetch, buf
-                    prefetch(icomp, row0, row1, buf_prefetch)
-                    _ao2mo.nr_e2(buf[:nrow], mokl, klshape, aosym, klmosym,
-                                 ao_loc=ao_loc, out=outbuf)
-                    async_write(icomp, row0, row1, outbuf)
-                    outbuf, buf_write = buf_write, outbuf  # avoid flushing writing buffer
-
-                    ti1 = (time.clock(), time.time())
-                    log.debug1('step 2 [%d/%d] CPU time: %9.2f, Wall time: %9.2f',
-                               istep, ijmoblks, ti1[0]-ti0[0], ti1[1]-ti0[1])
-                    ti0 = ti1
+    with lib.call_in_background(save, depth=PREFETCH_DEPTH) as async_write:
+        for icomp, row0, row1, buf in lib.prefetch_iter(load(), PREFETCH_DEPTH):
+            nrow = row1 - row0
+            log.debug1('step 2 [%d/%d], [%d,%d:%d], row = %d',
+                       istep+1, ijmoblks, icomp, row0, row1, nrow)
+
+            outbuf = outbufs[istep % len(outbufs)]
+            if ao_pairs is not None:
+                fullbuf[:nrow,ao_pairs] = buf[:nrow]
+                buf = fullbuf
+            _ao2mo.nr_e2(buf[:nrow], mokl, klshape, aosym, klmosym,
+                         ao_loc=ao_loc, out=outbuf)
+            async_write(icomp, row0, row1, outbuf)
+            istep += 1
+
+            ti1 = (time.clock(), time.time())
+            log.debug1('step 2 [%d/%d] CPU time: %9.2f, Wall time: %9.2f',
+                       istep, ijmoblks, ti1[0]-ti0[0], ti1[1]-ti0[1])
+            ti0 = ti1
     fswap.close()
     if isinstance(erifile, str):
         feri.close()
@@ -334,7 +398,7 @@ def general(mol, mo_coeffs, erifile, dataname='eri_mo', tmpdir=None,
 def half_e1(mol, mo_coeffs, swapfile,
             intor='int2e_sph', aosym='s4', comp=1,
             max_memory=2000, ioblk_size=IOBLK_SIZE, verbose=logger.WARN, compact=True,
-            ao2mopt=None):
+            ao2mopt=None, schwarz_tol=None):
     r'''Half transform arbitrary spherical AO integrals to MO integrals
     for the given two sets of orbitals
 
@@ -381,6 +445,12 @@ def half_e1(mol, mo_coeffs, swapfile,
             and return the "plain" MO integrals
         ao2mopt : :class:`AO2MOpt` object
             Precomputed data to improve perfomance
+        schwarz_tol : float
+            If given, the AO pairs |kl) whose Schwarz bounds
+            sqrt((kl|kl)) * max(sqrt((ij|ij))) are smaller than schwarz_tol
+            are not transformed.  Only the significant AO pairs are saved in
+            the swapfile and their indices are saved in the dataset
+            'ao_pairs'.
 
     Returns:
         None
@@ -406,8 +476,14 @@ def half_e1(mol, mo_coeffs, swapfile,
     e1buflen, mem_words, iobuf_words, ioblk_words = \
             guess_e1bufsize(max_memory, ioblk_size, nij_pair, nao_pair, comp)
     ioblk_size = ioblk_words * 8/1e6
+# The AO integrals are evaluated in a background thread while the previous
+# block is transformed.  PREFETCH_DEPTH+2 AO buffers are used in rotation.
+    if PREFETCH_DEPTH > 0:
+        naobuf = PREFETCH_DEPTH + 2
+    else:
+        naobuf = 1
 # The buffer to hold AO integrals in C code, see line (@)
-    aobuflen = max(int((mem_words - 2*comp*e1buflen*nij_pair) // (nao_pair*comp)),
+    aobuflen = max(int((mem_words - 2*comp*e1buflen*nij_pair) // (nao_pair*comp*naobuf)),
                    IOBUF_ROW_MIN)
     shranges = guess_shell_ranges(mol, (aosym in ('s4', 's2kl')), e1buflen, aobuflen)
     if ao2mopt is None:
@@ -424,7 +500,31 @@ def half_e1(mol, mo_coeffs, swapfile,
     for icomp in range(comp):
         g = fswap.create_group(str(icomp)) # for h5py old version
 
-    log.debug('step1: tmpfile %s  %.8g MB', fswap.filename, nij_pair*nao_pair*8/1e6)
+# The AO pairs |kl) of each micro step which survive the Schwarz screening
+    if schwarz_tol is None:
+        sels = [[None] * len(sh_range[3]) for sh_range in shranges]
+        nkl_sig = sum(x[2] for x in shranges)
+    else:
+        mask = _significant_ao_pairs(mol, intor, aosym, schwarz_tol)
+        ao_pairs = numpy.where(mask)[0]
+        fswap['ao_pairs'] = ao_pairs
+        nkl_sig = len(ao_pairs)
+        log.debug('step1: Schwarz screening, %d significant AO pairs out of %d',
+                  nkl_sig, mask.size)
+        sels = []
+        row0 = 0
+        for sh_range in shranges:
+            sels.append([])
+            for aoshs in sh_range[3]:
+                sels[-1].append(numpy.where(mask[row0:row0+aoshs[2]])[0])
+                row0 += aoshs[2]
+    def count_rows(aoshs, sel):
+        if sel is None:
+            return aoshs[2]
+        else:
+            return sel.size
+
+    log.debug('step1: tmpfile %s  %.8g MB', fswap.filename, nij_pair*nkl_sig*8/1e6)
     log.debug('step1: (ij,kl) = (%d,%d), mem cache %.8g MB, iobuf %.8g MB',
               nij_pair, nao_pair, mem_words*8/1e6, iobuf_words*8/1e6)
     nstep = len(shranges)
@@ -436,38 +536,138 @@ def half_e1(mol, mo_coeffs, swapfile,
             _transpose_to_h5g(fswap, '%d/%d'%(icomp,istep), iobuf[icomp],
                               e2buflen, None)
 
+    fill = _ao2mo.nr_e1fill
+    f_e1 = _ao2mo.nr_e1
+    aobuflen = max([x[2] for sh_range in shranges for x in sh_range[3]])
+    aobufs = [numpy.empty((comp*aobuflen,nao_pair)) for i in range(naobuf)]
+# nr_e1fill in the prefetch thread and nr_e1 in the main thread both run
+# OpenMP regions.  The two stages split the OpenMP threads so that no more
+# than OMP_NUM_THREADS threads are active.  The thread count is a per-thread
+# setting of OpenMP.
+    nthreads = lib.num_threads()
+    nthreads_fill = (nthreads + 1) // 2
+    nthreads_e1 = max(1, nthreads - nthreads_fill)
+    caller = threading.current_thread()
+    in_background = []
+    def gen_ao_ints():
+        if threading.current_thread() is not caller:
+            in_background.append(True)
+            _set_num_threads(nthreads_fill)
+        k = 0
+        for sh_range, sh_sels in zip(shranges, sels):
+            for aoshs, sel in zip(sh_range[3], sh_sels):
+                nrow = count_rows(aoshs, sel)
+                if nrow == 0:  # All AO pairs are negligible
+                    yield None
+                    continue
+                buf = fill(intor, aoshs, mol._atm, mol._bas, mol._env, aosym,
+                           comp, ao2mopt, out=aobufs[k%naobuf])  # (@)
+                k += 1
+                if nrow < aoshs[2]:
+                    buf = buf.reshape(comp,aoshs[2],nao_pair)[:,sel]
+                yield buf.reshape(-1,nao_pair)
+
     # transform e1
     ti0 = log.timer('Initializing ao2mo.outcore.half_e1', *time0)
-    with lib.call_in_background(save) as async_write:
-        buf1 = numpy.empty((comp*e1buflen,nao_pair))
-        buf2 = numpy.empty((comp*e1buflen,nij_pair))
-        buf_write = numpy.empty_like(buf2)
-        fill = _ao2mo.nr_e1fill
-        f_e1 = _ao2mo.nr_e1
-        for istep,sh_range in enumerate(shranges):
-            log.debug1('step 1 [%d/%d], AO [%d:%d], len(buf) = %d', \
-                       istep+1, nstep, *(sh_range[:3]))
-            buflen = sh_range[2]
-            iobuf = numpy.ndarray((comp,buflen,nij_pair), buffer=buf2)
-            nmic = len(sh_range[3])
-            p1 = 0
-            for imic, aoshs in enumerate(sh_range[3]):
-                log.debug2('      fill iobuf micro [%d/%d], AO [%d:%d], len(aobuf) = %d',
-                           imic+1, nmic, *aoshs)
-                buf = fill(intor, aoshs, mol._atm, mol._bas, mol._env,
-                           aosym, comp, ao2mopt, out=buf1).reshape(-1,nao_pair)
-                buf = f_e1(buf, moij, ijshape, aosym, ijmosym)
-                p0, p1 = p1, p1 + aoshs[2]
-                iobuf[:,p0:p1] = buf.reshape(comp,aoshs[2],nij_pair)
-            ti0 = log.timer_debug1('gen AO/transform MO [%d/%d]'%(istep+1,nstep), *ti0)
-
-            async_write(istep, iobuf)
-            buf2, buf_write = buf_write, buf2
+    ao_ints = lib.prefetch_iter(gen_ao_ints(), PREFETCH_DEPTH)
+    nthreads_bak = None
+    try:
+        with lib.call_in_background(save) as async_write:
+            buf2 = numpy.empty((comp*e1buflen,nij_pair))
+            buf_write = numpy.empty_like(buf2)
+            for istep,sh_range in enumerate(shranges):
+                log.debug1('step 1 [%d/%d], AO [%d:%d], len(buf) = %d', \
+                           istep+1, nstep, *(sh_range[:3]))
+                buflen = sum(count_rows(*x) for x in zip(sh_range[3], sels[istep]))
+                iobuf = numpy.ndarray((comp,buflen,nij_pair), buffer=buf2)
+                nmic = len(sh_range[3])
+                p1 = 0
+                for imic, aoshs in enumerate(sh_range[3]):
+                    log.debug2('      fill iobuf micro [%d/%d], AO [%d:%d], len(aobuf) = %d',
+                               imic+1, nmic, *aoshs)
+                    buf = next(ao_ints)
+                    if in_background and nthreads_bak is None:
+                        nthreads_bak = _set_num_threads(nthreads_e1)
+                    nrow = count_rows(aoshs, sels[istep][imic])
+                    if nrow == 0:
+                        continue
+                    buf = f_e1(buf, moij, ijshape, aosym, ijmosym)
+                    p0, p1 = p1, p1 + nrow
+                    iobuf[:,p0:p1] = buf.reshape(comp,nrow,nij_pair)
+                ti0 = log.timer_debug1('gen AO/transform MO [%d/%d]'%(istep+1,nstep), *ti0)
+
+                async_write(istep, iobuf)
+                buf2, buf_write = buf_write, buf2
+    finally:
+        ao_ints.close()
+        if nthreads_bak is not None:
+            _set_num_threads(nthreads_bak)
 
     if isinstance(swapfile, str):
         fswap.close()
     return swapfile
 
+def _set_num_threads(nthreads):
+    '''Set the number of OpenMP threads of the calling thread and return the
+    previous number'''
+    try:
+        nthreads_bak = _ao2mo.libao2mo.omp_get_max_threads()
+        _ao2mo.libao2mo.omp_set_num_threads(nthreads)
+    except AttributeError:  # library compiled without OpenMP
+        nthreads_bak = nthreads
+    return nthreads_bak
+
+def _orbital_chunks(nmoi, nmoj, ijmosym, nmok, nmol, klmosym,
+                    chunk_words=CHUNK_WORDS):
+    '''HDF5 chunk shape of the (ij|kl) array.  A chunk holds the pairs of bi
+    orbitals i and bk orbitals k.  The chunk rows are aligned to the orbital
+    blocks for the s1 pairs.  For the s2 pairs (i>=j), the rows of the orbital
+    i are counted on average.
+
+    Returns:
+        chunks and (bi, bk)
+    '''
+    if ijmosym == 's2':
+        nrow_i, nij_pair = (nmoi+1)*.5, nmoi*(nmoi+1)//2
+    else:
+        nrow_i, nij_pair = nmoj, nmoi*nmoj
+    if klmosym == 's2':
+        ncol_k, nkl_pair = (nmok+1)*.5, nmok*(nmok+1)//2
+    else:
+        ncol_k, nkl_pair = nmol, nmok*nmol
+    blk = int(numpy.sqrt(float(chunk_words) / max(1, nrow_i*ncol_k)))
+    bi = max(1, min(blk, nmoi))
+    bk = max(1, min(blk, nmok))
+    chunks = (max(1, min(int(numpy.ceil(bi*nrow_i)), nij_pair)),
+              max(1, min(int(numpy.ceil(bk*ncol_k)), nkl_pair)))
+    return chunks, (bi, bk)
+
+def _significant_ao_pairs(mol, intor, aosym, tol):
+    '''Mask of the AO pairs |kl) with sqrt((kl|kl)) * max(sqrt((ij|ij))) >= tol.
+    The AO pairs are ordered in shell-pair blocks, as the rows generated by
+    :func:`guess_shell_ranges`.
+
+    The diagonal integrals are evaluated by the integral library for each
+    shell pair (the table of direct SCF, scf._vhf.get_q_cond).  They are
+    not screened, so |(ij|kl)| <= sqrt((ij|ij)(kl|kl)) holds up to the
+    accuracy of the integrals.
+    '''
+    if intor not in ('int2e_sph', 'int2e_cart'):
+        raise NotImplementedError('Schwarz screening for %s' % intor)
+    from pyscf.scf import _vhf
+    q_cond = _vhf.get_q_cond(mol, intor)
+    ao_loc = mol.ao_loc_nr('cart' in intor)
+    dims = ao_loc[1:] - ao_loc[:-1]
+    if aosym in ('s4', 's2kl'):
+        ish, jsh = numpy.tril_indices(mol.nbas)
+        dijs = dims[ish] * dims[jsh]
+        dijs[ish==jsh] = dims*(dims+1)//2
+        q = q_cond[ish,jsh]
+    else:
+        dijs = (dims.reshape(-1,1) * dims).ravel()
+        q = q_cond.ravel()
+    return numpy.repeat(q * q_cond.max() >= tol, dijs)
+
 def _load_from_h5g(h5group, row0, row1, out):
     nrow = row1 - row0
     col0 = 0
@@ -476,6 +676,7 @@ def _load_from_h5g(h5group, row0, row1, out):
         col1 = col0 + dat.shape[1]
         out[:nrow,col0:col1] = dat
         col0 = col1
+    logger.count_io(nread=nrow*col0*out.itemsize)
     return out
 
 def _transpose_to_h5g(h5group, key, dat, blksize, chunks=None):
@@ -483,9 +684,11 @@ def _transpose_to_h5g(h5group, key, dat, blksize, chunks=None):
     dset = h5group.create_dataset(key, (ncol,nrow), 'f8', chunks=chunks)
     for col0, col1 in prange(0, ncol, blksize):
         dset[col0:col1] = lib.transpose(dat[:,col0:col1])
+    logger.count_io(nwritten=dat.nbytes)
 
 def full_iofree(mol, mo_coeff, intor='int2e_sph', aosym='s4', comp=1,
-                max_memory=2000, ioblk_size=IOBLK_SIZE, verbose=logger.WARN, compact=True):
+                max_memory=2000, ioblk_size=IOBLK_SIZE, verbose=logger.WARN, compact=True,
+                schwarz_tol=None):
     r'''Transfer arbitrary spherical AO integrals to MO integrals for given orbitals
     This function is a wrap for :func:`ao2mo.outcore.general`.  It's not really
     IO free.  The returned MO integrals are held in memory.  For backward compatibility,
@@ -542,6 +745,9 @@ def full_iofree(mol, mo_coeff, intor='int2e_sph', aosym='s4', comp=1,
             returned MO integrals has (up to 4-fold) permutation symmetry.
             If it's False, the function will abandon any permutation symmetry,
             and return the "plain" MO integrals
+        schwarz_tol : float
+            Schwarz screening threshold for the AO pairs, see
+            :func:`ao2mo.outcore.general`
 
     Returns:
         2D/3D MO-integral array.  They may or may not have the permutation
@@ -573,14 +779,15 @@ def full_iofree(mol, mo_coeff, intor='int2e_sph', aosym='s4', comp=1,
         general(mol, (mo_coeff,)*4, feri, dataname='eri_mo',
                 intor=intor, aosym=aosym, comp=comp,
                 max_memory=max_memory, ioblk_size=ioblk_size,
-                verbose=verbose, compact=compact)
+                verbose=verbose, compact=compact, schwarz_tol=schwarz_tol)
         eri = numpy.asarray(feri['eri_mo'])
         for key in feri.keys():
             del(feri[key])
         return eri
 
 def general_iofree(mol, mo_coeffs, intor='int2e_sph', aosym='s4', comp=1,
-                   max_memory=2000, ioblk_size=IOBLK_SIZE, verbose=logger.WARN, compact=True):
+                   max_memory=2000, ioblk_size=IOBLK_SIZE, verbose=logger.WARN, compact=True,
+                   schwarz_tol=None):
     r'''For the given four sets of orbitals, transfer arbitrary spherical AO
     integrals to MO integrals on the fly.  This function is a wrap for
     :func:`ao2mo.outcore.general`.  It's not really IO free.  The returned MO
@@ -619,6 +826,9 @@ def general_iofree(mol, mo_coeffs, intor='int2e_sph', aosym='s4', comp=1,
             returned MO integrals has (up to 4-fold) permutation symmetry.
             If it's False, the function will abandon any permutation symmetry,
             and return the "plain" MO integrals
+        schwarz_tol : float
+            Schwarz screening threshold for the AO pairs, see
+            :func:`ao2mo.outcore.general`
 
     Returns:
         2D/3D MO-integral array.  They may or may not have the permutation
@@ -661,7 +871,7 @@ def general_iofree(mol, mo_coeffs, intor='int2e_sph', aosym='s4', comp=1,
         general(mol, mo_coeffs, feri, dataname='eri_mo',
                 intor=intor, aosym=aosym, comp=comp,
                 max_memory=max_memory, ioblk_size=ioblk_size,
-                verbose=verbose, compact=compact)
+                verbose=verbose, compact=compact, schwarz_tol=schwarz_tol)
         eri = numpy.asarray(feri['eri_mo'])
         for key in feri.keys():
             del(feri[key])
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+import unittest
+import tempfile
+import numpy
+import h5py
+from pyscf import lib
+from pyscf import ao2mo
+
+n = 9
+npair = n*(n+1)//2
+numpy.random.seed(1)
+a8 = numpy.random.random(npair*(npair+1)//2)
+a4 = ao2mo.restore(4, a8, n)
+a1 = ao2mo.restore(1, a8, n)
+ref = {8: a8, 4: a4, 1: a1}
+
+class KnowValues(unittest.TestCase):
+    def setUp(self):
+        self.ftmp = tempfile.NamedTemporaryFile(dir=lib.param.TMPDIR)
+        with h5py.File(self.ftmp.name, 'w') as f:
+            for sym in (8, 4, 1):
+                f['s%d'%sym] = ref[sym]
+            f['s1_2d'] = a1.reshape(n*n,n*n)
+
+    def test_restore_outcore(self):
+        fout = tempfile.NamedTemporaryFile(dir=lib.param.TMPDIR)
+        with h5py.File(self.ftmp.name, 'r') as f:
+            for src in ('s8', 's4', 's1', 's1_2d'):
+                for sym in (8, 4, 1):
+                    ao2mo.restore_outcore(sym, f[src], n, fout.name,
+                                          max_memory=1e-3)
+                    with h5py.File(fout.name, 'r') as fo:
+                        eri = numpy.asarray(fo['eri_mo'])
+                    self.assertEqual(eri.shape, ref[sym].shape)
+                    self.assertAlmostEqual(abs(eri-ref[sym]).max(), 0, 14)
+
+        ao2mo.restore_outcore(1, a4, n, fout.name, compression='gzip')
+        with h5py.File(fout.name, 'r') as fo:
+            self.assertAlmostEqual(abs(fo['eri_mo'][()]-a1).max(), 0, 14)
+
+    def test_lazy_eri(self):
+        with h5py.File(self.ftmp.name, 'r') as f:
+            for src in ('s8', 's4', 's1', 's1_2d'):
+                eri = ao2mo.LazyERI(f[src], n)
+                self.assertEqual(eri.shape, (n,)*4)
+                self.assertAlmostEqual(abs(numpy.asarray(eri)-a1).max(), 0, 14)
+                self.assertAlmostEqual(eri[3,4,5,6], a1[3,4,5,6], 14)
+                self.assertAlmostEqual(abs(eri[2:5,1,::2,[0,3,8]] -
+                                           a1[2:5,1,::2][:,:,[0,3,8]]).max(), 0, 14)
+                self.assertEqual(eri[-1,:0].shape, (0,n,n))
+                self.assertAlmostEqual(abs(eri.pair_block(3,20,5,40) -
+                                           a4[3:20,5:40]).max(), 0, 14)
+        eri = ao2mo.LazyERI(a8, n)
+        self.assertAlmostEqual(abs(eri[:,:,1,2]-a1[:,:,1,2]).max(), 0, 14)
+        self.assertRaises(ValueError, ao2mo.LazyERI, a8[:-1], n)
+
+
+if __name__ == '__main__':
+    print('Full Tests for ao2mo.addons')
+    unittest.main()
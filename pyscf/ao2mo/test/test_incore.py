@@ -44,6 +44,26 @@ class KnowValues(unittest.TestCase):
         eri1 = eri1.reshape(2,2,3,3)
         self.assertTrue(numpy.allclose(eri1, eriref[:2,1:3,:3,2:5]))
 
+    def test_ao_pair_screening(self):
+        mol1 = gto.M(atom=[['H', (0, 0, i*2.5)] for i in range(8)],
+                     basis='6-31g', verbose=0)
+        nao1 = mol1.nao_nr()
+        numpy.random.seed(2)
+        mo1 = numpy.random.random((nao1,6)) - .5
+        mo2 = numpy.random.random((nao1,4)) - .5
+        eri = mol1.intor('int2e_sph', aosym='s8')
+        ao_pairs = ao2mo.incore._significant_ao_pairs(eri, nao1, 1e-12)
+        self.assertTrue(ao_pairs.size < nao1*(nao1+1)//2 * .8)
+        for eri_ao in (eri, ao2mo.restore(4, eri, nao1)):
+            eriref = ao2mo.incore.general(eri_ao, (mo1,mo2,mo1,mo2))
+            eri1 = ao2mo.incore.general(eri_ao, (mo1,mo2,mo1,mo2),
+                                        ao_pair_tol=1e-12)
+            self.assertAlmostEqual(abs(eri1-eriref).max(), 0, 11)
+
+        eri1 = ao2mo.incore.half_e1(eri, (mo1,mo2), ao_pairs=ao_pairs)
+        eriref = ao2mo.incore.half_e1(eri, (mo1,mo2))
+        self.assertAlmostEqual(abs(eri1-eriref[:,ao_pairs]).max(), 0, 12)
+
 
 if __name__ == '__main__':
     print('Full Tests for incore')
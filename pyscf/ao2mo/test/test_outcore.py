@@ -116,6 +116,86 @@ class KnowValues(unittest.TestCase):
         eri1 = eri1.reshape(nao,nao,nao,nao)
         self.assertTrue(numpy.allclose(eri1, eriref))
 
+    def test_pipeline(self):
+        ftmp = tempfile.NamedTemporaryFile(dir=lib.param.TMPDIR)
+        erifile = ftmp.name
+        eriref = ao2mo.incore.full(mol.intor('int2e_sph', aosym='s8'), mo)
+        depth = ao2mo.outcore.PREFETCH_DEPTH
+        try:
+            for ao2mo.outcore.PREFETCH_DEPTH in (0, 1, 3):
+                ao2mo.outcore.full(mol, mo, erifile, dataname='eri_mo',
+                                   max_memory=.5, ioblk_size=.2)
+                with h5py.File(erifile, 'r') as feri:
+                    eri1 = numpy.array(feri['eri_mo'])
+                self.assertAlmostEqual(abs(eri1-eriref).max(), 0, 9)
+        finally:
+            ao2mo.outcore.PREFETCH_DEPTH = depth
+
+    def test_schwarz_screening(self):
+        mol1 = gto.M(atom=[['H', (0, 0, i*2.5)] for i in range(8)],
+                     basis='6-31g', verbose=0)
+        numpy.random.seed(2)
+        mo1 = numpy.random.random((mol1.nao_nr(),6)) - .5
+        mo2 = numpy.random.random((mol1.nao_nr(),4)) - .5
+        ftmp = tempfile.NamedTemporaryFile(dir=lib.param.TMPDIR)
+        for aosym in ('s4', 's1'):
+            ao2mo.outcore.general(mol1, (mo1,mo1,mo2,mo2), ftmp.name,
+                                  aosym=aosym, max_memory=.5, ioblk_size=.2)
+            ao2mo.outcore.general(mol1, (mo1,mo1,mo2,mo2), ftmp.name, 'screened',
+                                  aosym=aosym, max_memory=.5, ioblk_size=.2,
+                                  schwarz_tol=1e-13)
+            with h5py.File(ftmp.name, 'r') as feri:
+                eriref = numpy.array(feri['eri_mo'])
+                eri1 = numpy.array(feri['screened'])
+                ao_pairs = numpy.array(feri['screened_ao_pairs'])
+            self.assertAlmostEqual(abs(eri1-eriref).max(), 0, 11)
+        nao_pair = mol1.nao_nr()**2
+        self.assertTrue(ao_pairs.size < nao_pair * .8)
+
+        # The Schwarz bounds of the shell pairs hold for distant pairs too
+        from pyscf.scf import _vhf
+        q_cond = _vhf.get_q_cond(mol1, 'int2e_sph')
+        nao1 = mol1.nao_nr()
+        eri = mol1.intor('int2e_sph', aosym='s1').reshape(nao1**2,nao1,nao1)
+        ao_loc = mol1.ao_loc_nr()
+        for k in range(mol1.nbas):
+            for l in range(mol1.nbas):
+                k0, k1, l0, l1 = ao_loc[k], ao_loc[k+1], ao_loc[l], ao_loc[l+1]
+                emax = abs(eri[:,k0:k1,l0:l1]).max()
+                self.assertTrue(emax < q_cond[k,l] * q_cond.max() + 1e-11)
+
+    def test_load_mo_block(self):
+        numpy.random.seed(3)
+        mo1 = numpy.random.random((nao,8)) - .5
+        mo2 = numpy.random.random((nao,5)) - .5
+        eri = mol.intor('int2e_sph', aosym='s8')
+        ftmp = tempfile.NamedTemporaryFile(dir=lib.param.TMPDIR)
+        mo_slices = [(0,8,0,8,0,5,0,5), (2,7,1,6,1,4,0,3), (5,6,0,8,3,5,2,3)]
+        for compact, compression in ((True, None), (False, 'gzip')):
+            ao2mo.outcore.general(mol, (mo1,mo1,mo2,mo2), ftmp.name,
+                                  compact=compact, compression=compression)
+            eriref = ao2mo.incore.general(eri, (mo1,mo1,mo2,mo2), compact=False)
+            eriref = eriref.reshape(8,8,5,5)
+            with h5py.File(ftmp.name, 'r') as feri:
+                self.assertEqual(tuple(feri['eri_mo'].attrs['mo_shape']), (8,8,5,5))
+                self.assertEqual(feri['eri_mo'].compression, compression)
+                for s in mo_slices:
+                    ref = eriref[s[0]:s[1],s[2]:s[3],s[4]:s[5],s[6]:s[7]]
+                    dat = ao2mo.load_mo_block(feri, s)
+                    self.assertAlmostEqual(abs(dat-ref).max(), 0, 9)
+            dat = ao2mo.load_mo_block(ftmp.name, (4,4,0,8,0,5,0,5))
+            self.assertEqual(dat.shape, (0,8,5,5))
+
+        ao2mo.outcore.general(mol, (mo1,mo2,mo2,mo2), ftmp.name,
+                              intor='int2e_ip1_sph', aosym='s2kl', comp=3)
+        eriref = mol.intor('int2e_ip1_sph', comp=3).reshape(3,nao,nao,nao,nao)
+        eriref = numpy.einsum('xpqrs,pi->xiqrs', eriref, mo1)
+        eriref = numpy.einsum('xiqrs,qj->xijrs', eriref, mo2)
+        eriref = numpy.einsum('xijrs,rk->xijks', eriref, mo2)
+        eriref = numpy.einsum('xijks,sl->xijkl', eriref, mo2)
+        dat = ao2mo.load_mo_block(ftmp.name, (1,6,2,4,0,5,3,5))
+        self.assertAlmostEqual(abs(dat-eriref[:,1:6,2:4,:,3:5]).max(), 0, 9)
+
     def test_group_segs(self):
         numpy.random.seed(1)
         segs = numpy.asarray(numpy.random.random(40)*50, dtype=int)
@@ -63,17 +63,42 @@ def kernel(mycc, eris, t1=None, t2=None, max_cycle=50, tol=1e-8, tolnormt=1e-6,
 
 
 def update_amps(mycc, t1, t2, eris):
+    time0 = time.clock(), time.time()
+    buf = contract_amps(mycc, t1, t2, eris)
+    t1new, t2new = finalize_amps(mycc, t1, t2, eris, buf)
+    logger.timer_debug1(mycc, 'update t1 t2', *time0)
+    return t1new, t2new
+
+def contract_amps(mycc, t1, t2, eris, rank=0, nproc=1, out=None):
+    '''The contractions of update_amps, accumulated in one flat buffer which
+    holds t1new, t2new and the intermediates foo, fvv, fov (see
+    :func:`unpack_amps_buf`).  The buffer is written to out if it is given.
+
+    When nproc > 1, the occupied blocks of the contraction loop and the
+    blocks of the vvvv term are distributed round-robin over nproc workers
+    and only the blocks of the given rank are evaluated.  Each worker takes
+    1/nproc of the memory budget.  The buffers of all ranks sum up to the
+    buffer of nproc = 1, which is passed to :func:`finalize_amps`.
+    '''
     time0 = time.clock(), time.time()
     log = logger.Logger(mycc.stdout, mycc.verbose)
     nocc, nvir = t1.shape
     nov = nocc*nvir
     fock = eris.fock
 
-    t1t2new = numpy.zeros((nov+nov**2))
-    t1new = t1t2new[:nov].reshape(t1.shape)
-    t2new = t1t2new[nov:].reshape(t2.shape)
+    if out is None:
+        buf = numpy.zeros(amps_buf_size(nocc, nvir))
+    else:
+        buf = out
+        buf[:] = 0
+    t1new, t2new, foo, fvv, fov = unpack_amps_buf(buf, nocc, nvir)
     t2new_tril = numpy.zeros((nocc*(nocc+1)//2,nvir,nvir))
-    mycc.add_wvvVV_(t1, t2, eris, t2new_tril)
+    if nproc == 1:
+        mycc.add_wvvVV_(t1, t2, eris, t2new_tril)
+    elif getattr(mycc.add_wvvVV_, '__func__', None) is add_wvvVV_:
+        add_wvvVV_(mycc, t1, t2, eris, t2new_tril, rank=rank, nproc=nproc)
+    elif rank == 0:  # add_wvvVV_ is overloaded and cannot be distributed
+        mycc.add_wvvVV_(t1, t2, eris, t2new_tril)
     idxo = numpy.tril_indices(nocc)
     lib.takebak_2d(t2new.reshape(nocc**2,nvir**2), t2new_tril.reshape(-1,nvir**2),
                    idxo[0]*nocc+idxo[1], numpy.arange(nvir**2))
@@ -83,14 +108,14 @@ def update_amps(mycc, t1, t2, eris):
     time1 = log.timer_debug1('vvvv', *time0)
 
 #** make_inter_F
-    fov = fock[:nocc,nocc:].copy()
+    fov[:] = fock[:nocc,nocc:]
     t1new += fov
 
-    foo = fock[:nocc,:nocc].copy()
+    foo[:] = fock[:nocc,:nocc]
     foo[range(nocc),range(nocc)] = 0
     foo += .5 * numpy.einsum('ia,ja->ij', fock[:nocc,nocc:], t1)
 
-    fvv = fock[nocc:,nocc:].copy()
+    fvv[:] = fock[nocc:,nocc:]
     fvv[range(nvir),range(nvir)] = 0
     fvv -= .5 * numpy.einsum('ia,ib->ab', t1, fock[:nocc,nocc:])
 
@@ -103,11 +128,18 @@ def update_amps(mycc, t1, t2, eris):
     woooo += _cp(eris.oooo).reshape(nocc**2,nocc**2)
     woooo = _cp(woooo.reshape(nocc,nocc,nocc,nocc).transpose(0,2,1,3))
     eris_ooov = None
+    if rank > 0:  # the terms above are counted once, on rank 0
+        t1new[:] = 0
+        foo[:] = 0
+        fvv[:] = 0
     time1 = log.timer_debug1('woooo', *time1)
 
     unit = _memory_usage_inloop(nocc, nvir)
-    max_memory = max(2000, mycc.max_memory - lib.current_memory()[0])
+    max_memory = max(2000, mycc.max_memory - lib.current_memory()[0]) / nproc
     blksize = min(nocc, max(BLKMIN, int(max_memory/unit)))
+    if nproc > 1:
+        blksize = min(blksize, (nocc+nproc-1)//nproc)
+    tasks = list(prange(0, nocc, blksize))[rank::nproc]
     blknvir = int((max_memory*.9e6/8-blksize*nocc*nvir**2*6)/(blksize*nvir**2*2))
     blknvir = min(nvir, max(BLKMIN, blknvir))
     log.debug1('max_memory %d MB,  nocc,nvir = %d,%d  blksize = %d,%d',
@@ -124,7 +156,7 @@ def update_amps(mycc, t1, t2, eris):
     buflen = max(nocc*nvir**2, nocc**3)
     bufs = numpy.empty((5,blksize*buflen))
     buf1, buf2, buf3, buf4, buf5 = bufs
-    for p0, p1 in prange(0, nocc, blksize):
+    for p0, p1 in tasks:
     #: wOoVv += numpy.einsum('iabc,jc->ijab', eris.ovvv, t1)
     #: wOoVv -= numpy.einsum('jbik,ka->jiba', eris.ovoo, t1)
         wOoVv = numpy.ndarray((nocc,p1-p0,nvir,nvir), buffer=buf3)
@@ -334,10 +366,24 @@ def update_amps(mycc, t1, t2, eris):
                 t2new[j0+i] += tmp[i].transpose(1,0,2) * .5
         woVoV = t2ibja = tmp = None
         time1 = log.timer_debug1('contract occ [%d:%d]'%(p0, p1), *time1)
-    buf1 = buf2 = buf3 = buf4 = buf5 = bufs = None
-    time1 = log.timer_debug1('contract loop', *time0)
+    buf1 = buf2 = buf3 = buf4 = buf5 = bufs = woooo = None
+    if nproc > 1:
+        # fov rows of the blocks of other ranks are kept by their owners
+        mask = numpy.ones(nocc, dtype=bool)
+        for p0, p1 in tasks:
+            mask[p0:p1] = False
+        fov[mask] = 0
+    log.timer_debug1('contract loop', *time0)
+    return buf
+
+def finalize_amps(mycc, t1, t2, eris, buf):
+    '''Complete the amplitudes update from the (reduced) buffer of
+    :func:`contract_amps`.  The returned t1new and t2new are views of buf.
+    '''
+    nocc, nvir = t1.shape
+    fock = eris.fock
+    t1new, t2new, foo, fvv, fov = unpack_amps_buf(buf, nocc, nvir)
 
-    woooo = None
     ft_ij = foo + numpy.einsum('ja,ia->ij', .5*t1, fov)
     ft_ab = fvv - numpy.einsum('ia,ib->ab', .5*t1, fov)
     #: t2new += numpy.einsum('ijac,bc->ijab', t2, ft_ab)
@@ -360,12 +406,34 @@ def update_amps(mycc, t1, t2, eris):
             t2new[:i,i] = t2new[i,:i].transpose(0,2,1)
         t2new[i,i] = t2new[i,i] + t2new[i,i].T
         t2new[i,i] /= lib.direct_sum('a,b->ab', eia[i], eia[i])
-
-    time0 = log.timer_debug1('update t1 t2', *time0)
     return t1new, t2new
 
+def amps_buf_size(nocc, nvir):
+    nov = nocc * nvir
+    return nov*2 + nov**2 + nocc**2 + nvir**2
 
-def add_wvvVV_(mycc, t1, t2, eris, t2new_tril, with_ovvv=True):
+def unpack_amps_buf(buf, nocc, nvir):
+    '''Views t1new, t2new, foo, fvv, fov of the buffer of contract_amps'''
+    nov = nocc * nvir
+    p0, p1 = 0, nov
+    t1new = buf[p0:p1].reshape(nocc,nvir)
+    p0, p1 = p1, p1 + nov**2
+    t2new = buf[p0:p1].reshape(nocc,nocc,nvir,nvir)
+    p0, p1 = p1, p1 + nocc**2
+    foo = buf[p0:p1].reshape(nocc,nocc)
+    p0, p1 = p1, p1 + nvir**2
+    fvv = buf[p0:p1].reshape(nvir,nvir)
+    p0, p1 = p1, p1 + nov
+    fov = buf[p0:p1].reshape(nocc,nvir)
+    return t1new, t2new, foo, fvv, fov
+
+
+def add_wvvVV_(mycc, t1, t2, eris, t2new_tril, with_ovvv=True, rank=0, nproc=1):
+    '''Add the vvvv contribution to t2new_tril.  When nproc > 1, the blocks
+    of virtual orbitals (or AO shells for AO-direct CCSD) are distributed
+    round-robin over nproc workers and only the blocks of the given rank are
+    added.  Each worker takes 1/nproc of the memory budget.
+    '''
     time0 = time.clock(), time.time()
     nocc, nvir = t1.shape
 
@@ -424,7 +492,7 @@ def add_wvvVV_(mycc, t1, t2, eris, t2new_tril, with_ovvv=True):
                                  'CVHFsetnr_direct_scf')
         outbuf[:] = 0
         ao_loc = mol.ao_loc_nr()
-        max_memory = max(0, mycc.max_memory - lib.current_memory()[0])
+        max_memory = max(0, mycc.max_memory - lib.current_memory()[0]) / nproc
         dmax = max(4, numpy.sqrt(max_memory*.95e6/8/nao**2/2))
         sh_ranges = ao2mo.outcore.balance_partition(ao_loc, dmax)
         dmax = max(x[2] for x in sh_ranges)
@@ -432,8 +500,12 @@ def add_wvvVV_(mycc, t1, t2, eris, t2new_tril, with_ovvv=True):
         loadbuf = numpy.empty((dmax,dmax,nao,nao))
         fint = gto.moleintor.getints4c
 
+        itask = -1
         for ip, (ish0, ish1, ni) in enumerate(sh_ranges):
             for jsh0, jsh1, nj in sh_ranges[:ip]:
+                itask += 1
+                if itask % nproc != rank:
+                    continue
                 eri = fint(intor, mol._atm, mol._bas, mol._env,
                            shls_slice=(ish0,ish1,jsh0,jsh1), aosym='s2kl',
                            ao_loc=ao_loc, cintopt=ao2mopt._cintopt, out=eribuf)
@@ -447,6 +519,9 @@ def add_wvvVV_(mycc, t1, t2, eris, t2new_tril, with_ovvv=True):
                 contract_rec_(outbuf, tau, tmp, i0, i1, j0, j1)
                 time0 = logger.timer_debug1(mycc, 'AO-vvvv [%d:%d,%d:%d]' %
                                             (ish0,ish1,jsh0,jsh1), *time0)
+            itask += 1
+            if itask % nproc != rank:
+                continue
             eri = fint(intor, mol._atm, mol._bas, mol._env,
                        shls_slice=(ish0,ish1,ish0,ish1), aosym='s4',
                        ao_loc=ao_loc, cintopt=ao2mopt._cintopt, out=eribuf)
@@ -485,18 +560,21 @@ def add_wvvVV_(mycc, t1, t2, eris, t2new_tril, with_ovvv=True):
             tau[p0:p0+i+1] += t2[i,:i+1]
             p0 += i + 1
         time0 = logger.timer_debug1(mycc, 'vvvv-tau', *time0)
-        max_memory = max(2000, mycc.max_memory - lib.current_memory()[0])
+        max_memory = max(2000, mycc.max_memory - lib.current_memory()[0]) / nproc
         blksize = int(max(4, max_memory*.95e6/8/(nvir**3*2)))
+        if nproc > 1:
+            blksize = min(blksize, max(1, nvir//(nproc*2)))
 
         def block_contract(buf, a0, a1):
             for a in range(a0, a1):
                 contract_tril_(t2new_tril, tau, buf[a-a0], 0, a)
 
         with lib.call_in_background(block_contract) as bcontract:
-            p0 = 0
             outbuf = numpy.empty((blksize,nvir,nvir,nvir))
             outbuf1 = numpy.empty_like(outbuf)
-            for a0, a1 in lib.prange(0, nvir, blksize):
+            tasks = list(lib.prange(0, nvir, blksize))[rank::nproc]
+            for a0, a1 in tasks:
+                p0 = a0*(a0+1)//2
                 for a in range(a0, a1):
                     lib.unpack_tril(eris.vvvv[p0:p0+a+1], out=outbuf[a-a0])
                     p0 += a+1
@@ -589,10 +667,10 @@ def as_scanner(cc):
         def __init__(self, cc):
             self.__dict__.update(cc.__dict__)
             self._scf = cc._scf.as_scanner()
-        def __call__(self, mol):
+        def __call__(self, mol_or_geom):
             mf_scanner = self._scf
-            mf_scanner(mol)
-            self.mol = mol
+            mf_scanner(mol_or_geom)
+            self.mol = mf_scanner.mol
             self.mo_coeff = mf_scanner.mo_coeff
             self.mo_occ = mf_scanner.mo_occ
             self.kernel(self.t1, self.t2)[0]
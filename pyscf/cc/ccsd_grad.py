@@ -428,10 +428,10 @@ def as_scanner(cc):
     logger.info(cc, 'Set nuclear gradients of %s as a scanner', cc.__class__)
     cc = copy.copy(cc)
     cc._scf = cc._scf.as_scanner()
-    def solver(mol):
+    def solver(mol_or_geom):
         mf_scanner = cc._scf
-        mf_scanner(mol)
-        cc.mol = mol
+        mf_scanner(mol_or_geom)
+        cc.mol = mf_scanner.mol
         cc.mo_coeff = mf_scanner.mo_coeff
         cc.mo_occ = mf_scanner.mo_occ
         eris = cc.ao2mo(cc.mo_coeff)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+
+'''
+Process-parallel RCCSD
+
+The occupied blocks of the contraction loop of ccsd.update_amps and the
+blocks of the vvvv term are distributed over workers.  The partial
+amplitudes of the workers are summed up (in a fixed order) before the
+amplitudes are divided by the orbital energy denominators, so the parallel
+CCSD reproduces the serial CCSD up to round-off errors.
+
+Two backends are available.  By default, nproc worker processes are forked
+for every update_amps call and the partial amplitudes are collected through
+shared memory.  If an MPI communicator (mpi4py) is given, every MPI rank runs
+the same CCSD.  In both backends every rank sums up only its own block of
+occupied rows of t2new (Reduce_scatter), and the blocks are gathered before
+the amplitudes are finalized.
+
+Every process holds t1, t2 and one buffer of partial amplitudes of the size
+of t2.  max_memory is shared by the processes for the other intermediates.
+
+Examples::
+
+    >>> from pyscf import gto, scf
+    >>> from pyscf.cc import ccsd_par
+    >>> mol = gto.M(atom='O 0 0 0; H 0 -.757 .587; H 0 .757 .587', basis='ccpvdz')
+    >>> mf = scf.RHF(mol).run()
+    >>> ccsd_par.CCSD(mf, nproc=4).run()
+
+    >>> from mpi4py import MPI  # mpirun -np 4 python example.py
+    >>> ccsd_par.CCSD(mf, comm=MPI.COMM_WORLD).run()
+'''
+
+import time
+import copy
+import tempfile
+import multiprocessing
+import numpy
+import h5py
+from pyscf import lib
+from pyscf.lib import logger
+from pyscf.cc import ccsd
+from pyscf.cc import _ccsd
+
+_ERI_KEYS = ('oooo', 'ooov', 'ovoo', 'oovv', 'ovov', 'ovvv', 'vvvv')
+
+
+def update_amps(mycc, t1, t2, eris):
+    if mycc.comm is not None:
+        return _update_amps_mpi(mycc, t1, t2, eris, mycc.comm)
+    elif mycc.nproc > 1:
+        return _update_amps_fork(mycc, t1, t2, eris, mycc.nproc)
+    else:
+        return ccsd.update_amps(mycc, t1, t2, eris)
+
+def _update_amps_fork(mycc, t1, t2, eris, nproc):
+    time0 = time.clock(), time.time()
+    nocc, nvir = t1.shape
+    size = ccsd.amps_buf_size(nocc, nvir)
+    # The partial amplitudes of each process are written to shared memory
+    # directly
+    partials = [numpy.ctypeslib.as_array(multiprocessing.RawArray('d', size))
+                for rank in range(nproc)]
+
+    if hasattr(multiprocessing, 'get_context'):
+        ctx = multiprocessing.get_context('fork')
+    else:
+        ctx = multiprocessing
+    # The parent keeps reading the integrals through its own HDF5 files
+    erifile = _share_eris(eris)
+    # Every process runs the OpenMP threaded C kernels
+    nthreads = max(1, lib.num_threads() // nproc)
+    nthreads_bak = _set_num_threads(nthreads)
+    workers = []
+    try:
+        for rank in range(1, nproc):
+            p = ctx.Process(target=_fork_worker,
+                            args=(mycc, t1, t2, eris, erifile, rank, nproc,
+                                  nthreads, partials[rank]))
+            p.start()
+            workers.append(p)
+        ccsd.contract_amps(mycc, t1, t2, eris, 0, nproc, out=partials[0])
+    finally:
+        for p in workers:
+            p.join()
+        _set_num_threads(nthreads_bak)
+    _check_workers(workers)
+
+    # Each process sums up its own segment of the buffers into partials[0]
+    locs = _buf_segments(nocc, nvir, nproc)
+    workers = []
+    try:
+        for rank in range(1, nproc):
+            p = ctx.Process(target=_reduce_segment,
+                            args=(partials, locs[rank], locs[rank+1]))
+            p.start()
+            workers.append(p)
+        _reduce_segment(partials, locs[0], locs[1])
+    finally:
+        for p in workers:
+            p.join()
+    _check_workers(workers)
+    buf = partials[0]
+    partials = None
+
+    t1new, t2new = ccsd.finalize_amps(mycc, t1, t2, eris, buf)
+    logger.timer_debug1(mycc, 'update t1 t2 (%d processes)' % nproc, *time0)
+    return t1new, t2new
+
+def _check_workers(workers):
+    for rank, p in enumerate(workers):
+        if p.exitcode != 0:
+            raise RuntimeError('CCSD worker %d exited with code %s' %
+                               (rank+1, p.exitcode))
+
+def _buf_segments(nocc, nvir, nproc):
+    '''Boundaries of the segments of the ccsd.contract_amps buffer which are
+    reduced by the ranks.  Rank r owns the occupied rows
+    [nocc*r//nproc:nocc*(r+1)//nproc] of t2new.  The first rank also owns
+    t1new and the last rank owns foo, fvv and fov.
+    '''
+    nov = nocc * nvir
+    locs = [nov + nocc*r//nproc * nov*nvir for r in range(nproc+1)]
+    locs[0] = 0
+    locs[-1] = ccsd.amps_buf_size(nocc, nvir)
+    return locs
+
+def _reduce_segment(partials, p0, p1):
+    # The buffers are summed up in a fixed order
+    out = partials[0][p0:p1]
+    for buf in partials[1:]:
+        out += buf[p0:p1]
+
+def _fork_worker(mycc, t1, t2, eris, erifile, rank, nproc, nthreads, out):
+    # The output of the forked copies would interleave with the parent's
+    mycc.verbose = logger.QUIET
+    _set_num_threads(nthreads)
+    if erifile is None:
+        ccsd.contract_amps(mycc, t1, t2, eris, rank, nproc, out=out)
+    else:
+        with h5py.File(erifile, 'r') as f:
+            eris = copy.copy(eris)
+            for key in f:
+                setattr(eris, key, f[key])
+            ccsd.contract_amps(mycc, t1, t2, eris, rank, nproc, out=out)
+
+def _set_num_threads(nthreads):
+    '''Set the number of OpenMP threads and return the previous number'''
+    try:
+        nthreads_bak = _ccsd.libcc.omp_get_max_threads()
+        _ccsd.libcc.omp_set_num_threads(nthreads)
+    except AttributeError:  # library compiled without OpenMP
+        nthreads_bak = nthreads
+    return nthreads_bak
+
+def _share_eris(eris):
+    '''Copy the out-of-core integrals to a named file which the forked
+    workers open read-only, so that every worker reads through its own file
+    handle.  The copy is made once for eris and removed with eris.  Returns
+    the name of the file, or None if all integrals are held in memory.
+
+    The workers cannot reopen the HDF5 files of the parent.  The temporary
+    files are unlinked, and HDF5 would reuse the open file (and its file
+    offset) that the workers inherit from the parent.
+    '''
+    datasets = [key for key in _ERI_KEYS
+                if isinstance(getattr(eris, key, None), h5py.Dataset)]
+    if not datasets:
+        return None
+    erifile = getattr(eris, '_worker_erifile', None)
+    if erifile is None:
+        erifile = tempfile.NamedTemporaryFile(dir=lib.param.TMPDIR)
+        with h5py.File(erifile.name, 'w') as f:
+            for key in datasets:
+                dat = getattr(eris, key)
+                # HDF5 copies the data from the file, not from its caches
+                dat.file.flush()
+                f.copy(dat, key)
+        eris._worker_erifile = erifile
+    return erifile.name
+
+def _update_amps_mpi(mycc, t1, t2, eris, comm):
+    from mpi4py import MPI
+    time0 = time.clock(), time.time()
+    rank, nproc = comm.Get_rank(), comm.Get_size()
+    buf = ccsd.contract_amps(mycc, t1, t2, eris, rank, nproc)
+    if nproc > 1:
+        # Each rank reduces its own segment, then the segments are gathered
+        nocc, nvir = t1.shape
+        locs = _buf_segments(nocc, nvir, nproc)
+        counts = [locs[r+1]-locs[r] for r in range(nproc)]
+        segment = numpy.empty(counts[rank])
+        comm.Reduce_scatter(buf, segment, recvcounts=counts, op=MPI.SUM)
+        comm.Allgatherv(segment, [buf, counts, locs[:-1], MPI.DOUBLE])
+        segment = None
+    t1new, t2new = ccsd.finalize_amps(mycc, t1, t2, eris, buf)
+    logger.timer_debug1(mycc, 'update t1 t2 (%d MPI ranks)' % nproc, *time0)
+    return t1new, t2new
+
+
+class CCSD(ccsd.CCSD):
+    __doc__ = ccsd.CCSD.__doc__ + '''
+    Attributes for the parallelization:
+        nproc : int
+            Number of worker processes of the shared-memory backend.  Each
+            process runs lib.num_threads()//nproc OpenMP threads and holds
+            its own buffer of the size of t2.  Default is 1, i.e. the serial
+            update_amps.
+        comm : mpi4py communicator
+            If given, the amplitudes are distributed over the MPI ranks of
+            comm and nproc is ignored.  Every rank needs to run the same
+            CCSD calculation.  Default is None.
+    '''
+    def __init__(self, mf, frozen=0, mo_coeff=None, mo_occ=None,
+                 nproc=1, comm=None):
+        ccsd.CCSD.__init__(self, mf, frozen, mo_coeff, mo_occ)
+        self.nproc = nproc
+        self.comm = comm
+        self._keys = self._keys.union(['nproc', 'comm'])
+
+    def dump_flags(self):
+        ccsd.CCSD.dump_flags(self)
+        if self.comm is not None:
+            logger.info(self, 'MPI ranks = %d', self.comm.Get_size())
+        else:
+            logger.info(self, 'nproc = %d', self.nproc)
+        return self
+
+    update_amps = update_amps
+
+
+if __name__ == '__main__':
+    from pyscf import gto
+    from pyscf import scf
+
+    mol = gto.Mole()
+    mol.atom = [
+        [8 , (0. , 0.     , 0.)],
+        [1 , (0. , -0.757 , 0.587)],
+        [1 , (0. , 0.757  , 0.587)]]
+    mol.basis = 'cc-pvdz'
+    mol.verbose = 0
+    mol.build()
+    mf = scf.RHF(mol).run()
+
+    mycc = CCSD(mf, nproc=4)
+    print(mycc.kernel()[0] - ccsd.CCSD(mf).kernel()[0])
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+import unittest
+import numpy
+
+from pyscf import gto
+from pyscf import scf
+from pyscf.cc import ccsd
+from pyscf.cc import ccsd_par
+
+mol = gto.Mole()
+mol.verbose = 7
+mol.output = '/dev/null'
+mol.atom = [
+    [8 , (0. , 0.     , 0.)],
+    [1 , (0. , -0.757 , 0.587)],
+    [1 , (0. , 0.757  , 0.587)]]
+mol.basis = '631g'
+mol.build()
+mf = scf.RHF(mol)
+mf.conv_tol_grad = 1e-8
+ehf = mf.kernel()
+
+mycc = ccsd.CCSD(mf)
+eris = mycc.ao2mo()
+numpy.random.seed(1)
+nocc = mycc.nocc
+nvir = mycc.nmo - nocc
+t1 = numpy.random.random((nocc,nvir)) * .1
+t2 = numpy.random.random((nocc,nocc,nvir,nvir)) * .1
+t2 = t2 + t2.transpose(1,0,3,2)
+
+
+class KnowValues(unittest.TestCase):
+    def test_update_amps(self):
+        for direct in (False, True):
+            mycc.direct = direct
+            ref1, ref2 = ccsd.update_amps(mycc, t1, t2, eris)
+            for nproc in (2, 3, 7):
+                pcc = ccsd_par.CCSD(mf, nproc=nproc)
+                pcc.direct = direct
+                r1, r2 = pcc.update_amps(t1, t2, eris)
+                self.assertAlmostEqual(abs(r1-ref1).max(), 0, 12)
+                self.assertAlmostEqual(abs(r2-ref2).max(), 0, 12)
+        mycc.direct = False
+
+    def test_contract_amps(self):
+        ref = ccsd.contract_amps(mycc, t1, t2, eris)
+        buf = 0
+        for rank in range(3):
+            buf = buf + ccsd.contract_amps(mycc, t1, t2, eris, rank, 3)
+        self.assertAlmostEqual(abs(buf-ref).max(), 0, 12)
+        buf = numpy.ones_like(ref)
+        ccsd.contract_amps(mycc, t1, t2, eris, out=buf)
+        self.assertAlmostEqual(abs(buf-ref).max(), 0, 12)
+
+    def test_buf_segments(self):
+        size = ccsd.amps_buf_size(nocc, nvir)
+        for nproc in (1, 2, 7):
+            locs = ccsd_par._buf_segments(nocc, nvir, nproc)
+            self.assertEqual(len(locs), nproc+1)
+            self.assertEqual(locs[0], 0)
+            self.assertEqual(locs[-1], size)
+            self.assertTrue(all(numpy.diff(locs) >= 0))
+            # Segment boundaries are t2new rows
+            self.assertTrue(all((x-nocc*nvir) % (nocc*nvir**2) == 0
+                                for x in locs[1:-1]))
+        self.assertEqual(ccsd_par.CCSD(mf).nproc, 1)
+
+    def test_ccsd(self):
+        pcc = ccsd_par.CCSD(mf, nproc=2)
+        pcc.conv_tol = 1e-10
+        pcc.kernel()
+        ref = ccsd.CCSD(mf)
+        ref.conv_tol = 1e-10
+        ref.kernel()
+        self.assertAlmostEqual(pcc.e_corr, ref.e_corr, 9)
+        self.assertAlmostEqual(abs(pcc.t2-ref.t2).max(), 0, 6)
+
+    def test_ccsd_outcore(self):
+        # The workers read a named copy of the out-of-core integrals
+        mol1 = mol.copy()
+        mol1.basis = 'ccpvdz'
+        mol1.build(0, 0)
+        mf1 = scf.RHF(mol1).run()
+        ref = ccsd.CCSD(mf1)
+        ref.max_memory = 1
+        ref.conv_tol = 1e-10
+        ref.kernel()
+        for direct in (False, True):
+            pcc = ccsd_par.CCSD(mf1, nproc=2)
+            pcc.max_memory = 1
+            pcc.direct = direct
+            pcc.conv_tol = 1e-10
+            eris = pcc.ao2mo()
+            self.assertFalse(isinstance(eris.ovvv, numpy.ndarray))
+            pcc.kernel(eris=eris)
+            self.assertTrue(eris._worker_erifile is not None)
+            self.assertAlmostEqual(pcc.e_corr, ref.e_corr, 9)
+            self.assertAlmostEqual(abs(pcc.t2-ref.t2).max(), 0, 6)
+
+
+if __name__ == "__main__":
+    print("Full Tests for process-parallel CCSD")
+    unittest.main()
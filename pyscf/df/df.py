@@ -3,8 +3,18 @@
 # Author: Qiming Sun <osirpt.sun@gmail.com>
 #
 
-'''
+r'''
 J-metric density fitting
+
+The Cholesky vectors L_{P,ij} of the DF tensor can be stored in single
+precision (DF.cderi_dtype = 'f4').  Rounding to float32 changes each element
+by at most u = 2**-24 relative.  By the Cauchy-Schwarz inequality the error of
+the reconstructed integrals (ij|kl) = \sum_P L_{P,ij} L_{P,kl} is bounded by
+
+    |d(ij|kl)| <= 2u sqrt((ij|ij) (kl|kl))
+
+in addition to the fitting error.  The vectors are converted back to float64
+when they are loaded in DF.loop.
 '''
 
 import time
@@ -29,6 +39,10 @@ class DF(lib.StreamObject):
         self.verbose = mol.verbose
         self.max_memory = mol.max_memory
         self.auxbasis = None
+# Data type of the stored DF tensor, 'f8' or 'f4' (see the error bound above)
+        self.cderi_dtype = 'f8'
+# HDF5 compression filter ('gzip' or 'lzf') when the DF tensor is saved on disk
+        self.cderi_compression = None
 
 ##################################################
 # Following are not input options
@@ -49,6 +63,9 @@ class DF(lib.StreamObject):
         else:
             log.info('auxbasis = auxmol.basis = %s', self.auxmol.basis)
         log.info('max_memory = %s', self.max_memory)
+        log.info('cderi_dtype = %s', self.cderi_dtype)
+        if self.cderi_compression is not None:
+            log.info('cderi_compression = %s', self.cderi_compression)
         if isinstance(self._cderi, str):
             log.info('_cderi = %s  where DF integrals are loaded (readonly).',
                      self._cderi)
@@ -78,6 +95,8 @@ class DF(lib.StreamObject):
             not isinstance(self._cderi_to_save, str)):
             self._cderi = incore.cholesky_eri(mol, int3c=int3c, int2c=int2c,
                                               auxmol=auxmol, verbose=log)
+            if numpy.dtype(self.cderi_dtype) != numpy.double:
+                self._cderi = self._cderi.astype(self.cderi_dtype)
         else:
             if isinstance(self._cderi_to_save, str):
                 cderi = self._cderi_to_save
@@ -88,8 +107,11 @@ class DF(lib.StreamObject):
                          'saved in file %s .', cderi)
             outcore.cholesky_eri(mol, cderi, dataname='j3c',
                                  int3c=int3c, int2c=int2c, auxmol=auxmol,
-                                 max_memory=max_memory, verbose=log)
-            if nao_pair*naux*8/1e6 < max_memory:
+                                 max_memory=max_memory, verbose=log,
+                                 dtype=self.cderi_dtype,
+                                 compression=self.cderi_compression)
+            itemsize = numpy.dtype(self.cderi_dtype).itemsize
+            if nao_pair*naux*itemsize/1e6 < max_memory:
                 with addons.load(cderi, 'j3c') as feri:
                     cderi = numpy.asarray(feri)
             self._cderi = cderi
@@ -100,13 +122,45 @@ class DF(lib.StreamObject):
         return self.build(*args, **kwargs)
 
     def loop(self):
+        '''Iterate over the blocks of the DF tensor.  The yielded block is a
+        float64 array which may be overwritten in the following iterations.
+        '''
         if self._cderi is None:
             self.build()
         with addons.load(self._cderi, 'j3c') as feri:
             naoaux = feri.shape[0]
-            for b0, b1 in self.prange(0, naoaux, self.blockdim):
-                eri1 = numpy.asarray(feri[b0:b1], order='C')
-                yield eri1
+            if isinstance(feri, numpy.ndarray) and feri.dtype == numpy.double:
+                for b0, b1 in self.prange(0, naoaux, self.blockdim):
+                    yield numpy.asarray(feri[b0:b1], order='C')
+            else:
+                # Decompress or convert the data to float64 in the buffers.
+                # Blocks of a dataset are read in a background thread, which
+                # needs three buffers (consumed, queued and being read).
+                if isinstance(feri, h5py.Dataset):
+                    nbuf = 3
+                else:
+                    nbuf = 1
+                blksize = min(self.blockdim, naoaux)
+                bufs = [numpy.empty((blksize,) + feri.shape[1:])
+                        for i in range(nbuf)]
+                def load():
+                    for i, (b0, b1) in enumerate(self.prange(0, naoaux,
+                                                             self.blockdim)):
+                        eri1 = bufs[i%nbuf][:b1-b0]
+                        if nbuf > 1:
+                            feri.read_direct(eri1, numpy.s_[b0:b1])
+                        else:
+                            eri1[:] = feri[b0:b1]
+                        yield eri1
+                if nbuf > 1:
+                    blocks = lib.prefetch_iter(load(), depth=1)
+                else:
+                    blocks = load()
+                try:
+                    for eri1 in blocks:
+                        yield eri1
+                finally:
+                    blocks.close()
 
     def prange(self, start, end, step):
         self._call_count += 1
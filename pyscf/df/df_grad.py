@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+
+r'''
+Nuclear gradients of the density fitting J and K matrices
+
+With the fitting metric M_{PQ} = (P|Q), the 2-electron integrals are
+approximated by
+
+    (ij|kl) ~ \sum_{PQ} (ij|P) M^{-1}_{PQ} (Q|kl)
+
+Besides the derivatives of the AO functions (ij|P)^{(x)}, the gradients
+include the response of the auxiliary basis (ij|\nabla P) and the response of
+the metric (\nabla P|Q).  The latter two contributions are returned as the
+attribute "aux" of the J, K derivative matrices.  The attribute holds the
+contributions to the nuclear gradients (of the energy functional associated
+to the J, K matrices) for each atom.
+
+See also pyscf/df/df_jk.py
+'''
+
+import time
+import numpy
+import scipy.linalg
+from pyscf import lib
+from pyscf import gto
+from pyscf.lib import logger
+from pyscf.df import addons
+from pyscf.ao2mo.outcore import balance_partition
+from pyscf.df.df_jk import OCCDROP
+
+
+def get_jk(dfobj, dm, hermi=1, with_j=True, with_k=True, max_memory=None):
+    r'''Derivatives of the density fitting J, K matrices
+
+    J = ((-nabla i) j| kl) D_lk
+    K = ((-nabla i) j| kl) D_jk
+
+    The 3-center derivative integrals are evaluated on the fly in blocks of
+    auxiliary basis functions.  The size of the blocks is determined by
+    max_memory.
+
+    Args:
+        dfobj : an instance of :class:`DF`
+            The DF object which was used in the SCF calculation.  The
+            auxiliary basis (dfobj.auxmol) and the Cholesky decomposed
+            3-center integrals (dfobj._cderi) are used to compute the fitting
+            coefficients.
+        dm : ndarray or list of ndarrays
+            A density matrix or a list of (symmetric) density matrices
+
+    Returns:
+        vj and vk of shape (3,nao,nao) for one density matrix, or
+        (nset,3,nao,nao) for a list of density matrices.  The contributions
+        of the auxiliary basis to the nuclear gradients are tagged as the
+        attribute "aux".  vj.aux has the shape (natm,3) for one density matrix
+        or (nset,nset,natm,3) for a list of density matrices, in which
+        vj.aux[i,j] corresponds to the Coulomb interaction between dm[i] and
+        dm[j].  vk.aux has the shape (natm,3) or (nset,natm,3).
+    '''
+    assert(with_j or with_k)
+    t0 = t1 = (time.clock(), time.time())
+    log = logger.Logger(dfobj.stdout, dfobj.verbose)
+    if max_memory is None:
+        max_memory = dfobj.max_memory
+    if dfobj._cderi is None:
+        dfobj.build()
+    mol = dfobj.mol
+    auxmol = dfobj.auxmol
+    if auxmol is None:
+        auxmol = dfobj.auxmol = addons.make_auxmol(mol, dfobj.auxbasis)
+
+    dms = numpy.asarray(dm)
+    dm_shape = dms.shape
+    nao = dm_shape[-1]
+    dms = dms.reshape(-1,nao,nao)
+    nset = dms.shape[0]
+    naux = auxmol.nao_nr()
+    nao_pair = nao * (nao+1) // 2
+
+    # Electron density in the lower triangular part
+    idx = numpy.arange(nao)
+    dmtril = lib.pack_tril(dms + dms.transpose(0,2,1))
+    dmtril[:,idx*(idx+1)//2+idx] *= .5
+
+    # D = C n C^T, the orbitals of which are used to construct the K matrix
+    orbo = []
+    occs = []
+    if with_k:
+        for k in range(nset):
+            e, c = scipy.linalg.eigh(dms[k])
+            mask = abs(e) > OCCDROP
+            orbo.append(numpy.asarray(c[:,mask], order='F'))
+            occs.append(e[mask])
+    nocc = [x.size for x in occs]
+
+    low = _cholesky_metric(auxmol)
+    t1 = log.timer_debug1('Cholesky metric', *t1)
+
+    # The Cholesky decomposed integrals b = L^{-1} (P|ij) are read from
+    # dfobj._cderi.  The fitting coefficients are
+    #   c_P = \sum_Q M^{-1}_{PQ} (Q|ij) D_ij = L^{-T} b D
+    # For K, the half-transformed fitting coefficients
+    #   u_{P,al} = \sum_{Qk} M^{-1}_{PQ} (Q|kl) C_ka = L^{-T} b C
+    # are held in memory if possible, otherwise in a temporary HDF5 file.
+    mem_now = lib.current_memory()[0]
+    size_u = naux * sum(nocc) * nao * 8e-6
+    swapfile = None
+    if size_u > (max_memory - mem_now) * .4:
+        log.debug1('Save the half-transformed 3-center integrals on disk')
+        swapfile = lib.H5TmpFile()
+        bu = [swapfile.create_dataset('u%d'%k, (naux,n*nao), 'f8')
+              for k, n in enumerate(nocc)]
+    else:
+        bu = [numpy.empty((naux,n*nao)) for n in nocc]
+
+    rhoj = numpy.empty((nset,naux))
+    mem_now = lib.current_memory()[0]
+    blksize = max(4, int((max_memory-mem_now)*.4e6/8/(nao**2*2+1)))
+    with addons.load(dfobj._cderi, 'j3c') as feri:
+        if feri.shape != (naux,nao_pair):
+            raise RuntimeError('DF gradients require the 3-center integrals '
+                               'of auxiliary basis dfobj.auxmol')
+        for p0, p1 in lib.prange(0, naux, blksize):
+            eri1 = numpy.asarray(feri[p0:p1], dtype=numpy.double, order='C')
+            rhoj[:,p0:p1] = lib.dot(dmtril, eri1.T)
+            if with_k:
+                eri1 = lib.unpack_tril(eri1).reshape(-1,nao)
+                for k in range(nset):
+                    # bu[P,a,l] = \sum_k b[P,k,l] C_ka
+                    buf = lib.dot(eri1, orbo[k]).reshape(p1-p0,nao,nocc[k])
+                    bu[k][p0:p1] = buf.transpose(0,2,1).reshape(p1-p0,-1)
+            eri1 = buf = None
+    rhoj = scipy.linalg.solve_triangular(low.T, rhoj.T, lower=False).T
+    t1 = log.timer_debug1('DF fitting coefficients', *t1)
+
+    # rhok[P,a,b] = (C^T T_P C)_{ab} n_a n_b with T_P = \sum_Q M^{-1}_{PQ} (Q|ij)
+    rhok = []
+    if with_k:
+        linv = scipy.linalg.solve_triangular(low, numpy.eye(naux), lower=True)
+        for k in range(nset):
+            _transform_tril(linv, bu[k], blksize*nao//max(1,nocc[k]))
+            occ2 = occs[k][:,None] * occs[k]
+            rhok_k = numpy.empty((naux,nocc[k],nocc[k]))
+            for p0, p1 in lib.prange(0, naux, blksize):
+                u = numpy.asarray(bu[k][p0:p1]).reshape(-1,nao)
+                rhok_k[p0:p1] = lib.dot(u, orbo[k]).reshape(-1,nocc[k],nocc[k])
+                rhok_k[p0:p1] *= occ2
+            rhok.append(rhok_k)
+        linv = None
+        t1 = log.timer_debug1('Half-transformed fitting coefficients', *t1)
+
+    # The response of the metric
+    #   -1/2 \sum_{PQ} c_P (P|Q)^{(x)} c_Q = \sum_{P on atom} (\nabla P|Q) c_P c_Q
+    atom_of_aux = _aux_atom_index(auxmol)
+    natm = mol.natm
+    int2c_ip1 = auxmol.intor(mol._add_suffix('int2c2e_ip1'), comp=3)
+    if with_j:
+        ej_aux = numpy.zeros((nset,nset,3,naux))
+        for k in range(3):
+            tmp = lib.dot(rhoj, int2c_ip1[k].T)
+            ej_aux[:,:,k] += tmp[:,None,:] * rhoj
+    if with_k:
+        ek_aux = numpy.zeros((nset,3,naux))
+        for k in range(nset):
+            # V_{PQ} = Tr(T_P D T_Q D)
+            occ2 = occs[k][:,None] * occs[k]
+            v = lib.dot(rhok[k].reshape(naux,-1),
+                        (rhok[k]/occ2).reshape(naux,-1).T)
+            ek_aux[k] += numpy.einsum('xpq,pq->xp', int2c_ip1, v)
+            v = None
+    int2c_ip1 = None
+
+    pmol = gto.mole.conc_mol(mol, auxmol)
+    nbas = mol.nbas
+    ip1 = mol._add_suffix('int3c2e_ip1')
+    ip2 = mol._add_suffix('int3c2e_ip2')
+    cintopt1 = gto.moleintor.make_cintopt(pmol._atm, pmol._bas, pmol._env, ip1)
+    cintopt2 = gto.moleintor.make_cintopt(pmol._atm, pmol._bas, pmol._env, ip2)
+
+    vj = numpy.zeros((nset,3,nao,nao))
+    vk = numpy.zeros((nset,3,nao,nao))
+    mem_now = lib.current_memory()[0]
+    # (nabla i,j|P), (i,j|nabla P) and the intermediates for K
+    blksize = int((max_memory-mem_now)*1e6/8/(nao**2*(6+nset)+nao*max([1]+nocc)*2))
+    blksize = max(4, min(naux, blksize, dfobj.blockdim))
+    aux_loc = auxmol.ao_loc_nr()
+    for shl0, shl1, nL in balance_partition(aux_loc, blksize):
+        p0, p1 = aux_loc[shl0], aux_loc[shl1]
+        shls_slice = (0, nbas, 0, nbas, nbas+shl0, nbas+shl1)
+        # int3c[x,P,j,i] = (nabla i,j|P)
+        int3c = gto.moleintor.getints3c(ip1, pmol._atm, pmol._bas, pmol._env,
+                                        shls_slice, 3, 's1', cintopt=cintopt1)
+        int3c = int3c.transpose(0,3,2,1)
+        if with_j:
+            for k in range(3):
+                tmp = lib.dot(rhoj[:,p0:p1], int3c[k].reshape(p1-p0,-1))
+                vj[:,k] -= tmp.reshape(nset,nao,nao).transpose(0,2,1)
+        if with_k:
+            for i in range(nset):
+                if nocc[i] == 0:
+                    continue
+                u = numpy.asarray(bu[i][p0:p1]).reshape(-1,nao)
+                for k in range(3):
+                    # h[i,P,a] = \sum_j (nabla i,j|P) C_ja n_a
+                    h = int3c[k].transpose(0,2,1).reshape(-1,nao)
+                    h = lib.dot(h, orbo[i]*occs[i]).reshape(p1-p0,nao,nocc[i])
+                    h = h.transpose(1,0,2).reshape(nao,-1)
+                    vk[i,k] -= lib.dot(h, u)
+                h = u = None
+        int3c = None
+
+        # int3c[x,P,ij] = (i,j|nabla P)
+        int3c = gto.moleintor.getints3c(ip2, pmol._atm, pmol._bas, pmol._env,
+                                        shls_slice, 3, 's2ij', cintopt=cintopt2)
+        int3c = int3c.transpose(0,2,1)
+        if with_j:
+            for k in range(3):
+                tmp = lib.dot(dmtril, int3c[k].T)
+                ej_aux[:,:,k,p0:p1] -= tmp[:,None,:] * rhoj[:,p0:p1]
+        if with_k:
+            for i in range(nset):
+                if nocc[i] == 0:
+                    continue
+                # Z_P = C n t_P n C^T in the lower triangular part
+                z = lib.dot(rhok[i][p0:p1].reshape(-1,nocc[i]), orbo[i].T)
+                z = z.reshape(p1-p0,nocc[i],nao).transpose(0,2,1).reshape(-1,nocc[i])
+                z = lib.dot(z, orbo[i].T).reshape(p1-p0,nao,nao)
+                z = lib.pack_tril(z + z.transpose(0,2,1))
+                z[:,idx*(idx+1)//2+idx] *= .5
+                for k in range(3):
+                    ek_aux[i,k,p0:p1] -= numpy.einsum('pi,pi->p', int3c[k], z)
+                z = None
+        int3c = None
+        t1 = log.timer_debug1('3c-derivatives [%d:%d]'%(p0,p1), *t1)
+    bu = rhok = swapfile = None
+
+    if with_j:
+        ej_aux = _sum_by_atom(ej_aux, atom_of_aux, natm)
+        ej_aux = (ej_aux + ej_aux.transpose(1,0,2,3)) * .5
+        if len(dm_shape) == 2:
+            vj = lib.tag_array(vj.reshape(3,nao,nao), aux=ej_aux[0,0])
+        else:
+            vj = lib.tag_array(vj.reshape(dm_shape[:-2]+(3,nao,nao)), aux=ej_aux)
+    else:
+        vj = None
+    if with_k:
+        ek_aux = _sum_by_atom(ek_aux, atom_of_aux, natm)
+        if len(dm_shape) == 2:
+            vk = lib.tag_array(vk.reshape(3,nao,nao), aux=ek_aux[0])
+        else:
+            vk = lib.tag_array(vk.reshape(dm_shape[:-2]+(3,nao,nao)), aux=ek_aux)
+    else:
+        vk = None
+    log.timer('DF gradients of vj and vk', *t0)
+    return vj, vk
+
+
+def _cholesky_metric(auxmol):
+    '''Cholesky factor of the 2-center Coulomb metric, the same as the one
+    used by :func:`incore.cholesky_eri` and :func:`outcore.cholesky_eri_b`'''
+    j2c = auxmol.intor(auxmol._add_suffix('int2c2e'), hermi=1)
+    try:
+        low = scipy.linalg.cholesky(j2c, lower=True)
+    except scipy.linalg.LinAlgError:
+        j2c[numpy.diag_indices(j2c.shape[1])] += 1e-14
+        low = scipy.linalg.cholesky(j2c, lower=True)
+    return low
+
+def _transform_tril(linv, b, blksize):
+    r'''In-place transformation b <- L^{-T} b for b in memory or in HDF5
+    dataset.  Rows of b are updated from top to bottom, since the row block
+    [p0:p1] of the result only depends on the rows b[p0:]'''
+    naux = linv.shape[0]
+    blksize = max(1, min(naux, blksize))
+    for p0, p1 in lib.prange(0, naux, blksize):
+        out = 0
+        for q0, q1 in lib.prange(p0, naux, blksize):
+            out = out + lib.dot(linv[q0:q1,p0:p1].T, numpy.asarray(b[q0:q1]))
+        b[p0:p1] = out
+    return b
+
+def _aux_atom_index(auxmol):
+    '''The atom Id of each auxiliary basis function'''
+    aux_loc = auxmol.ao_loc_nr()
+    return numpy.repeat(auxmol._bas[:,gto.ATOM_OF], aux_loc[1:]-aux_loc[:-1])
+
+def _sum_by_atom(e_aux, atom_of_aux, natm):
+    '''Contract the last dimension (auxiliary basis) of e_aux to atoms, then
+    put the xyz components on the last dimension'''
+    shape = e_aux.shape[:-1]
+    e_aux = e_aux.reshape(-1,e_aux.shape[-1])
+    out = numpy.empty((e_aux.shape[0],natm))
+    for i, e in enumerate(e_aux):
+        out[i] = numpy.bincount(atom_of_aux, weights=e, minlength=natm)
+    return out.reshape(shape+(natm,)).swapaxes(-1,-2)
+
+
+if __name__ == '__main__':
+    from pyscf import scf
+    mol = gto.Mole()
+    mol.atom = [
+        ['O' , (0. , 0.     , 0.)],
+        [1   , (0. , -0.757 , 0.587)],
+        [1   , (0. , 0.757  , 0.587)] ]
+    mol.basis = '631g'
+    mol.build()
+    mf = scf.RHF(mol).density_fit().run()
+    print(mf.nuc_grad_method().kernel())
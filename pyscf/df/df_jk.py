@@ -8,6 +8,7 @@ import time
 import ctypes
 from functools import reduce
 import numpy
+import scipy.linalg
 from pyscf import lib
 from pyscf.lib import logger
 from pyscf.ao2mo import _ao2mo
@@ -128,6 +129,17 @@ def density_fit(mf, auxbasis=None, with_df=None):
 
 
 def get_jk(dfobj, dm, hermi=1, vhfopt=None, with_j=True, with_k=True):
+    r'''J and K matrices of one or a set of density matrices in one pass over
+    the DF integrals.
+
+    For K, each density matrix is factorized D = X Y^T so that
+    K = \sum_P (L_P X) (L_P Y)^T, where L_P are the Cholesky vectors.  X = Y
+    are the occupied orbitals if dm has the mo_coeff and mo_occ tags (see
+    lib.tag_array).  Otherwise X and Y are obtained from the eigenvalue
+    decomposition of a symmetric D or the singular value decomposition of a
+    non-symmetric D, ignoring the components below OCCDROP.  A density matrix
+    of high rank is contracted with the AO integrals directly.
+    '''
     t0 = t1 = (time.clock(), time.time())
     log = logger.Logger(dfobj.stdout, dfobj.verbose)
     assert(with_j or with_k)
@@ -142,97 +154,115 @@ def get_jk(dfobj, dm, hermi=1, vhfopt=None, with_j=True, with_k=True):
     nao = dm_shape[-1]
     dms = dms.reshape(-1,nao,nao)
     nset = dms.shape[0]
-    vj = [0] * nset
-    vk = [0] * nset
-
-    if not with_k:
-        dmtril = []
-        for k in range(nset):
-            dmtril.append(lib.pack_tril(dms[k]+dms[k].T))
-            i = numpy.arange(nao)
-            dmtril[k][i*(i+1)//2+i] *= .5
-        for eri1 in dfobj.loop():
-            naux, nao_pair = eri1.shape
-            for k in range(nset):
-                rho = numpy.einsum('px,x->p', eri1, dmtril[k])
-                vj[k] += numpy.einsum('p,px->x', rho, eri1)
-
-    elif hasattr(dm, 'mo_coeff'):
-        mo_coeff = numpy.asarray(dm.mo_coeff, order='F')
-        mo_occ   = numpy.asarray(dm.mo_occ)
-        nmo = mo_occ.shape[-1]
-        mo_coeff = mo_coeff.reshape(-1,nao,nmo)
-        mo_occ   = mo_occ.reshape(-1,nmo)
-        if mo_occ.shape[0] * 2 == nset: # handle ROHF DM
-            mo_coeff = numpy.vstack((mo_coeff, mo_coeff))
-            mo_occa = numpy.array(mo_occ> 0, dtype=numpy.double)
-            mo_occb = numpy.array(mo_occ==2, dtype=numpy.double)
-            assert(mo_occa.sum() + mo_occb.sum() == mo_occ.sum())
-            mo_occ = numpy.vstack((mo_occa, mo_occb))
-
-        dmtril = []
-        orbo = []
-        for k in range(nset):
-            if with_j:
-                dmtril.append(lib.pack_tril(dms[k]+dms[k].T))
-                i = numpy.arange(nao)
-                dmtril[k][i*(i+1)//2+i] *= .5
-
-            c = numpy.einsum('pi,i->pi', mo_coeff[k][:,mo_occ[k]>0],
-                             numpy.sqrt(mo_occ[k][mo_occ[k]>0]))
-            orbo.append(numpy.asarray(c, order='F'))
-
-        buf = numpy.empty((dfobj.blockdim*nao,nao))
-        for eri1 in dfobj.loop():
-            naux, nao_pair = eri1.shape
-            assert(nao_pair == nao*(nao+1)//2)
+    vj = vk = None
+
+    if with_j:
+        idx = numpy.arange(nao)
+        dmtril = lib.pack_tril(dms + dms.transpose(0,2,1))
+        dmtril[:,idx*(idx+1)//2+idx] *= .5
+        vj = numpy.zeros_like(dmtril)
+
+    if with_k:
+        if hasattr(dm, 'mo_coeff'):
+            mo_coeff = numpy.asarray(dm.mo_coeff, order='F')
+            mo_occ   = numpy.asarray(dm.mo_occ)
+            nmo = mo_occ.shape[-1]
+            mo_coeff = mo_coeff.reshape(-1,nao,nmo)
+            mo_occ   = mo_occ.reshape(-1,nmo)
+            if mo_occ.shape[0] * 2 == nset: # handle ROHF DM
+                mo_coeff = numpy.vstack((mo_coeff, mo_coeff))
+                mo_occa = numpy.array(mo_occ> 0, dtype=numpy.double)
+                mo_occb = numpy.array(mo_occ==2, dtype=numpy.double)
+                assert(mo_occa.sum() + mo_occb.sum() == mo_occ.sum())
+                mo_occ = numpy.vstack((mo_occa, mo_occb))
+
+            factors = []
             for k in range(nset):
-                if with_j:
-                    rho = numpy.einsum('px,x->p', eri1, dmtril[k])
-                    vj[k] += numpy.einsum('p,px->x', rho, eri1)
-
-                nocc = orbo[k].shape[1]
-                if nocc > 0:
-                    buf1 = buf[:naux*nocc]
-                    fdrv(ftrans, fmmm,
-                         buf1.ctypes.data_as(ctypes.c_void_p),
-                         eri1.ctypes.data_as(ctypes.c_void_p),
-                         orbo[k].ctypes.data_as(ctypes.c_void_p),
-                         ctypes.c_int(naux), ctypes.c_int(nao),
-                         (ctypes.c_int*4)(0, nocc, 0, nao),
-                         null, ctypes.c_int(0))
-                    vk[k] += lib.dot(buf1.T, buf1)
-            t1 = log.timer_debug1('jk', *t1)
-    else:
-        #:vk = numpy.einsum('pij,jk->pki', cderi, dm)
-        #:vk = numpy.einsum('pki,pkj->ij', cderi, vk)
-        rargs = (ctypes.c_int(nao), (ctypes.c_int*4)(0, nao, 0, nao),
-                 null, ctypes.c_int(0))
+                c = numpy.einsum('pi,i->pi', mo_coeff[k][:,mo_occ[k]>0],
+                                 numpy.sqrt(mo_occ[k][mo_occ[k]>0]))
+                factors.append((numpy.asarray(c, order='F'), None))
+        else:
+            factors = [_factorize_dm(x) for x in dms]
+        log.debug1('Rank of the factorized density matrices %s',
+                   [None if x is None else x[0].shape[1] for x in factors])
+
         dms = [numpy.asarray(x, order='F') for x in dms]
-        buf = numpy.empty((2,dfobj.blockdim,nao,nao))
-        for eri1 in dfobj.loop():
-            naux, nao_pair = eri1.shape
+        vk = numpy.zeros((nset,nao,nao))
+        ncol = max([nao] + [x[0].shape[1] for x in factors if x is not None])
+        buf = numpy.empty((2,dfobj.blockdim*ncol,nao))
+
+    def half_trans(eri1, c, out):
+        #:numpy.einsum('pij,ja->pai', cderi, c)
+        naux = eri1.shape[0]
+        ncol = c.shape[1]
+        out = out[:naux*ncol]
+        fdrv(ftrans, fmmm,
+             out.ctypes.data_as(ctypes.c_void_p),
+             eri1.ctypes.data_as(ctypes.c_void_p),
+             c.ctypes.data_as(ctypes.c_void_p),
+             ctypes.c_int(naux), ctypes.c_int(nao),
+             (ctypes.c_int*4)(0, ncol, 0, nao), null, ctypes.c_int(0))
+        return out
+
+    for eri1 in dfobj.loop():
+        naux, nao_pair = eri1.shape
+        assert(nao_pair == nao*(nao+1)//2)
+        if with_j:
+            rho = lib.dot(dmtril, eri1.T)
+            vj = lib.dot(rho, eri1, 1, vj, 1)
+
+        if with_k:
+            eri1_s1 = None
             for k in range(nset):
-                buf1 = buf[0,:naux]
-                fdrv(ftrans, fmmm,
-                     buf1.ctypes.data_as(ctypes.c_void_p),
-                     eri1.ctypes.data_as(ctypes.c_void_p),
-                     dms[k].ctypes.data_as(ctypes.c_void_p),
-                     ctypes.c_int(naux), *rargs)
-                if with_j:
-                    rho = numpy.einsum('kii->k', buf1)
-                    vj[k] += numpy.einsum('p,px->x', rho, eri1)
-
-                buf2 = lib.unpack_tril(eri1, out=buf[1])
-                vk[k] += lib.dot(buf1.reshape(-1,nao).T,
-                                 buf2.reshape(-1,nao))
-            t1 = log.timer_debug1('jk', *t1)
+                if factors[k] is None:
+                    #:vk = numpy.einsum('pij,jk->pki', cderi, dm)
+                    #:vk = numpy.einsum('pki,pkj->ij', cderi, vk)
+                    buf1 = half_trans(eri1, dms[k], buf[0])
+                    if eri1_s1 is None:
+                        eri1_s1 = lib.unpack_tril(eri1, out=buf[1])
+                    lib.dot(buf1.T, eri1_s1.reshape(-1,nao), 1, vk[k], 1)
+                else:
+                    x, y = factors[k]
+                    if x.shape[1] == 0:
+                        continue
+                    bx = half_trans(eri1, x, buf[0])
+                    if y is None:
+                        by = bx
+                    else:
+                        by = half_trans(eri1, y, buf[1])
+                        eri1_s1 = None
+                    lib.dot(bx.T, by, 1, vk[k], 1)
+        t1 = log.timer_debug1('jk', *t1)
 
     if with_j: vj = lib.unpack_tril(vj, 1).reshape(dm_shape)
-    if with_k: vk = numpy.asarray(vk).reshape(dm_shape)
+    if with_k: vk = vk.reshape(dm_shape)
     logger.timer(dfobj, 'vj and vk', *t0)
     return vj, vk
 
+def _factorize_dm(dm):
+    '''Factorize dm = X Y^T with the fewest columns.  Y is None if Y = X.
+    Returns None if the factorization does not reduce the cost of K.
+    '''
+    nao = dm.shape[0]
+    if abs(dm - dm.T).max() < OCCDROP:
+        e, c = scipy.linalg.eigh(dm)
+        mask = abs(e) > OCCDROP
+        x = c[:,mask] * numpy.sqrt(abs(e[mask]))
+        if (e[mask] > 0).all():
+            return numpy.asarray(x, order='F'), None
+        y = x * numpy.sign(e[mask])
+        cost = x.shape[1] * 3
+    else:
+        u, s, vt = scipy.linalg.svd(dm)
+        mask = s > OCCDROP
+        x = u[:,mask] * s[mask]
+        y = vt[mask].T
+        cost = x.shape[1] * 3
+    # The direct contraction costs about 2*nao^3 per auxiliary function
+    if cost > nao * 2:
+        return None
+    return numpy.asarray(x, order='F'), numpy.asarray(y, order='F')
+
 
 def r_get_jk(dfobj, dms, hermi=1):
     '''Relativistic density fitting JK'''
@@ -83,6 +83,108 @@ def cholesky_eri(mol, auxbasis='weigend+etb', auxmol=None,
     return cderi
 
 
+def pivoted_cholesky_eri(mol, tol=1e-8, span=1e-2, intor='int2e_sph',
+                         max_vecs=None, verbose=0):
+    '''Cholesky vectors of the AO ERI matrix (ij|kl) by pivoted Cholesky
+    decomposition.  No auxiliary basis is needed.
+
+    The diagonal (ij|ij) is computed by shell pairs.  In each step the
+    integral columns (ij|kl) of the shell pair kl which holds the largest
+    remaining diagonal element are computed.  Several Cholesky vectors are
+    extracted from the columns as long as their pivots are larger than
+    span * (largest diagonal element).  The decomposition stops when the
+    largest remaining diagonal element, which bounds the error of every
+    reconstructed integral, is below tol.
+
+    Kwargs:
+        tol : float
+            Threshold of the decomposition.
+        span : float
+            Relative size of the pivots taken from one shell pair.
+        max_vecs : int
+            Maximum number of Cholesky vectors.  Default is nao*(nao+1)/2.
+
+    Returns:
+        2D array of (nvec,nao*(nao+1)/2) in C-contiguous, with the same
+        layout as :func:`cholesky_eri`.  It can be assigned to DF._cderi.
+
+    Examples:
+
+    >>> mf = scf.density_fit(scf.RHF(mol))
+    >>> mf.with_df._cderi = df.incore.pivoted_cholesky_eri(mol, tol=1e-8)
+    >>> mf.kernel()
+    '''
+    t0 = (time.clock(), time.time())
+    log = logger.new_logger(mol, verbose)
+    intor = mol._add_suffix(intor)
+    atm, bas, env = mol._atm, mol._bas, mol._env
+    nbas = mol.nbas
+    ao_loc = gto.moleintor.make_loc(bas, intor)
+    nao = ao_loc[-1]
+    nao_pair = nao * (nao+1) // 2
+    if max_vecs is None:
+        max_vecs = nao_pair
+    cintopt = gto.moleintor.make_cintopt(atm, bas, env, intor)
+
+    # Indices of the shell pairs in the compressed (i>=j) pair index
+    pair_loc = []
+    diag = numpy.empty(nao_pair)
+    pair_shell = numpy.empty(nao_pair, dtype=int)
+    shl_pairs = []
+    for ish in range(nbas):
+        i0, i1 = ao_loc[ish], ao_loc[ish+1]
+        for jsh in range(ish+1):
+            j0, j1 = ao_loc[jsh], ao_loc[jsh+1]
+            i = numpy.arange(i0, i1)[:,None]
+            j = numpy.arange(j0, j1)
+            mask = (i >= j).ravel()
+            idx = (i*(i+1)//2 + j).ravel()[mask]
+            shls_slice = (ish, ish+1, jsh, jsh+1, ish, ish+1, jsh, jsh+1)
+            eri = gto.moleintor.getints(intor, atm, bas, env, shls_slice,
+                                        cintopt=cintopt)
+            diag[idx] = eri.reshape((i1-i0)*(j1-j0),-1).diagonal()[mask]
+            pair_shell[idx] = len(shl_pairs)
+            shl_pairs.append((ish, jsh))
+            pair_loc.append((idx, mask))
+    log.timer_debug1('diagonal of ERI', *t0)
+
+    cderi = numpy.empty((min(max_vecs, 64), nao_pair))
+    nvec = 0
+    dmax = diag.max()
+    while dmax > tol and nvec < max_vecs:
+        ishp = pair_shell[diag.argmax()]
+        ish, jsh = shl_pairs[ishp]
+        cols, mask = pair_loc[ishp]
+        shls_slice = (0, nbas, 0, nbas, ish, ish+1, jsh, jsh+1)
+        eri = gto.moleintor.getints(intor, atm, bas, env, shls_slice,
+                                    aosym='s2ij', cintopt=cintopt)
+        eri = eri[:,mask]
+        if nvec > 0:
+            eri -= lib.dot(cderi[:nvec].T, cderi[:nvec,cols])
+
+        thresh = max(tol, span*dmax)
+        dcols = diag[cols]
+        q = dcols.argmax()
+        while dcols[q] > thresh and nvec < max_vecs:
+            if nvec == cderi.shape[0]:
+                cderi = numpy.vstack((cderi, numpy.empty_like(cderi)))
+            v = cderi[nvec] = eri[:,q] / numpy.sqrt(dcols[q])
+            nvec += 1
+            diag -= v**2
+            diag[cols[q]] = 0
+            eri -= numpy.einsum('i,j->ij', v, v[cols])
+            dcols = diag[cols]
+            q = dcols.argmax()
+        dmax = diag.max()
+        log.debug1('shell pair (%d,%d), nvec = %d, max diagonal = %g',
+                   ish, jsh, nvec, dmax)
+
+    cderi = numpy.asarray(cderi[:nvec], order='C')
+    log.debug('%d Cholesky vectors, residual max diagonal %g', nvec, dmax)
+    log.timer('pivoted_cholesky_eri', *t0)
+    return cderi
+
+
 if __name__ == '__main__':
     from pyscf import scf
     from pyscf import ao2mo
@@ -21,8 +21,21 @@ from pyscf.df.addons import make_auxmol
 
 def cholesky_eri(mol, erifile, auxbasis='weigend+etb', dataname='eri_mo', tmpdir=None,
                  int3c='int3c2e_sph', aosym='s2ij', int2c='int2c2e_sph', comp=1,
-                 max_memory=2000, ioblk_size=256, auxmol=None, verbose=0):
+                 max_memory=2000, ioblk_size=256, auxmol=None, verbose=0,
+                 nproc=1, dtype='f8', compression=None):
     '''3-center 2-electron AO integrals
+
+    Kwargs:
+        nproc : int
+            Number of worker processes to generate the (ij|L) integrals.  See
+            :func:`cholesky_eri_b`.
+        dtype : str or numpy dtype
+            Data type of the stored Cholesky vectors.  'f4' halves the file
+            size.  The relative error of each element is bounded by the
+            float32 unit roundoff 2**-24.
+        compression : str
+            HDF5 compression filter ('gzip' or 'lzf') for the stored dataset.
+            The shuffle filter is enabled with the compression.
     '''
     assert(aosym in ('s1', 's2ij'))
     assert(comp == 1)
@@ -38,7 +51,8 @@ def cholesky_eri(mol, erifile, auxbasis='weigend+etb', dataname='eri_mo', tmpdir
         tmpdir = lib.param.TMPDIR
     swapfile = tempfile.NamedTemporaryFile(dir=tmpdir)
     cholesky_eri_b(mol, swapfile.name, auxbasis, dataname,
-                   int3c, aosym, int2c, comp, ioblk_size, auxmol, verbose=log)
+                   int3c, aosym, int2c, comp, ioblk_size, auxmol, verbose=log,
+                   nproc=nproc)
     fswap = h5py.File(swapfile.name, 'r')
     time1 = log.timer('generate (ij|L) 1 pass', *time0)
 
@@ -56,14 +70,18 @@ def cholesky_eri(mol, erifile, auxbasis='weigend+etb', dataname='eri_mo', tmpdir
             del(feri[dataname])
     else:
         feri = h5py.File(erifile, 'w')
+    if compression is None:
+        kwargs = {}
+    else:
+        kwargs = {'compression': compression, 'shuffle': True}
     if comp == 1:
         chunks = (min(int(16e3/nao),naoaux), nao) # 128K
-        h5d_eri = feri.create_dataset(dataname, (naoaux,nao_pair), 'f8',
-                                      chunks=chunks)
+        h5d_eri = feri.create_dataset(dataname, (naoaux,nao_pair), dtype,
+                                      chunks=chunks, **kwargs)
     else:
         chunks = (1, min(int(16e3/nao),naoaux), nao) # 128K
-        h5d_eri = feri.create_dataset(dataname, (comp,naoaux,nao_pair), 'f8',
-                                      chunks=chunks)
+        h5d_eri = feri.create_dataset(dataname, (comp,naoaux,nao_pair), dtype,
+                                      chunks=chunks, **kwargs)
     aopairblks = len(fswap[dataname+'/0'])
 
     ioblk_size = max(max_memory*.1, ioblk_size)
@@ -87,6 +105,7 @@ def cholesky_eri(mol, erifile, auxbasis='weigend+etb', dataname='eri_mo', tmpdir
                 h5d_eri[row0:row1] = buf[:nrow]
             else:
                 h5d_eri[icomp,row0:row1] = buf[:nrow]
+            logger.count_io(nread=buf[:nrow].nbytes, nwritten=buf[:nrow].nbytes)
             ti0 = log.timer('step 2 [%d/%d], [%d,%d:%d], row = %d'%
                             (istep, totstep, icomp, row0, row1, nrow), *ti0)
 
@@ -98,8 +117,18 @@ def cholesky_eri(mol, erifile, auxbasis='weigend+etb', dataname='eri_mo', tmpdir
 # store cderi in blocks
 def cholesky_eri_b(mol, erifile, auxbasis='weigend+etb', dataname='eri_mo',
                    int3c='int3c2e_sph', aosym='s2ij', int2c='int2c2e_sph',
-                   comp=1, ioblk_size=256, auxmol=None, verbose=logger.NOTE):
+                   comp=1, ioblk_size=256, auxmol=None, verbose=logger.NOTE,
+                   nproc=1):
     '''3-center 2-electron AO integrals
+
+    Kwargs:
+        nproc : int
+            Number of worker processes.  When nproc > 1, the shell ranges are
+            distributed over a process pool.  The workers compute the (ij|L)
+            blocks and stream them to the parent process in the order of the
+            shell ranges.  The parent applies the Cholesky-factor solve and
+            writes the blocks to disk.  The C OpenMP threads are divided
+            among the workers.
     '''
     assert(aosym in ('s1', 's2ij'))
     time0 = (time.clock(), time.time())
@@ -130,13 +159,16 @@ def cholesky_eri_b(mol, erifile, auxbasis='weigend+etb', dataname='eri_mo',
     for icomp in range(comp):
         feri.create_group('%s/%d'%(dataname,icomp)) # for h5py old version
 
-    def store(b, label):
+    def store(b):
         if b.ndim == 3 and b.flags.f_contiguous:
             b = lib.transpose(b.T, axes=(0,2,1)).reshape(naux,-1)
         else:
             b = b.reshape((-1,naux)).T
-        cderi = scipy.linalg.solve_triangular(low, b, lower=True, overwrite_b=True)
+        return scipy.linalg.solve_triangular(low, b, lower=True, overwrite_b=True)
+
+    def save(label, cderi):
         feri[label] = cderi
+        logger.count_io(nwritten=cderi.nbytes)
 
     int3c = gto.moleintor.ascint3(int3c)
     atm, bas, env = gto.mole.conc_env(mol._atm, mol._bas, mol._env,
@@ -144,6 +176,10 @@ def cholesky_eri_b(mol, erifile, auxbasis='weigend+etb', dataname='eri_mo',
     ao_loc = gto.moleintor.make_loc(bas, int3c)
     nao = ao_loc[mol.nbas]
     naoaux = ao_loc[-1] - nao
+    if nproc > 1:
+        # Smaller blocks for load balance.  About 2*nproc blocks are held in
+        # memory at the same time.
+        ioblk_size = ioblk_size / nproc
     if aosym == 's1':
         nao_pair = nao * nao
         buflen = min(max(int(ioblk_size*1e6/8/naoaux/comp), 1), nao_pair)
@@ -156,23 +192,42 @@ def cholesky_eri_b(mol, erifile, auxbasis='weigend+etb', dataname='eri_mo',
               naoaux*nao_pair*8/1e6, comp*buflen*naoaux*8/1e6)
     if log.verbose >= logger.DEBUG1:
         log.debug1('shranges = %s', shranges)
-    cintopt = gto.moleintor.make_cintopt(atm, bas, env, int3c)
-    bufs1 = numpy.empty((comp*max([x[2] for x in shranges]),naoaux))
-
-    for istep, sh_range in enumerate(shranges):
-        log.debug('int3c2e [%d/%d], AO [%d:%d], nrow = %d', \
-                  istep+1, len(shranges), *sh_range)
-        bstart, bend, nrow = sh_range
-        shls_slice = (bstart, bend, 0, mol.nbas, mol.nbas, mol.nbas+auxmol.nbas)
-        buf = gto.moleintor.getints3c(int3c, atm, bas, env, shls_slice, comp,
-                                      aosym, ao_loc, cintopt, out=bufs1)
-        if comp == 1:
-            store(buf, '%s/0/%d'%(dataname,istep))
-        else:
-            for icomp in range(comp):
-                store(buf[icomp], '%s/%d/%d'%(dataname,icomp,istep))
-        time1 = log.timer('gen CD eri [%d/%d]' % (istep+1,len(shranges)), *time1)
-    buf = bufs1 = None
+    def shls_slice(sh_range):
+        return (sh_range[0], sh_range[1], 0, mol.nbas,
+                mol.nbas, mol.nbas+auxmol.nbas)
+
+    if nproc > 1:
+        nthreads = max(1, lib.num_threads() // nproc)
+        args = [(int3c, atm, bas, env, shls_slice(sh_range), comp, aosym,
+                 ao_loc, nthreads) for sh_range in shranges]
+        blocks = lib.map_in_background(_int3c_block, args, depth=nproc,
+                                       nworkers=nproc, process=True)
+        bufs = None
+    else:
+        cintopt = gto.moleintor.make_cintopt(atm, bas, env, int3c)
+        # cderi may share the memory with the integral buffer.  Two buffers
+        # are used in turn so that the integrals are computed while the
+        # previous block is written to disk.
+        bufs = [numpy.empty((comp*max([x[2] for x in shranges]),naoaux))
+                for i in range(2)]
+        blocks = (gto.moleintor.getints3c(int3c, atm, bas, env,
+                                          shls_slice(sh_range), comp, aosym,
+                                          ao_loc, cintopt, out=bufs[istep%2])
+                  for istep, sh_range in enumerate(shranges))
+
+    with lib.call_in_background(save) as async_save:
+        for istep, buf in enumerate(blocks):
+            log.debug('int3c2e [%d/%d], AO [%d:%d], nrow = %d', \
+                      istep+1, len(shranges), *shranges[istep])
+            if comp == 1:
+                async_save('%s/0/%d'%(dataname,istep), store(buf))
+            else:
+                cderi = [store(buf[icomp]) for icomp in range(comp)]
+                for icomp in range(comp):
+                    async_save('%s/%d/%d'%(dataname,icomp,istep), cderi[icomp])
+                cderi = None
+            time1 = log.timer('gen CD eri [%d/%d]' % (istep+1,len(shranges)), *time1)
+    buf = bufs = None
 
     feri.close()
     return erifile
@@ -255,6 +310,7 @@ def general(mol, mo_coeffs, erifile, auxbasis='weigend+etb', dataname='eri_mo',
                 h5d_eri[row0:row1] = buf1
             else:
                 h5d_eri[icomp,row0:row1] = buf1
+            logger.count_io(nread=buf[:nrow].nbytes, nwritten=buf1.nbytes)
 
             ti0 = log.timer('step 2 [%d/%d], [%d,%d:%d], row = %d'%
                             (istep, totstep, icomp, row0, row1, nrow), *ti0)
@@ -266,6 +322,24 @@ def general(mol, mo_coeffs, erifile, auxbasis='weigend+etb', dataname='eri_mo',
     return erifile
 
 
+def _int3c_block(args):
+    '''Compute the (ij|L) integrals of one shell range in a worker process'''
+    int3c, atm, bas, env, shls_slice, comp, aosym, ao_loc, nthreads = args
+    # In the sync mode of lib.map_in_background this runs in the parent
+    # process, whose thread count is restored afterwards
+    libcgto = gto.moleintor.libcgto
+    try:
+        nthreads_bak = libcgto.omp_get_max_threads()
+        libcgto.omp_set_num_threads(nthreads)
+    except AttributeError:  # library compiled without OpenMP
+        nthreads_bak = None
+    try:
+        return gto.moleintor.getints3c(int3c, atm, bas, env, shls_slice, comp,
+                                       aosym, ao_loc)
+    finally:
+        if nthreads_bak is not None:
+            libcgto.omp_set_num_threads(nthreads_bak)
+
 def iden_coeffs(mo1, mo2):
     return (id(mo1) == id(mo2)) \
             or (mo1.shape==mo2.shape and numpy.allclose(mo1,mo2))
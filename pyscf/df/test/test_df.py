@@ -4,6 +4,8 @@
 
 import unittest
 import tempfile
+import time
+import threading
 import numpy
 import scipy.linalg
 import h5py
@@ -121,6 +123,10 @@ class KnowValues(unittest.TestCase):
         with h5py.File(ftmp.name) as feri:
             self.assertTrue(numpy.allclose(feri['eri_mo'], cderi0))
 
+        df.outcore.cholesky_eri(mol, ftmp.name, ioblk_size=.05, nproc=2)
+        with h5py.File(ftmp.name) as feri:
+            self.assertTrue(numpy.allclose(feri['eri_mo'], cderi0))
+
         nao = mol.nao_nr()
         naux = cderi0.shape[0]
         df.outcore.general(mol, (numpy.eye(nao),)*2, ftmp.name,
@@ -137,6 +143,10 @@ class KnowValues(unittest.TestCase):
         df.outcore.cholesky_eri(mol, ftmp.name, aosym='s1', ioblk_size=.05)
         with h5py.File(ftmp.name) as feri:
             self.assertTrue(numpy.allclose(feri['eri_mo'], cderi0.reshape(naux,-1)))
+        df.outcore.cholesky_eri(mol, ftmp.name, aosym='s1', ioblk_size=.05,
+                                nproc=3)
+        with h5py.File(ftmp.name) as feri:
+            self.assertTrue(numpy.allclose(feri['eri_mo'], cderi0.reshape(naux,-1)))
 
         numpy.random.seed(1)
         co = numpy.random.random((nao,4))
@@ -202,6 +212,100 @@ class KnowValues(unittest.TestCase):
         mo_eri1 = dfobj.ao2mo(mos)
         self.assertTrue(numpy.allclose(mo_eri0, mo_eri1))
 
+    def test_cderi_float32(self):
+        dfobj = df.DF(mol)
+        dfobj.build()
+        eri0 = ao2mo.restore(4, dfobj.get_eri(), mol.nao_nr())
+        diag = numpy.sqrt(numpy.diag(eri0))
+
+        # error bound 2u sqrt((ij|ij)(kl|kl)) of the float32 storage
+        u = 2.**-24
+        bound = (2*u+u**2) * numpy.einsum('i,j->ij', diag, diag)
+        dfobj1 = df.DF(mol)
+        dfobj1.cderi_dtype = 'f4'
+        dfobj1.build()
+        self.assertEqual(dfobj1._cderi.dtype, numpy.float32)
+        eri1 = ao2mo.restore(4, dfobj1.get_eri(), mol.nao_nr())
+        self.assertTrue(abs(eri1-eri0).max() > 0)
+        self.assertTrue((abs(eri1-eri0) <= bound + 1e-14).all())
+
+        ftmp = tempfile.NamedTemporaryFile(dir=lib.param.TMPDIR)
+        dfobj1 = df.DF(mol)
+        dfobj1.cderi_dtype = 'f4'
+        dfobj1.cderi_compression = 'gzip'
+        dfobj1._cderi_to_save = ftmp.name
+        dfobj1.blockdim = 37
+        dfobj1.build()
+        with h5py.File(ftmp.name, 'r') as feri:
+            self.assertEqual(feri['j3c'].dtype, numpy.float32)
+            self.assertEqual(feri['j3c'].compression, 'gzip')
+        eri1 = ao2mo.restore(4, dfobj1.get_eri(), mol.nao_nr())
+        self.assertTrue((abs(eri1-eri0) <= bound + 1e-14).all())
+
+        mf = scf.density_fit(scf.RHF(mol))
+        e0 = mf.scf()
+        mf = scf.density_fit(scf.RHF(mol))
+        mf.with_df = dfobj1
+        self.assertAlmostEqual(mf.scf(), e0, 6)
+
+    def test_loop_early_exit(self):
+        # DF tensor on disk, read by the prefetch thread of DF.loop
+        ftmp = tempfile.NamedTemporaryFile(dir=lib.param.TMPDIR)
+        df.outcore.cholesky_eri(mol, ftmp.name, auxbasis='weigend',
+                                dataname='j3c')
+        dfobj = df.DF(mol)
+        dfobj._cderi = ftmp.name
+        dfobj.blockdim = 20
+        with h5py.File(ftmp.name, 'r') as feri:
+            ref = numpy.asarray(feri['j3c'])
+        naux = ref.shape[0]
+        blocks = [eri1.copy() for eri1 in dfobj.loop()]
+        self.assertTrue(len(blocks) > 3)
+        # DF.prange alternates the order of the blocks between calls
+        ref = [ref[b0:b1] for b0, b1 in reversed(list(dfobj.prange(0, naux, 20)))]
+        self.assertAlmostEqual(abs(numpy.vstack(blocks)-numpy.vstack(ref)).max(), 0, 12)
+
+        # Quit on the last but one block while the reader is putting the end
+        # marker on the full queue
+        def fail_in_body():
+            for i, eri1 in enumerate(dfobj.loop()):
+                time.sleep(.3)
+                if i == len(blocks) - 2:
+                    raise KeyError
+        t = threading.Thread(target=self.assertRaises, args=(KeyError, fail_in_body))
+        t.daemon = True
+        t.start()
+        t.join(10)
+        self.assertFalse(t.is_alive())
+
+    def test_pivoted_cholesky_eri(self):
+        nao = mol.nao_nr()
+        eri0 = ao2mo.restore(4, mol.intor('int2e_sph', aosym='s8'), nao)
+        cderi = df.incore.pivoted_cholesky_eri(mol, tol=1e-8)
+        self.assertTrue(cderi.shape[0] < nao*(nao+1)//2)
+        self.assertTrue(abs(numpy.dot(cderi.T, cderi) - eri0).max() < 1e-8)
+        cderi1 = df.incore.pivoted_cholesky_eri(mol, tol=1e-8, max_vecs=20)
+        self.assertEqual(cderi1.shape[0], 20)
+
+        from pyscf import mp, cc
+        from pyscf.mp import dfmp2
+        from pyscf.cc import dfccsd
+        mf = scf.RHF(mol).run()
+        emp2 = mp.MP2(mf).kernel()[0]
+        mf1 = scf.density_fit(scf.RHF(mol))
+        mf1.with_df._cderi = cderi
+        mf1.kernel()
+        self.assertAlmostEqual(mf1.e_tot, mf.e_tot, 7)
+        self.assertAlmostEqual(dfmp2.MP2(mf1).kernel()[0], emp2, 7)
+
+        mycc = cc.CCSD(mf)
+        mycc.conv_tol = 1e-10
+        mycc.kernel()
+        mycc1 = dfccsd.CCSD(mf1)
+        mycc1.conv_tol = 1e-10
+        mycc1.kernel()
+        self.assertAlmostEqual(mycc1.e_corr, mycc.e_corr, 7)
+
     def test_default_auxbasis(self):
         mol = gto.M(atom='He 0 0 0; O 0 0 1', basis='ccpvdz')
         auxbasis = df.addons.make_auxbasis(mol)
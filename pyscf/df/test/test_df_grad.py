@@ -0,0 +1,96 @@
+import unittest
+import numpy
+from pyscf import lib
+from pyscf import gto
+from pyscf import scf
+from pyscf import dft
+from pyscf.df import df_grad
+
+mol = gto.M(
+    verbose = 5,
+    output = '/dev/null',
+    atom = '''
+        O     0    0        0
+        H     0    -0.757   0.587
+        H     0    0.757    0.6''',
+    basis = '631g',
+)
+
+def finite_diff(make_mf, ia, x, d=1e-4):
+    coords = mol.atom_coords()
+    coords[ia,x] += d
+    e1 = make_mf(mol.set_geom_(coords, unit='Bohr', inplace=False)).kernel()
+    coords[ia,x] -= d * 2
+    e2 = make_mf(mol.set_geom_(coords, unit='Bohr', inplace=False)).kernel()
+    return (e1 - e2) / (d * 2)
+
+
+class KnowValues(unittest.TestCase):
+    def test_rhf_grad(self):
+        make_mf = lambda mol: scf.RHF(mol).density_fit().set(conv_tol=1e-12)
+        g = make_mf(mol).run().nuc_grad_method().kernel()
+        self.assertAlmostEqual(g[2,2], finite_diff(make_mf, 2, 2), 7)
+        self.assertAlmostEqual(g[0,1], finite_diff(make_mf, 0, 1), 7)
+        self.assertAlmostEqual(abs(g.sum(axis=0)).max(), 0, 7)
+
+    def test_uhf_grad(self):
+        def make_mf(mol):
+            mol.charge = 1
+            mol.spin = 1
+            mol.build(False, False)
+            return scf.UHF(mol).density_fit().set(conv_tol=1e-12)
+        g = make_mf(mol.copy()).run().nuc_grad_method().kernel()
+        self.assertAlmostEqual(g[2,2], finite_diff(make_mf, 2, 2), 7)
+        self.assertAlmostEqual(g[0,1], finite_diff(make_mf, 0, 1), 7)
+
+    def test_rks_grad(self):
+        mf = dft.RKS(mol).density_fit()
+        mf.xc = 'b3lyp'
+        mf.conv_tol = 1e-12
+        mf.kernel()
+        g = mf.nuc_grad_method()
+        vhf = g.get_veff()
+        self.assertEqual(vhf.aux.shape, (mol.natm,3))
+        self.assertAlmostEqual(lib.finger(g.kernel()), -0.03444625363400629, 6)
+
+    def test_get_jk(self):
+        nao = mol.nao_nr()
+        numpy.random.seed(1)
+        dm = numpy.random.random((2,nao,nao)) - .5
+        dm = dm + dm.transpose(0,2,1)
+        with_df = scf.RHF(mol).density_fit().with_df
+        vj, vk = df_grad.get_jk(with_df, dm)
+        self.assertEqual(vj.shape, (2,3,nao,nao))
+        self.assertEqual(vj.aux.shape, (2,2,mol.natm,3))
+        self.assertEqual(vk.aux.shape, (2,mol.natm,3))
+        # Small memory, the intermediates are saved on disk
+        vj1, vk1 = df_grad.get_jk(with_df, dm, max_memory=1)
+        self.assertTrue(numpy.allclose(vj1, vj, atol=1e-11))
+        self.assertTrue(numpy.allclose(vk1, vk, atol=1e-11))
+        self.assertAlmostEqual(abs(vj1.aux-vj.aux).max(), 0, 11)
+        self.assertAlmostEqual(abs(vk1.aux-vk.aux).max(), 0, 11)
+
+        vj1 = df_grad.get_jk(with_df, dm[0], with_k=False)[0]
+        self.assertTrue(numpy.allclose(vj1, vj[0], atol=1e-11))
+        self.assertAlmostEqual(abs(vj1.aux-vj.aux[0,0]).max(), 0, 11)
+        vk1 = df_grad.get_jk(with_df, dm[1], with_j=False)[1]
+        self.assertTrue(numpy.allclose(vk1, vk[1], atol=1e-11))
+        self.assertAlmostEqual(abs(vk1.aux-vk.aux[1]).max(), 0, 11)
+
+    def test_rhf_scanner(self):
+        mf_scanner = scf.RHF(mol).density_fit().set(conv_tol=1e-12)
+        mf_scanner = mf_scanner.nuc_grad_method().as_scanner()
+        e, de = mf_scanner(mol)
+        geom = 'O 0 0 0; H 0 -0.757 0.587; H 0 0.757 0.7'
+        e1, de1 = mf_scanner(geom)
+
+        mol1 = mol.set_geom_(geom, inplace=False)
+        mf = scf.RHF(mol1).density_fit().run(conv_tol=1e-12)
+        self.assertAlmostEqual(e1, mf.e_tot, 9)
+        self.assertAlmostEqual(abs(de1-mf.nuc_grad_method().kernel()).max(), 0, 6)
+        self.assertTrue(abs(de1-de).max() > 1e-3)
+
+
+if __name__ == "__main__":
+    print("Full Tests for DF gradients")
+    unittest.main()
@@ -3,6 +3,7 @@
 #
 
 import unittest
+from functools import reduce
 import numpy
 import scipy.linalg
 from pyscf import lib
@@ -101,6 +102,32 @@ class KnowValues(unittest.TestCase):
         vhf0 = vj1 - vk1 * .5
         self.assertTrue(numpy.allclose(vhf0, vhf1))
 
+    def test_jk_low_rank_dms(self):
+        mf = scf.density_fit(scf.RHF(mol), auxbasis='weigend')
+        mf.kernel()
+        nao = mol.nao_nr()
+        nocc = mol.nelectron // 2
+        orbo = mf.mo_coeff[:,:nocc]
+        orbv = mf.mo_coeff[:,nocc:]
+        numpy.random.seed(1)
+        x = numpy.random.random((3,nocc,nao-nocc))
+        # Transition density matrices as in CPHF or TDDFT
+        dm = numpy.array([reduce(numpy.dot, (orbo, xi, orbv.T)) for xi in x])
+        dm = numpy.vstack((dm, dm+dm.transpose(0,2,1), mf.make_rdm1()[None]))
+        self.assertEqual(df_jk._factorize_dm(dm[0])[0].shape[1], nocc)
+        self.assertEqual(df_jk._factorize_dm(dm[3])[0].shape[1], nocc*2)
+        self.assertTrue(df_jk._factorize_dm(dm[6])[1] is None)
+
+        naux = mf._cderi.shape[0]
+        cderi = lib.unpack_tril(mf._cderi)
+        vj0 = numpy.einsum('pij,pkl,xkl->xij', cderi, cderi, dm)
+        vk0 = numpy.einsum('pij,pkl,xjk->xil', cderi, cderi, dm)
+        vj1, vk1 = df_jk.get_jk(mf.with_df, dm, hermi=0)
+        self.assertAlmostEqual(abs(vj0-vj1).max(), 0, 11)
+        self.assertAlmostEqual(abs(vk0-vk1).max(), 0, 11)
+        vj1 = df_jk.get_jk(mf.with_df, dm, with_k=False)[0]
+        self.assertAlmostEqual(abs(vj0-vj1).max(), 0, 11)
+
     def test_uhf_veff(self):
         mf = scf.density_fit(scf.UHF(mol), auxbasis='weigend')
         nao = mol.nao_nr()
@@ -21,6 +21,10 @@ from pyscf.dft import radi
 
 libdft = lib.load_library('libdft')
 BLKSIZE = 128  # needs to be the same to lib/gto/grid_ao_drv.c
+# Edge length (in Bohr) of the boxes to group grids, see arg_group_grids
+GROUP_BOX_SIZE = 1.2
+# Number of grids in each block of the screened Becke partition
+PARTITION_BLKSIZE = 256
 
 # ~= (L+1)**2/3
 LEBEDEV_ORDER = {
@@ -268,70 +272,186 @@ def gen_atomic_grids(mol, atom_grid={}, radi_method=radi.gauss_chebyshev,
 
 def gen_partition(mol, atom_grids_tab,
                   radii_adjust=None, atomic_radii=radi.BRAGG_RADII,
-                  becke_scheme=original_becke):
+                  becke_scheme=original_becke, rcut=None):
     '''Generate the mesh grid coordinates and weights for DFT numerical integration.
     We can change radii_adjust, becke_scheme functions to generate different meshgrid.
 
+    Kwargs:
+        rcut : float
+            Cutoff distance (in Bohr) of the atom pairs in the Becke cell
+            functions.  The cell function of atom i only includes the pair
+            factors of the atoms within rcut.  Atom i is excluded from the
+            partition on the grids where the distance to atom i is larger
+            than the distance to the nearest atom plus rcut.  The grids
+            are processed in spatially compact blocks, so that the cost is
+            linear in the number of atoms for large systems.  The partition
+            is the original Becke partition if rcut is None or 0 or if all
+            atom pairs are within rcut.
+
+            The screening is an approximation.  The pair factors of
+            original_becke decay slowly and are not negligible at large
+            distances, so that the error can be noticeable (~1e-3 in the
+            integrated density of a 40-atom H chain at rcut = 20).  The pair
+            factors of stratmann are exactly 1 beyond a finite range, and the
+            screened partition agrees to ~1e-8 with the exact one for rcut
+            around 50 Bohr.
+
     Returns:
         grid_coord and grid_weight arrays.  grid_coord array has shape (N,3);
         weight 1D array has N elements.
     '''
+    natm = mol.natm
     if callable(radii_adjust) and atomic_radii is not None:
         f_radii_adjust = radii_adjust(mol, atomic_radii)
     else:
         f_radii_adjust = None
     atm_coords = numpy.asarray(mol.atom_coords() , order='C')
     atm_dist = radi._inter_distance(mol)
+    if rcut is None or rcut <= 0 or atm_dist.max() <= rcut:
+        pair_mask = None
+    else:
+        pair_mask = atm_dist <= rcut
+
     if (becke_scheme == original_becke and
         (f_radii_adjust is None or
          radii_adjust in (radi.treutler_atomic_radii_adjust,
                           radi.becke_atomic_radii_adjust))):
-        if f_radii_adjust is None:
-            p_radii_table = lib.c_null_ptr()
-        else:
+        if f_radii_adjust is not None:
             f_radii_table = numpy.asarray([f_radii_adjust(i, j, 0)
-                                           for i in range(mol.natm)
-                                           for j in range(mol.natm)])
-            p_radii_table = f_radii_table.ctypes.data_as(ctypes.c_void_p)
-        def gen_grid_partition(coords):
+                                           for i in range(natm)
+                                           for j in range(natm)])
+            f_radii_table = f_radii_table.reshape(natm,natm)
+        def gen_grid_partition(coords, atm_idx):
             coords = numpy.asarray(coords, order='F')
             ngrids = coords.shape[0]
-            pbecke = numpy.empty((mol.natm,ngrids))
-            libdft.VXCgen_grid(pbecke.ctypes.data_as(ctypes.c_void_p),
-                               coords.ctypes.data_as(ctypes.c_void_p),
-                               atm_coords.ctypes.data_as(ctypes.c_void_p),
-                               p_radii_table,
-                               ctypes.c_int(mol.natm), ctypes.c_int(ngrids))
+            nsub = len(atm_idx)
+            sub_coords = numpy.asarray(atm_coords[atm_idx], order='C')
+            if f_radii_adjust is None:
+                p_radii_table = lib.c_null_ptr()
+            else:
+                radii_table = numpy.asarray(f_radii_table[atm_idx[:,None],atm_idx],
+                                            order='C')
+                p_radii_table = radii_table.ctypes.data_as(ctypes.c_void_p)
+            if pair_mask is None:
+                p_mask = lib.c_null_ptr()
+            else:
+                mask = numpy.asarray(pair_mask[atm_idx[:,None],atm_idx],
+                                     dtype=numpy.uint8, order='C')
+                p_mask = mask.ctypes.data_as(ctypes.c_void_p)
+            pbecke = numpy.empty((nsub,ngrids))
+            libdft.VXCgen_grid_masked(pbecke.ctypes.data_as(ctypes.c_void_p),
+                                      coords.ctypes.data_as(ctypes.c_void_p),
+                                      sub_coords.ctypes.data_as(ctypes.c_void_p),
+                                      p_radii_table, p_mask,
+                                      ctypes.c_int(nsub), ctypes.c_int(ngrids))
             return pbecke
     else:
-        def gen_grid_partition(coords):
+        def gen_grid_partition(coords, atm_idx):
             ngrids = coords.shape[0]
-            grid_dist = numpy.empty((mol.natm,ngrids))
-            for ia in range(mol.natm):
+            nsub = len(atm_idx)
+            grid_dist = numpy.empty((nsub,ngrids))
+            for i, ia in enumerate(atm_idx):
                 dc = coords - atm_coords[ia]
-                grid_dist[ia] = numpy.sqrt(numpy.einsum('ij,ij->i',dc,dc))
-            pbecke = numpy.ones((mol.natm,ngrids))
-            for i in range(mol.natm):
-                for j in range(i):
-                    g = 1/atm_dist[i,j] * (grid_dist[i]-grid_dist[j])
-                    if f_radii_adjust is not None:
-                        g = f_radii_adjust(i, j, g)
-                    g = becke_scheme(g)
-                    pbecke[i] *= .5 * (1-g)
-                    pbecke[j] *= .5 * (1+g)
+                grid_dist[i] = numpy.sqrt(numpy.einsum('ij,ij->i',dc,dc))
+            pbecke = numpy.ones((nsub,ngrids))
+            for i, ia in enumerate(atm_idx):
+                # Vectorize over the atoms j < i which are paired with atom i
+                ja = atm_idx[:i]
+                if pair_mask is not None:
+                    ja = ja[pair_mask[ia,ja]]
+                if ja.size == 0:
+                    continue
+                j = numpy.searchsorted(atm_idx, ja)
+                g = (grid_dist[i] - grid_dist[j]) / atm_dist[ia,ja,None]
+                if f_radii_adjust is not None:
+                    for k, jk in enumerate(ja):
+                        g[k] = f_radii_adjust(ia, jk, g[k])
+                g = becke_scheme(g)
+                pbecke[i] *= numpy.prod(.5 * (1-g), axis=0)
+                pbecke[j] *= .5 * (1+g)
             return pbecke
 
+    all_atoms = numpy.arange(natm)
     coords_all = []
     weights_all = []
-    for ia in range(mol.natm):
+    for ia in range(natm):
         coords, vol = atom_grids_tab[mol.atom_symbol(ia)]
         coords = coords + atm_coords[ia]
-        pbecke = gen_grid_partition(coords)
-        weights = vol * pbecke[ia] * (1./pbecke.sum(axis=0))
+        if pair_mask is None:
+            pbecke = gen_grid_partition(coords, all_atoms)
+            weights = vol * pbecke[ia] * (1./pbecke.sum(axis=0))
+        else:
+            idx = arg_group_grids(mol, coords)
+            weights = numpy.empty_like(vol)
+            for p0, p1 in prange(0, vol.size, PARTITION_BLKSIZE):
+                blk = idx[p0:p1]
+                weights[blk] = vol[blk] * \
+                        _partition_block(coords[blk], ia, atm_coords,
+                                         pair_mask, rcut, gen_grid_partition)
         coords_all.append(coords)
         weights_all.append(weights)
     return numpy.vstack(coords_all), numpy.hstack(weights_all)
 
+def _partition_block(coords, ia, atm_coords, pair_mask, rcut,
+                     gen_grid_partition):
+    '''Becke weights of atom ia on a spatially compact block of grids.  Only
+    the atoms close to the block (and their neighbours) are evaluated.
+    '''
+    center = coords.mean(axis=0)
+    dr = coords - center
+    radius = numpy.sqrt(numpy.einsum('ij,ij->i', dr, dr).max())
+    dr = atm_coords - center
+    dc = numpy.sqrt(numpy.einsum('ij,ij->i', dr, dr))
+    # Candidates: atoms which may satisfy r_i <= min(r_j) + rcut on the block
+    cand = numpy.where(dc - radius <= dc.min() + radius + rcut)[0]
+    if ia not in cand:
+        return 0
+    # The atoms paired with the candidates
+    atm_idx = numpy.where(pair_mask[cand].any(axis=0))[0]
+    pbecke = gen_grid_partition(coords, atm_idx)
+
+    cand = numpy.searchsorted(atm_idx, cand)
+    grid_dist = numpy.empty((cand.size,coords.shape[0]))
+    for k, i in enumerate(atm_idx[cand]):
+        dr = coords - atm_coords[i]
+        grid_dist[k] = numpy.sqrt(numpy.einsum('ij,ij->i', dr, dr))
+    pcand = pbecke[cand]
+    pcand[grid_dist > grid_dist.min(axis=0) + rcut] = 0
+    # The numerator of atom ia is dropped on the grids where it is dropped
+    # from the denominator, so that the weights do not exceed 1
+    return pcand[list(atm_idx[cand]).index(ia)] / pcand.sum(axis=0)
+
+def arg_group_grids(mol, coords, box_size=GROUP_BOX_SIZE):
+    '''Partition the space into cubic boxes of edge length box_size and group
+    the grids against these boxes.  The boxes are ordered along the Morton
+    (Z-order) curve, which is the depth-first traversal of the octree built
+    on the boxes.  Grids in the same box are kept in the input order.
+
+    Grouping the spatially close grids in the same block makes the mask
+    non0tab sparse, so that the cost of eval_ao, eval_rho and eval_mat
+    scales with the number of significant AO shells in each block.
+
+    Returns:
+        The indices to sort the grids.
+    '''
+    coords = numpy.asarray(coords)
+    ngrids = coords.shape[0]
+    if ngrids == 0 or box_size is None or box_size <= 0:
+        return numpy.arange(ngrids)
+
+    boxes = numpy.floor((coords - coords.min(axis=0)) / box_size)
+    boxes = numpy.asarray(boxes, dtype=numpy.uint64)
+    nbits = int(boxes.max()).bit_length()
+    # 21 bits for each direction to fit the Morton code in 64 bits
+    assert(nbits <= 21)
+    code = numpy.zeros(ngrids, dtype=numpy.uint64)
+    one = numpy.uint64(1)
+    for i in range(nbits):
+        for x in range(3):
+            bit = (boxes[:,x] >> numpy.uint64(i)) & one
+            code |= bit << numpy.uint64(i*3+2-x)
+    return numpy.argsort(code, kind='mergesort')
+
 def make_mask(mol, coords, relativity=0, shls_slice=None, verbose=None):
     '''Mask to indicate whether a shell is zero on grid
 
@@ -415,6 +535,18 @@ class Grids(lib.StreamObject):
         symmetry : bool
             whether to symmetrize mesh grids (TODO)
 
+        box_size : float
+            Grids are grouped in cubic boxes of this edge length (in Bohr) to
+            improve the sparsity of non0tab, see :func:`arg_group_grids`.
+            Setting it to None keeps the grids in the order of atoms.
+
+        becke_rcut : float
+            Cutoff distance (in Bohr) of the atom pairs in the Becke
+            partition, see :func:`gen_partition`.  The screening is
+            approximate and is meant to be used with becke_scheme = stratmann
+            and a conservative cutoff (~50 Bohr).  Default is None, the exact
+            partition.
+
         atom_grid : dict
             Set (radial, angular) grids for particular atoms.
             Eg, grids.atom_grid = {'H': (20,110)} will generate 20 radial
@@ -451,6 +583,8 @@ class Grids(lib.StreamObject):
         self.prune = nwchem_prune
         self.symmetry = mol.symmetry
         self.atom_grid = {}
+        self.box_size = GROUP_BOX_SIZE
+        self.becke_rcut = None
         self.non0tab = None
 
 ##################################################
@@ -471,6 +605,9 @@ class Grids(lib.StreamObject):
             logger.debug2(self, 'atomic_radii : %s', self.atomic_radii)
         if self.atom_grid:
             logger.info(self, 'User specified grid scheme %s', str(self.atom_grid))
+        logger.info(self, 'box size to group grids: %s', self.box_size)
+        logger.info(self, 'cutoff of atom pairs in becke partition: %s',
+                    self.becke_rcut)
         return self
 
     def build(self, mol=None, with_non0tab=False):
@@ -483,7 +620,11 @@ class Grids(lib.StreamObject):
         self.coords, self.weights = \
                 self.gen_partition(mol, atom_grids_tab,
                                    self.radii_adjust, self.atomic_radii,
-                                   self.becke_scheme)
+                                   self.becke_scheme, self.becke_rcut)
+        if self.box_size is not None:
+            idx = arg_group_grids(mol, self.coords, self.box_size)
+            self.coords = self.coords[idx]
+            self.weights = self.weights[idx]
         if with_non0tab:
             self.non0tab = self.make_mask(mol, self.coords)
         else:
@@ -515,10 +656,10 @@ class Grids(lib.StreamObject):
     @lib.with_doc(gen_partition.__doc__)
     def gen_partition(self, mol, atom_grids_tab,
                       radii_adjust=None, atomic_radii=radi.BRAGG_RADII,
-                      becke_scheme=original_becke):
+                      becke_scheme=original_becke, rcut=None):
         ''' See gen_grid.gen_partition function'''
         return gen_partition(mol, atom_grids_tab, radii_adjust, atomic_radii,
-                             becke_scheme)
+                             becke_scheme, rcut)
 
     @property
     def prune_scheme(self):
@@ -4,6 +4,7 @@
 #
 
 import ctypes
+import weakref
 import numpy
 import scipy.linalg
 from pyscf import lib
@@ -1276,8 +1277,21 @@ def large_rho_indices(ni, mol, dm, grids, cutoff=1e-10, max_memory=2000):
 
 
 class _NumInt(object):
+    '''Numerical integration methods for non-relativistic RKS and UKS
+
+    Attributes:
+        cache_ao : bool
+            Whether to keep the AO values in memory and reuse them in the
+            next calls on the same grids (eg in the SCF iterations, TDDFT
+            and the nuclear gradients).  The cache takes at most half of the
+            max_memory given to :meth:`block_loop`.  The AO values of the
+            grids which do not fit in the cache are recomputed.  Default is
+            False.
+    '''
     def __init__(self):
         self.libxc = libxc
+        self.cache_ao = False
+        self._ao_cache = weakref.WeakKeyDictionary()
 
     def nr_vxc(self, mol, grids, xc_code, dms, spin=0, relativity=0, hermi=0,
                max_memory=2000, verbose=None):
@@ -1323,9 +1337,20 @@ class _NumInt(object):
     def block_loop(self, mol, grids, nao, deriv=0, max_memory=2000,
                    non0tab=None, blksize=None, buf=None):
         '''Define this macro to loop over grids by blocks.
+
+        If :attr:`cache_ao` is set and non0tab, blksize and buf are not
+        given, the AO values are taken from the AO cache of the grids.  The
+        AO values from the cache are read-only.
         '''
         if grids.coords is None:
             grids.build(with_non0tab=True)
+        if not self.cache_ao:
+            self._ao_cache.clear()
+        elif non0tab is None and blksize is None and buf is None:
+            for x in self._cached_block_loop(mol, grids, nao, deriv, max_memory):
+                yield x
+            return
+
         ngrids = grids.weights.size
         comp = (deriv+1)*(deriv+2)*(deriv+3)//6
 # NOTE to index grids.non0tab, the blksize needs to be the integer multiplier of BLKSIZE
@@ -1347,6 +1372,61 @@ class _NumInt(object):
             ao = self.eval_ao(mol, coords, deriv=deriv, non0tab=non0, out=buf)
             yield ao, non0, weight, coords
 
+    def _cached_block_loop(self, mol, grids, nao, deriv=0, max_memory=2000):
+        '''block_loop with the AO values stored in self._ao_cache.  The cache
+        is rebuilt when the grids or the molecule are updated or when higher
+        AO derivatives are required.
+        '''
+        ngrids = grids.weights.size
+        key = (mol._atm, mol._bas, mol._env, grids.coords, grids.non0tab)
+        cache = self._ao_cache.get(grids)
+        if (cache is None or cache['deriv'] < deriv or
+            any(x is not y for x, y in zip(cache['key'], key))):
+            comp = (deriv+1)*(deriv+2)*(deriv+3)//6
+            blksize = min(int(max_memory*1e6/(comp*2*nao*8*BLKSIZE))*BLKSIZE, ngrids)
+            blksize = max(blksize, BLKSIZE)
+            non0tab = grids.non0tab
+            if non0tab is None:
+                non0tab = numpy.ones(((ngrids+BLKSIZE-1)//BLKSIZE,mol.nbas),
+                                     dtype=numpy.uint8)
+            cache = self._ao_cache[grids] = {
+                'key': key, 'deriv': deriv, 'blksize': blksize,
+                'non0tab': non0tab, 'ao': [], 'full': False,
+                'max_memory': max_memory * .5}
+        cache_deriv = cache['deriv']
+        cache_comp = (cache_deriv+1)*(cache_deriv+2)*(cache_deriv+3)//6
+        comp = (deriv+1)*(deriv+2)*(deriv+3)//6
+        blksize = cache['blksize']
+        non0tab = cache['non0tab']
+        ao_cached = cache['ao']
+        buf = None
+        for iblk, ip0 in enumerate(range(0, ngrids, blksize)):
+            ip1 = min(ngrids, ip0+blksize)
+            coords = grids.coords[ip0:ip1]
+            weight = grids.weights[ip0:ip1]
+            non0 = non0tab[ip0//BLKSIZE:]
+            if iblk == len(ao_cached) and not cache['full']:
+                size = len(ao_cached) * cache_comp*blksize*nao*8e-6
+                if size + cache_comp*blksize*nao*8e-6 < cache['max_memory']:
+                    ao = self.eval_ao(mol, coords, deriv=cache_deriv, non0tab=non0)
+                    ao.flags.writeable = False
+                    ao_cached.append(ao)
+                else:
+                    cache['full'] = True
+
+            if iblk < len(ao_cached):
+                ao = ao_cached[iblk]
+                if cache_deriv > deriv:
+                    if deriv == 0:
+                        ao = ao[0]
+                    else:
+                        ao = ao[:comp]
+            else:
+                if buf is None:
+                    buf = numpy.empty((comp,blksize,nao))
+                ao = self.eval_ao(mol, coords, deriv=deriv, non0tab=non0, out=buf)
+            yield ao, non0, weight, coords
+
     def _gen_rho_evaluator(self, mol, dms, hermi=0):
         if hasattr(dms, 'mo_coeff'):
             mo_coeff = dms.mo_coeff
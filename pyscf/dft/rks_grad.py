@@ -41,7 +41,11 @@ def get_veff(ks_grad, mol=None, dm=None):
     else:
         vj, vk = ks_grad.get_jk(mol, dm)
         vhf = vj - vk * (hyb * .5)
+        if hasattr(vj, 'aux'):
+            vhf = pyscf.lib.tag_array(vhf, aux=vj.aux - vk.aux * (hyb * .5))
 
+    if hasattr(vhf, 'aux'):
+        return pyscf.lib.tag_array(vhf + vxc, aux=vhf.aux)
     return vhf + vxc
 
 
@@ -82,8 +82,78 @@ class KnowValues(unittest.TestCase):
         grid.build()
         coords = grid.coords*10.
         non0 = gen_grid.make_mask(h2o, coords)
-        self.assertEqual(non0.sum(), 106)
-        self.assertAlmostEqual(lib.finger(non0), -0.81399929716237085, 9)
+        self.assertEqual(non0.sum(), 93)
+        self.assertAlmostEqual(lib.finger(non0), -2.651667113897764, 9)
+
+    def test_arg_group_grids(self):
+        mol = gto.M(atom=[('H', (0,0,i*3)) for i in range(8)], basis='ccpvdz')
+        grid = gen_grid.Grids(mol)
+        grid.atom_grid = {"H": (20, 110)}
+        grid.box_size = None
+        coords0, weights0 = grid.build()
+        non0tab0 = grid.make_mask(mol, coords0)
+
+        grid.box_size = gen_grid.GROUP_BOX_SIZE
+        coords, weights = grid.build(with_non0tab=True)
+        self.assertEqual(coords.shape, coords0.shape)
+        self.assertAlmostEqual(abs(numpy.sort(weights)-numpy.sort(weights0)).max(), 0, 12)
+        self.assertAlmostEqual(abs(weights.sum()-weights0.sum()), 0, 9)
+        self.assertTrue(grid.non0tab.sum() < non0tab0.sum())
+
+        # Grids in the same box are adjacent
+        idx = gen_grid.arg_group_grids(mol, coords0, 1.2)
+        boxes = numpy.floor((coords0[idx]-coords0.min(axis=0))/1.2).astype(int)
+        boxes = [tuple(x) for x in boxes]
+        nchange = sum(1 for i in range(1, len(boxes)) if boxes[i] != boxes[i-1])
+        self.assertEqual(nchange+1, len(set(boxes)))
+
+    def test_becke_rcut(self):
+        # 30-atom H chain, 66 Bohr long
+        mol = gto.M(atom=[('H', (0,(i%2)*.8,i*1.2)) for i in range(30)], basis='sto3g')
+        grid = gen_grid.Grids(mol)
+        self.assertTrue(grid.becke_rcut is None)
+        atom_grids_tab = grid.gen_atomic_grids(mol, {"H": (20, 50)})
+        atm_coords = mol.atom_coords()
+        def rho(coords):
+            dr = coords[:,None,:] - atm_coords
+            return numpy.exp(-numpy.sqrt(numpy.einsum('gax,gax->ga', dr, dr))).sum(axis=1)
+
+        for becke_scheme in (gen_grid.original_becke, gen_grid.stratmann):
+            coords0, weights0 = gen_grid.gen_partition(
+                mol, atom_grids_tab, radi.treutler_atomic_radii_adjust,
+                radi.BRAGG_RADII, becke_scheme)
+            coords1, weights1 = gen_grid.gen_partition(
+                mol, atom_grids_tab, radi.treutler_atomic_radii_adjust,
+                radi.BRAGG_RADII, becke_scheme, rcut=100.)
+            self.assertAlmostEqual(abs(coords1-coords0).max(), 0, 12)
+            self.assertAlmostEqual(abs(weights1-weights0).max(), 0, 12)
+
+        coords1, weights1 = gen_grid.gen_partition(
+            mol, atom_grids_tab, radi.treutler_atomic_radii_adjust,
+            radi.BRAGG_RADII, gen_grid.stratmann, rcut=50.)
+        self.assertAlmostEqual(abs(coords1-coords0).max(), 0, 12)
+        self.assertAlmostEqual(abs(weights1-weights0).max(), 0, 8)
+        self.assertAlmostEqual(numpy.dot(weights1, rho(coords1)),
+                               numpy.dot(weights0, rho(coords0)), 10)
+
+        # The screened partition of the original Becke scheme is approximate
+        vol = numpy.hstack([atom_grids_tab['H'][1]] * mol.natm)
+        coords0, weights0 = gen_grid.gen_partition(
+            mol, atom_grids_tab, radi.treutler_atomic_radii_adjust,
+            radi.BRAGG_RADII, gen_grid.original_becke)
+        nelec0 = numpy.dot(weights0, rho(coords0))
+        coords1, weights1 = gen_grid.gen_partition(
+            mol, atom_grids_tab, radi.treutler_atomic_radii_adjust,
+            radi.BRAGG_RADII, gen_grid.original_becke, rcut=30.)
+        self.assertAlmostEqual(abs((weights1-weights0)/vol).max(), 0, 2)
+        self.assertAlmostEqual(numpy.dot(weights1, rho(coords1)), nelec0, 3)
+        # Atoms beyond rcut are dropped from the numerator and the
+        # denominator of the partition alike
+        coords1, weights1 = gen_grid.gen_partition(
+            mol, atom_grids_tab, radi.treutler_atomic_radii_adjust,
+            radi.BRAGG_RADII, gen_grid.original_becke, rcut=2.)
+        self.assertTrue(abs(weights1/vol).max() <= 1+1e-12)
+        self.assertTrue(abs(numpy.dot(weights1, rho(coords1))/nelec0-1) < .02)
 
 
 
@@ -27,9 +27,9 @@ def finger(a):
 class KnowValues(unittest.TestCase):
     def test_make_mask(self):
         non0 = dft.numint.make_mask(mol, mf.grids.coords)
-        self.assertEqual(non0.sum(), 10244)
-        self.assertAlmostEqual(finger(non0), -2.6880474684794895, 9)
-        self.assertAlmostEqual(finger(numpy.cos(non0)), 2.5961863522983433, 9)
+        self.assertEqual(non0.sum(), 9576)
+        self.assertAlmostEqual(finger(non0), -12.909393343009064, 9)
+        self.assertAlmostEqual(finger(numpy.cos(non0)), 7.292615291718439, 9)
 
     def test_dot_ao_dm(self):
         non0tab = dft.numint.make_mask(mol, mf.grids.coords)
@@ -117,6 +117,34 @@ class KnowValues(unittest.TestCase):
         v = ni.nr_uks_fxc(mol, mf.grids, 'B88', dm0, dms)
         self.assertAlmostEqual(finger(v), 403.56257213149746, 8)
 
+    def test_cache_ao(self):
+        numpy.random.seed(10)
+        nao = mol.nao_nr()
+        dm = numpy.random.random((nao,nao))
+        dm = dm + dm.T
+        ni = dft.numint._NumInt()
+        ref = ni.nr_rks(mol, mf.grids, 'B88', dm)
+
+        ni.cache_ao = True
+        for max_memory in (2000, 100):
+            ni._ao_cache.clear()
+            v0 = ni.nr_rks(mol, mf.grids, 'B88', dm, max_memory=max_memory)
+            cache = ni._ao_cache[mf.grids]
+            self.assertEqual(cache['full'], max_memory == 100)
+            self.assertTrue(len(cache['ao']) > 0)
+            v1 = ni.nr_rks(mol, mf.grids, 'B88', dm, max_memory=max_memory)
+            self.assertTrue(ni._ao_cache[mf.grids] is cache)
+            self.assertAlmostEqual(abs(v0[2]-ref[2]).max(), 0, 12)
+            self.assertAlmostEqual(abs(v1[2]-ref[2]).max(), 0, 12)
+
+        # LDA reuses the cached AO values of GGA
+        v0 = ni.nr_rks(mol, mf.grids, 'LDA', dm)
+        self.assertTrue(ni._ao_cache[mf.grids] is cache)
+        ni.cache_ao = False
+        v1 = ni.nr_rks(mol, mf.grids, 'LDA', dm)
+        self.assertEqual(len(ni._ao_cache), 0)
+        self.assertAlmostEqual(abs(v0[2]-v1[2]).max(), 0, 12)
+
 if __name__ == "__main__":
     print("Test numint")
     unittest.main()
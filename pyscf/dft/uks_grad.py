@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+'''Non-relativistic UKS gradients'''
+
+import time
+import numpy
+import pyscf.lib
+from pyscf.lib import logger
+from pyscf.scf import uhf_grad
+from pyscf.dft import numint
+from pyscf.dft import rks_grad
+
+
+def get_veff(ks_grad, mol=None, dm=None):
+    '''Coulomb + XC functional
+    '''
+    if mol is None: mol = ks_grad.mol
+    if dm is None: dm = ks_grad._scf.make_rdm1()
+    t0 = (time.clock(), time.time())
+
+    mf = ks_grad._scf
+    if mf.grids.coords is None:
+        mf.grids.build(with_non0tab=True)
+    hyb = mf._numint.libxc.hybrid_coeff(mf.xc, spin=mol.spin)
+
+    mem_now = pyscf.lib.current_memory()[0]
+    max_memory = max(2000, ks_grad.max_memory*.9-mem_now)
+    vxc = get_vxc(mf._numint, mol, mf.grids, mf.xc, dm,
+                  max_memory=max_memory, verbose=ks_grad.verbose)
+    t0 = logger.timer(ks_grad, 'vxc', *t0)
+
+    if abs(hyb) < 1e-10:
+        vj = ks_grad.get_j(mol, dm)
+        vhf = vj[0] + vj[1]
+        if hasattr(vj, 'aux'):
+            vhf = pyscf.lib.tag_array(vhf, aux=vj.aux.sum(axis=(0,1)))
+    else:
+        vj, vk = ks_grad.get_jk(mol, dm)
+        vhf = vj[0] + vj[1] - vk * hyb
+        if hasattr(vj, 'aux'):
+            vhf = pyscf.lib.tag_array(vhf, aux=vj.aux.sum(axis=(0,1)) -
+                                      vk.aux.sum(axis=0) * hyb)
+
+    if hasattr(vhf, 'aux'):
+        return pyscf.lib.tag_array(vhf + vxc, aux=vhf.aux)
+    return vhf + vxc
+
+
+def get_vxc(ni, mol, grids, xc_code, dms, relativity=0, hermi=1,
+            max_memory=2000, verbose=None):
+    '''Gradients of the XC potential matrices (alpha,beta) for the density
+    matrices dms = (dm_alpha,dm_beta)
+    '''
+    xctype = ni._xc_type(xc_code)
+    shls_slice = (0, mol.nbas)
+    ao_loc = mol.ao_loc_nr()
+
+    dma, dmb = numint._format_uks_dm(dms)
+    nao = dma.shape[-1]
+    make_rhoa = ni._gen_rho_evaluator(mol, dma, hermi)[0]
+    make_rhob = ni._gen_rho_evaluator(mol, dmb, hermi)[0]
+
+    vmat = numpy.zeros((2,3,nao,nao))
+    if xctype == 'LDA':
+        ao_deriv = 1
+        for ao, mask, weight, coords \
+                in ni.block_loop(mol, grids, nao, ao_deriv, max_memory):
+            rho_a = make_rhoa(0, ao[0], mask, 'LDA')
+            rho_b = make_rhob(0, ao[0], mask, 'LDA')
+            vxc = ni.eval_xc(xc_code, (rho_a,rho_b), 1, relativity, 1, verbose)[1]
+            vrho = vxc[0]
+            for s in range(2):
+                aow = numpy.einsum('pi,p->pi', ao[0], weight*vrho[:,s])
+                for x in range(3):
+                    vmat[s,x] += numint._dot_ao_ao(mol, ao[x+1], aow, mask,
+                                                   shls_slice, ao_loc)
+            rho_a = rho_b = vxc = vrho = aow = None
+    elif xctype == 'GGA':
+        ao_deriv = 2
+        for ao, mask, weight, coords \
+                in ni.block_loop(mol, grids, nao, ao_deriv, max_memory):
+            rho_a = make_rhoa(0, ao[:4], mask, 'GGA')
+            rho_b = make_rhob(0, ao[:4], mask, 'GGA')
+            vxc = ni.eval_xc(xc_code, (rho_a,rho_b), 1, relativity, 1, verbose)[1]
+            vrho, vsigma = vxc[:2]
+            wv = numpy.empty_like(rho_a)
+            wv[0]  = weight * vrho[:,0]
+            wv[1:] = rho_a[1:] * (weight * vsigma[:,0] * 2)  # sigma_uu
+            wv[1:]+= rho_b[1:] * (weight * vsigma[:,1])      # sigma_ud
+            vmat[0] += rks_grad._gga_grad_sum(mol, ao, wv, mask, shls_slice, ao_loc)
+            wv[0]  = weight * vrho[:,1]
+            wv[1:] = rho_b[1:] * (weight * vsigma[:,2] * 2)  # sigma_dd
+            wv[1:]+= rho_a[1:] * (weight * vsigma[:,1])      # sigma_ud
+            vmat[1] += rks_grad._gga_grad_sum(mol, ao, wv, mask, shls_slice, ao_loc)
+            rho_a = rho_b = vxc = vrho = vsigma = wv = None
+    else:
+        raise NotImplementedError('meta-GGA')
+
+    # - sign because nabla_X = -nabla_x
+    return -vmat
+
+
+class Gradients(uhf_grad.Gradients):
+    def dump_flags(self):
+        uhf_grad.Gradients.dump_flags(self)
+        if callable(self._scf.grids.prune):
+            logger.info(self, 'Grid pruning %s may affect DFT gradients accuracy.'
+                        'Call mf.grids.run(prune=False) to mute grid pruning',
+                        self._scf.grids.prune)
+        return self
+
+    get_veff = get_veff
+
+
+if __name__ == '__main__':
+    from pyscf import gto
+    from pyscf import dft
+
+    mol = gto.Mole()
+    mol.atom = [
+        ['O' , (0. , 0.     , 0)],
+        [1   , (0. , -0.757 , 0.587)],
+        [1   , (0. ,  0.757 , 0.587)] ]
+    mol.basis = '631g'
+    mol.charge = 1
+    mol.spin = 1
+    mol.build()
+    mf = dft.UKS(mol)
+    mf.xc = 'b3lypg'
+    mf.conv_tol = 1e-14
+    mf.kernel()
+    print(Gradients(mf).grad())
@@ -15,12 +15,16 @@ Simple usage::
 '''
 
 from pyscf.grad import rhf
+from pyscf.grad import uhf
 from pyscf.grad import dhf
 from pyscf.grad import rks
+from pyscf.grad import uks
 from pyscf.grad import ccsd
 from pyscf.grad.rhf  import Gradients as RHF
+from pyscf.grad.uhf  import Gradients as UHF
 from pyscf.grad.dhf  import Gradients as DHF
 from pyscf.grad.rks  import Gradients as RKS
+from pyscf.grad.uks  import Gradients as UKS
 #from pyscf.grad.ccsd import Gradients as CCSD
 
 from pyscf.grad.rhf import grad_nuc
@@ -2,7 +2,7 @@
 
 import unittest
 import numpy
-from pyscf import gto, scf, dft
+from pyscf import gto, scf, dft, lib
 from pyscf import grad
 
 h2o = gto.Mole()
@@ -80,6 +80,30 @@ class KnowValues(unittest.TestCase):
         g1 = g.grad()
         self.assertAlmostEqual(finger(g1), 0.066541921001296467, 7)
 
+    def test_uks_closed_shell(self):
+        mf = dft.UKS(h2o)
+        mf.grids.prune = None
+        mf.run(conv_tol=1e-15, xc='b3lypg')
+        g1 = mf.nuc_grad_method().grad()
+        self.assertAlmostEqual(finger(g1), 0.066541921001296467, 6)
+
+    def test_uks_finite_diff(self):
+        def run_uks(xc, dz):
+            mol = gto.M(atom=[["O" , (0. , 0.     , dz)],
+                              [1   , (0. , -0.757 , 0.587)],
+                              [1   , (0. , 0.757  , 0.587)]],
+                        basis='6-31g', charge=1, spin=1, verbose=0)
+            mf = dft.UKS(mol)
+            mf.grids.prune = None
+            mf.grids.level = 5
+            mf.run(conv_tol=1e-14, xc=xc)
+            return mf
+        for xc in ('lda,vwn', 'b88,p86', 'b3lypg'):
+            g1 = grad.UKS(run_uks(xc, 0)).grad()
+            e1 = run_uks(xc, 1e-4).e_tot
+            e2 = run_uks(xc, -1e-4).e_tot
+            self.assertAlmostEqual(g1[0,2], (e1-e2)/2e-4*lib.param.BOHR, 4)
+
 
 if __name__ == "__main__":
     print("Full Tests for H2O")
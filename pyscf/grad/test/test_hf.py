@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import unittest
+from pyscf import lib
 from pyscf import scf
 from pyscf import gto
 from pyscf import grad
@@ -28,6 +29,20 @@ class KnowValues(unittest.TestCase):
         self.assertAlmostEqual(finger(g.grad_elec()), 7.9210392362911595, 7)
         self.assertAlmostEqual(finger(g.kernel()), 0.367743084803, 7)
 
+    def test_nr_uhf(self):
+        mol1 = mol.copy()
+        mol1.charge = 1
+        mol1.spin = 1
+        mol1.build(False, False)
+        uhf = scf.UHF(mol1)
+        uhf.conv_tol = 1e-14
+        uhf.scf()
+        g = grad.UHF(uhf).kernel()
+        d = 1e-4
+        e1 = uhf.as_scanner()('H 0 0.1 %.9f; F 0 0 0' % (.817+d))
+        e2 = uhf.as_scanner()('H 0 0.1 %.9f; F 0 0 0' % (.817-d))
+        self.assertAlmostEqual(g[0,2], (e1-e2)/(d*2/lib.param.BOHR), 6)
+
     def test_r_uhf(self):
         uhf = scf.dhf.UHF(mol)
         uhf.conv_tol_grad = 1e-5
@@ -64,6 +79,11 @@ class KnowValues(unittest.TestCase):
         e, de = mf_scanner(mol1)
         self.assertAlmostEqual(finger(de), 0.041822093538, 7)
 
+        e, de = mf_scanner(mol.atom_coords() * lib.param.BOHR)
+        self.assertAlmostEqual(finger(de), 0.367743084803, 7)
+        e, de = mf_scanner('H 0. 0. 0.9; F 0. 0.1 0.')
+        self.assertAlmostEqual(finger(de), 0.041822093538, 7)
+
     def test_rks_scanner(self):
         mol1 = mol.copy()
         mol1.set_geom_('''
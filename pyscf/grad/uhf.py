@@ -0,0 +1 @@
+../scf/uhf_grad.py
\ No newline at end of file
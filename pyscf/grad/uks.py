@@ -0,0 +1 @@
+../dft/uks_grad.py
\ No newline at end of file
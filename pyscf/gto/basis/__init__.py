@@ -8,6 +8,13 @@ if sys.version_info < (2,7):
     import imp
 else:
     import importlib
+import tempfile
+import hashlib
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+from pyscf.lib import parameters as param
 from pyscf.gto.basis import parse_nwchem
 
 ALIAS = {
@@ -302,11 +309,14 @@ def load(filename_or_basisname, symb):
     '''
     if os.path.isfile(filename_or_basisname):
         # read basis from given file
-        try:
-            return parse_nwchem.load(filename_or_basisname, symb)
-        except RuntimeError:
-            with open(filename_or_basisname, 'r') as fin:
-                return parse_nwchem.parse(fin.read())
+        def load_file():
+            try:
+                return parse_nwchem.load(filename_or_basisname, symb)
+            except RuntimeError:
+                with open(filename_or_basisname, 'r') as fin:
+                    return parse_nwchem.parse(fin.read())
+        return _load_with_cache('basis', (filename_or_basisname,), symb,
+                                load_file)
 
     name = _format_basis_name(filename_or_basisname)
     if not (name in ALIAS or _is_pople_basis(name)):
@@ -324,11 +334,17 @@ def load(filename_or_basisname, symb):
         raise RuntimeError('Basis %s not found' % filename_or_basisname)
 
     if 'dat' in basmod:
-        b = parse_nwchem.load(os.path.join(os.path.dirname(__file__), basmod), symb)
+        basfile = os.path.join(os.path.dirname(__file__), basmod)
+        b = _load_with_cache('basis', (basfile,), symb,
+                             lambda: parse_nwchem.load(basfile, symb))
     elif isinstance(basmod, (tuple, list)) and isinstance(basmod[0], str):
-        b = []
-        for f in basmod:
-            b += parse_nwchem.load(os.path.join(os.path.dirname(__file__), f), symb)
+        basfiles = [os.path.join(os.path.dirname(__file__), f) for f in basmod]
+        def load_files():
+            b = []
+            for f in basfiles:
+                b += parse_nwchem.load(f, symb)
+            return b
+        b = _load_with_cache('basis', basfiles, symb, load_files)
     else:
         if sys.version_info < (2,7):
             fp, pathname, description = imp.find_module(basmod, __path__)
@@ -345,18 +361,110 @@ def load_ecp(filename_or_basisname, symb):
     '''
     if os.path.isfile(filename_or_basisname):
         # read basis from given file
-        try:
-            return parse_nwchem.load_ecp(filename_or_basisname, symb)
-        except RuntimeError:
-            with open(filename_or_basisname, 'r') as fin:
-                return parse_nwchem.parse_ecp(fin.read())
+        def load_file():
+            try:
+                return parse_nwchem.load_ecp(filename_or_basisname, symb)
+            except RuntimeError:
+                with open(filename_or_basisname, 'r') as fin:
+                    return parse_nwchem.parse_ecp(fin.read())
+        return _load_with_cache('ecp', (filename_or_basisname,), symb,
+                                load_file)
 
     name = _format_basis_name(filename_or_basisname)
     if name not in ALIAS:
         return parse_ecp(filename_or_basisname)
     basmod = ALIAS[name]
     symb = ''.join([i for i in symb if i.isalpha()])
-    return parse_nwchem.load_ecp(os.path.join(os.path.dirname(__file__), basmod), symb)
+    ecpfile = os.path.join(os.path.dirname(__file__), basmod)
+    return _load_with_cache('ecp', (ecpfile,), symb,
+                            lambda: parse_nwchem.load_ecp(ecpfile, symb))
 
 def _format_basis_name(basisname):
     return basisname.lower().replace('-', '').replace('_', '').replace(' ', '')
+
+
+# Parsed basis sets (and ECPs) are kept in _BASIS_CACHE.  The key of each entry
+# is made of the source files, their modification time and size, and the
+# element.  Modifying a basis file therefore invalidates the entries loaded
+# from it.  If param.BASIS_CACHE_DIR (environment variable
+# PYSCF_BASIS_CACHE_DIR) is set, the entries are also pickled to that
+# directory so that they can be shared between processes.  Bump
+# _CACHE_VERSION when the internal basis format changes.
+_CACHE_VERSION = 1
+_BASIS_CACHE = {}
+
+def clear_cache(disk=False):
+    '''Remove the cached basis sets from memory.  If disk is True, the cache
+    files in param.BASIS_CACHE_DIR are removed as well.
+    '''
+    _BASIS_CACHE.clear()
+    cachedir = param.BASIS_CACHE_DIR
+    if disk and cachedir and os.path.isdir(cachedir):
+        for f in os.listdir(cachedir):
+            if f.startswith('pyscf-basis-') and f.endswith('.pkl'):
+                try:
+                    os.remove(os.path.join(cachedir, f))
+                except OSError:
+                    pass
+
+def _load_with_cache(kind, files, symb, loader):
+    '''Look up the parsed basis of symb in the in-memory and on-disk caches.
+    loader is called to parse the basis files if the basis is not cached.
+    '''
+    files = [os.path.abspath(f) for f in files]
+    stamps = []
+    for f in files:
+        stat = os.stat(f)
+        stamps.append((f, stat.st_mtime, stat.st_size))
+    key = (_CACHE_VERSION, kind, symb, tuple(stamps))
+
+    if key in _BASIS_CACHE:
+        return _copy_basis(_BASIS_CACHE[key])
+
+    cachefile = _cache_file(key)
+    b = None
+    if cachefile is not None and os.path.isfile(cachefile):
+        try:
+            with open(cachefile, 'rb') as f:
+                key1, b = pickle.load(f)
+            if key1 != key:
+                b = None
+        except Exception:
+            b = None
+
+    if b is None:
+        b = loader()
+        if cachefile is not None:
+            _dump_cache_file(cachefile, key, b)
+
+    _BASIS_CACHE[key] = b
+    return _copy_basis(b)
+
+def _cache_file(key):
+    cachedir = param.BASIS_CACHE_DIR
+    if not cachedir:
+        return None
+    h = hashlib.md5(repr(key).encode()).hexdigest()
+    return os.path.join(cachedir, 'pyscf-basis-%s.pkl' % h)
+
+def _dump_cache_file(cachefile, key, b):
+    '''Write the cache file atomically.  Failures (e.g. read-only directory)
+    are silently ignored since the cache is only an optimization.'''
+    cachedir = os.path.dirname(cachefile)
+    try:
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        fd, tmpname = tempfile.mkstemp(dir=cachedir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump((key, b), f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmpname, cachefile)
+    except (OSError, IOError):
+        pass
+
+def _copy_basis(b):
+    '''Copy the nested lists so that the cached entries are not modified by
+    the callers'''
+    if isinstance(b, list):
+        return [_copy_basis(x) for x in b]
+    else:
+        return b
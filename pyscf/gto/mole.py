@@ -477,6 +477,38 @@ def conc_mol(mol1, mol2):
         mol3._ecp.update(mol1._ecp)
     return mol3
 
+def fakemol_for_charges(coords, expnt=1e16):
+    '''Construct a fake Mole object that holds one s-type Gaussian charge
+    distribution per coordinate.  The steep Gaussian (the default exponent
+    1e16) approximates a unit point charge, so that the 3-center integrals
+    (ij|k) over the fake shells give the electrostatic potential of AO pair
+    ij at the given coordinates.
+    '''
+    coords = numpy.asarray(coords, dtype=numpy.double).reshape(-1,3)
+    nbas = coords.shape[0]
+    fakeatm = numpy.zeros((nbas,ATM_SLOTS), dtype=numpy.int32)
+    fakebas = numpy.zeros((nbas,BAS_SLOTS), dtype=numpy.int32)
+    fakeenv = [numpy.zeros(PTR_ENV_START)]
+    ptr = PTR_ENV_START
+    fakeatm[:,PTR_COORD] = numpy.arange(ptr, ptr+nbas*3, 3)
+    fakeenv.append(coords.ravel())
+    ptr += nbas * 3
+    fakebas[:,ATOM_OF ] = numpy.arange(nbas)
+    fakebas[:,NPRIM_OF] = 1
+    fakebas[:,NCTR_OF ] = 1
+# The normalization factor makes the Gaussian integrate to 1
+    fakebas[:,PTR_EXP  ] = ptr
+    fakebas[:,PTR_COEFF] = ptr + 1
+    half_sph_norm = .5/numpy.sqrt(numpy.pi)
+    fakeenv.append([expnt, half_sph_norm/_gaussian_int(2, expnt)])
+
+    fakemol = Mole()
+    fakemol._atm = fakeatm
+    fakemol._bas = fakebas
+    fakemol._env = numpy.hstack(fakeenv)
+    fakemol._built = True
+    return fakemol
+
 # <bas-of-mol1|intor|bas-of-mol2>
 def intor_cross(intor, mol1, mol2, comp=1):
     r'''1-electron integrals from two molecules like
@@ -2063,20 +2095,75 @@ Note when symmetry attributes is assigned, the molecule needs to be put in the p
         return self
     set_rinv_zeta_ = set_rinv_zeta  # for backward compatibility
 
-    def set_geom_(self, atoms, unit='Angstrom', symmetry=None):
+    def set_geom_(self, atoms_or_coords, unit='Angstrom', symmetry=None,
+                  inplace=True):
         '''Replace geometry
+
+        If the new geometry has the same atoms (in the same order) as the
+        current one and symmetry is not used, only the coordinates in
+        :attr:`_env` are updated.  The basis, ECP and the integral environment
+        are reused.  Otherwise the molecule is rebuilt.
+
+        Args:
+            atoms_or_coords : list, str or ndarray
+                The new geometry in the format of :attr:`Mole.atom`, or a
+                (natm,3) array for the new coordinates of the existing atoms.
+
+        Kwargs:
+            unit : str or number
+                Unit of the new coordinates.  See :func:`format_atom`
+            symmetry : bool or str
+                If given, overwrite :attr:`Mole.symmetry`
+            inplace : bool
+                Whether to update the geometry of the current object.  If
+                False, the geometry of a copy of the current object is
+                updated.
+
+        Returns:
+            The Mole object with the new geometry.
         '''
-        self.atom = atoms
-        self.unit = unit
+        if inplace:
+            mol = self
+        else:
+            mol = self.copy()
+
+        if (isinstance(atoms_or_coords, numpy.ndarray) and
+            atoms_or_coords.ndim == 2 and atoms_or_coords.shape[1] == 3):
+            atoms = [(a[0], x) for a, x in zip(mol._atom, atoms_or_coords.tolist())]
+        else:
+            atoms = atoms_or_coords
+        mol.atom = atoms
+        mol.unit = unit
         if symmetry is not None:
-            self.symmetry = symmetry
-        self.build(False, False)
-        logger.info(self, 'New geometry (unit Bohr)')
-        coords = self.atom_coords()
-        for ia in range(self.natm):
-            logger.info(self, ' %3d %-4s %16.12f %16.12f %16.12f',
-                        ia+1, self.atom_symbol(ia), *coords[ia])
-        return self
+            mol.symmetry = symmetry
+
+        _atom = None
+        if mol._built and not mol.symmetry:
+            _atom = mol.format_atom(atoms, unit=unit)
+            if [a[0] for a in _atom] != [a[0] for a in mol._atom]:
+                _atom = None
+
+        if _atom is None:
+            mol.build(False, False)
+        else:
+            # Only the coordinates changed.  Patch the coordinates in _env.
+            # _env is copied because it may be shared with other Mole objects
+            # (e.g. created by copy.copy)
+            mol._atom = _atom
+            mol._env = numpy.array(mol._env, dtype=float)
+            ptr = mol._atm[:,PTR_COORD]
+            coords = numpy.asarray([a[1] for a in _atom], dtype=float)
+            mol._env[ptr[:,None]+numpy.arange(3)] = coords
+            if mol.groupname != 'C1':
+                mol.groupname = mol.topgroup = 'C1'
+                mol.symm_orb = mol.irrep_id = mol.irrep_name = None
+
+        logger.info(mol, 'New geometry (unit Bohr)')
+        coords = mol.atom_coords()
+        for ia in range(mol.natm):
+            logger.info(mol, ' %3d %-4s %16.12f %16.12f %16.12f',
+                        ia+1, mol.atom_symbol(ia), *coords[ia])
+        return mol
 
     def update(self, chkfile):
         return self.update_from_chk(chkfile)
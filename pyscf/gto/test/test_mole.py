@@ -212,6 +212,75 @@ C    SP
         self.assertEqual(len(gto.basis.load('6-31G(3df,3pd)', 'H')), 6)
         self.assertEqual(len(gto.basis.load('6-31G(3df,3pd)', 'C')), 9)
 
+    def test_basis_cache(self):
+        import os, tempfile, shutil
+        gto.basis.clear_cache()
+        b0 = gto.basis.load('ccpvdz', 'C')
+        b1 = gto.basis.load('ccpvdz', 'C')
+        self.assertEqual(b0, b1)
+        b1[0][1][0] = 0
+        self.assertEqual(gto.basis.load('ccpvdz', 'C'), b0)
+
+        tmpdir = tempfile.mkdtemp()
+        cachedir = os.path.join(tmpdir, 'cache')
+        basfile = os.path.join(tmpdir, 'basis.dat')
+        with open(basfile, 'w') as f:
+            f.write('''#BASIS SET
+H    S
+      1.0     1.0
+END''')
+        cachedir_bak = param.BASIS_CACHE_DIR
+        try:
+            param.BASIS_CACHE_DIR = cachedir
+            self.assertEqual(gto.basis.load(basfile, 'H'), [[0, [1., 1.]]])
+            self.assertEqual(len(os.listdir(cachedir)), 1)
+            gto.basis.clear_cache()
+            self.assertEqual(gto.basis.load(basfile, 'H'), [[0, [1., 1.]]])
+
+            with open(basfile, 'w') as f:
+                f.write('''#BASIS SET
+H    S
+      2.0     1.0
+H    P
+      1.0     1.0
+END''')
+            os.utime(basfile, (0, 0))
+            self.assertEqual(gto.basis.load(basfile, 'H'),
+                             [[0, [2., 1.]], [1, [1., 1.]]])
+            self.assertEqual(len(os.listdir(cachedir)), 2)
+            gto.basis.clear_cache(disk=True)
+            self.assertEqual(len(os.listdir(cachedir)), 0)
+        finally:
+            param.BASIS_CACHE_DIR = cachedir_bak
+            shutil.rmtree(tmpdir)
+
+    def test_set_geom(self):
+        mol = gto.M(atom='O 0 0 0; H 0 .7 .6; H 0 -.7 .6', basis='ccpvdz')
+        mol1 = mol.set_geom_('O 0 0 .1; H 0 .8 .6; H 0 -.7 .5', inplace=False)
+        self.assertTrue(abs(mol.atom_coord(0)).max() < 1e-12)
+        mol2 = mol.copy()
+        mol2.atom = 'O 0 0 .1; H 0 .8 .6; H 0 -.7 .5'
+        mol2.build(False, False)
+        self.assertTrue(abs(mol1.atom_coords() - mol2.atom_coords()).max() < 1e-12)
+        self.assertTrue(abs(mol1.intor('int1e_nuc_sph') -
+                            mol2.intor('int1e_nuc_sph')).max() < 1e-12)
+        self.assertAlmostEqual(mol1.energy_nuc(), mol2.energy_nuc(), 12)
+
+        mol.set_geom_(mol2.atom_coords(), unit='Bohr')
+        self.assertTrue(abs(mol.atom_coords() - mol2.atom_coords()).max() < 1e-12)
+        self.assertAlmostEqual(mol.energy_nuc(), mol2.energy_nuc(), 12)
+
+        mol.set_geom_('O 0 0 0; H 0 .7 .6; F 0 -.7 .6')
+        self.assertEqual(mol.atom_symbol(2), 'F')
+        self.assertEqual(mol.nao_nr(), 33)
+
+        mol = gto.M(atom='O 0 0 0; H 0 .7 .6; H 0 -.7 .6', symmetry=True)
+        mol.set_geom_('O 0 0 0; H 0 .7 .5; H 0 -.7 .5')
+        self.assertEqual(mol.groupname, 'C2v')
+        mol.set_geom_('O 0 0 0; H 0 .7 .5; H 0 -.6 .5', symmetry=False)
+        self.assertEqual(mol.groupname, 'C1')
+        self.assertTrue(mol.symm_orb is None)
+
     def test_remove_prefix_ghost(self):
         self.assertEqual(gto.mole._remove_prefix_ghost('ghost---ho'), 'ho')
 
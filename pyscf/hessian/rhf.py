@@ -79,6 +79,7 @@ def hess_elec(hess_mf, mo_energy=None, mo_coeff=None, mo_occ=None,
 
     de2 = numpy.zeros((mol.natm,mol.natm,3,3))
     int2e_ip1ip2 = mol._add_suffix('int2e_ip1ip2')
+    ip1ip2_opt = _vhf.nr_deriv_vhfopt(mol, int2e_ip1ip2, dm0, mf.direct_scf_tol)
     int2e_ipvip1 = mol._add_suffix('int2e_ipvip1')
     for i0, ia in enumerate(atmlst):
         shl0, shl1, p0, p1 = offsetdic[ia]
@@ -95,6 +96,7 @@ def hess_elec(hess_mf, mo_energy=None, mo_coeff=None, mo_occ=None,
                                           ('ji->s1kl', 'li->s1kj', 'lj->s1ki'),
                                           (dm0[:,p0:p1], dm0[:,p0:p1], dm0), 9,
                                           mol._atm, mol._bas, mol._env,
+                                          vhfopt=ip1ip2_opt,
                                           shls_slice=shls_slice)
         vhf2 = vj1 * 2 - vk1 * .5
         vhf2[:,:,p0:p1] -= vk2 * .5
@@ -162,6 +164,7 @@ def make_h1(mf, mo_coeff, mo_occ, chkfile=None, atmlst=None, verbose=logger.WARN
     offsetdic = mol.offset_nr_by_atom()
     h1aos = []
     int2e_ip1 = mol._add_suffix('int2e_ip1')
+    vhfopt = _vhf.nr_deriv_vhfopt(mol, int2e_ip1, dm0, mf.direct_scf_tol)
     for i0, ia in enumerate(atmlst):
         shl0, shl1, p0, p1 = offsetdic[ia]
 
@@ -176,7 +179,7 @@ def make_h1(mf, mo_coeff, mo_occ, chkfile=None, atmlst=None, verbose=logger.WARN
                                   ('ji->s2kl', 'lk->s1ij', 'li->s1kj', 'jk->s1il'),
                                   (-dm0[:,p0:p1], -dm0, -dm0[:,p0:p1], -dm0),
                                   3, mol._atm, mol._bas, mol._env,
-                                  shls_slice=shls_slice)
+                                  vhfopt=vhfopt, shls_slice=shls_slice)
         for i in range(3):
             lib.hermi_triu(vj1[i], 1)
         vhf = vj1 - vk1*.5
@@ -295,7 +298,10 @@ class Hessian(lib.StreamObject):
         self._keys = set(self.__dict__.keys())
 
     hess_elec = hess_elec
-    make_h1 = make_h1
+
+    def make_h1(self, mo_coeff, mo_occ, chkfile=None, atmlst=None,
+                verbose=None):
+        return make_h1(self._scf, mo_coeff, mo_occ, chkfile, atmlst, verbose)
 
     def solve_mo1(self, mo_energy, mo_coeff, mo_occ, h1ao_or_chkfile,
                   fx=None, atmlst=None, max_memory=4000, verbose=None):
@@ -165,6 +165,9 @@ def hess_elec(hess_mf, mo_energy=None, mo_coeff=None, mo_occ=None,
     rinv2ab = frinv['rinv2ab']
 
     de2 = numpy.zeros((mol.natm,mol.natm,3,3))
+    int2e_ip1ip2 = mol._add_suffix('int2e_ip1ip2')
+    int2e_ipvip1 = mol._add_suffix('int2e_ipvip1')
+    ip1ip2_opt = _vhf.nr_deriv_vhfopt(mol, int2e_ip1ip2, dm0, mf.direct_scf_tol)
     for i0, ia in enumerate(atmlst):
         shl0, shl1, p0, p1 = offsetdic[ia]
 
@@ -176,13 +179,12 @@ def hess_elec(hess_mf, mo_energy=None, mo_coeff=None, mo_occ=None,
         s1oo = numpy.einsum('xpq,pi,qj->xij', s1ao, mocc, mocc)
 
         shls_slice = (shl0, shl1) + (0, mol.nbas)*3
-        int2e_ip1ip2 = mol._add_suffix('int2e_ip1ip2')
-        int2e_ipvip1 = mol._add_suffix('int2e_ipvip1')
         if abs(hyb) > 1e-10:
             vj1, vk1, vk2 = _vhf.direct_bindm(int2e_ip1ip2, 's1',
                                               ('ji->s1kl', 'li->s1kj', 'lj->s1ki'),
                                               (dm0[:,p0:p1], dm0[:,p0:p1], dm0), 9,
                                               mol._atm, mol._bas, mol._env,
+                                              vhfopt=ip1ip2_opt,
                                               shls_slice=shls_slice)
             veff2 = vj1 * 2 - hyb * .5 * vk1
             veff2[:,:,p0:p1] -= hyb * .5 * vk2
@@ -201,6 +203,7 @@ def hess_elec(hess_mf, mo_energy=None, mo_coeff=None, mo_occ=None,
             vj1 = _vhf.direct_bindm(int2e_ip1ip2, 's1',
                                     'ji->s1kl', dm0[:,p0:p1], 9,
                                     mol._atm, mol._bas, mol._env,
+                                    vhfopt=ip1ip2_opt,
                                     shls_slice=shls_slice)
             veff2 = vj1 * 2
             t1 = log.timer('contracting int2e_ip1ip2 for atom %d'%ia, *t1)
@@ -421,6 +424,8 @@ def make_h1(mf, mo_coeff, mo_occ, chkfile=None, atmlst=None, verbose=logger.WARN
 
     offsetdic = mol.offset_nr_by_atom()
     h1aos = []
+    int2e_ip1 = mol._add_suffix('int2e_ip1')
+    vhfopt = _vhf.nr_deriv_vhfopt(mol, int2e_ip1, dm0, mf.direct_scf_tol)
     for i0, ia in enumerate(atmlst):
         shl0, shl1, p0, p1 = offsetdic[ia]
 
@@ -430,14 +435,13 @@ def make_h1(mf, mo_coeff, mo_occ, chkfile=None, atmlst=None, verbose=logger.WARN
         h1ao = h1ao + h1ao.transpose(0,2,1)
 
         shls_slice = (shl0, shl1) + (0, mol.nbas)*3
-        int2e_ip1 = mol._add_suffix('int2e_ip1')
         if abs(hyb) > 1e-10:
             vj1, vj2, vk1, vk2 = \
                     _vhf.direct_bindm(int2e_ip1, 's2kl',
                                       ('ji->s2kl', 'lk->s1ij', 'li->s1kj', 'jk->s1il'),
                                       (-dm0[:,p0:p1], -dm0, -dm0[:,p0:p1], -dm0),
                                       3, mol._atm, mol._bas, mol._env,
-                                      shls_slice=shls_slice)
+                                      vhfopt=vhfopt, shls_slice=shls_slice)
             for i in range(3):
                 lib.hermi_triu(vj1[i], 1)
             veff = vj1 - hyb*.5*vk1
@@ -448,7 +452,7 @@ def make_h1(mf, mo_coeff, mo_occ, chkfile=None, atmlst=None, verbose=logger.WARN
                                       ('ji->s2kl', 'lk->s1ij'),
                                       (-dm0[:,p0:p1], -dm0),
                                       3, mol._atm, mol._bas, mol._env,
-                                      shls_slice=shls_slice)
+                                      vhfopt=vhfopt, shls_slice=shls_slice)
             for i in range(3):
                 lib.hermi_triu(vj1[i], 1)
             veff = vj1
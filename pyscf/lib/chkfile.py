@@ -6,6 +6,7 @@
 import json
 import h5py
 import pyscf.gto
+from pyscf.lib import logger
 
 def load_chkfile_key(chkfile, key):
     return load(chkfile, key)
@@ -52,7 +53,9 @@ def load(chkfile, key):
                 return dict([(k.replace('__from_list__', ''),
                               load_as_dic(k, val)) for k in val])
         else:
-            return val.value
+            val = val.value
+            logger.count_io(nread=getattr(val, 'nbytes', 0))
+            return val
 
     with h5py.File(chkfile, 'r') as fh5:
         return load_as_dic(key, fh5)
@@ -104,6 +107,7 @@ def dump(chkfile, key, value):
         else:
             try:
                 root[key] = value
+                logger.count_io(nwritten=getattr(value, 'nbytes', 0))
             except (TypeError, ValueError) as e:
                 if not (e.args[0] == "Object dtype dtype('O') has no native HDF5 equivalent" or
                         e.args[0].startswith('could not broadcast input array')):
@@ -60,8 +60,14 @@ next_blk:;
         }
 }
 
-void VXCgen_grid(double *out, double *coords, double *atm_coords,
-                 double *radii_table, int natm, int ngrids)
+/*
+ * Becke cell functions.  Only the atom pairs (i,j) which are marked in
+ * pair_mask[i*natm+j] are included in the cell functions.  All pairs are
+ * included if pair_mask is NULL.
+ */
+void VXCgen_grid_masked(double *out, double *coords, double *atm_coords,
+                        double *radii_table, unsigned char *pair_mask,
+                        int natm, int ngrids)
 {
         const size_t Ngrids = ngrids;
         int i, j, n;
@@ -78,7 +84,7 @@ void VXCgen_grid(double *out, double *coords, double *atm_coords,
 
         double *bufs[MAX_THREADS];
 #pragma omp parallel default(none) \
-        shared(out, grid_dist, atm_coords, radii_table, natm, bufs) \
+        shared(out, grid_dist, atm_coords, radii_table, pair_mask, natm, bufs) \
         private(i, j, n, dx, dy, dz)
 {
         int thread_id = omp_get_thread_num();
@@ -97,7 +103,7 @@ void VXCgen_grid(double *out, double *coords, double *atm_coords,
         for (ij = 0; ij < natm*natm; ij++) {
                 i = ij / natm;
                 j = ij % natm;
-                if (i <= j) {
+                if (i <= j || (pair_mask != NULL && !pair_mask[ij])) {
                         continue;
                 }
 
@@ -140,3 +146,10 @@ void VXCgen_grid(double *out, double *coords, double *atm_coords,
         free(grid_dist);
 }
 
+void VXCgen_grid(double *out, double *coords, double *atm_coords,
+                 double *radii_table, int natm, int ngrids)
+{
+        VXCgen_grid_masked(out, coords, atm_coords, radii_table, NULL,
+                           natm, ngrids);
+}
+
@@ -7,14 +7,15 @@
 DIIS
 """
 
+import os
 import sys
+import ast
+import copy
 import tempfile
 import numpy
 import scipy.linalg
-import h5py
 from . import parameters
 from . import logger
-from . import misc
 
 
 INCORE_SIZE = 1e7
@@ -106,20 +107,22 @@ class DIIS(object):
         self._err_vec_touched = False
 
     def _store(self, key, value):
-        if value.size < INCORE_SIZE:
-            self._buffer[key] = value
+        if self._diisfile is None:
+            if value.size < INCORE_SIZE and not isinstance(self.filename, str):
+                self._buffer[key] = value
+                return
+            self._diisfile = _DIISFile(self.filename, self.space)
+            # Move the vectors kept in memory so far to the file
+            for k, v in self._buffer.items():
+                self._diisfile.store(k, v)
+            self._buffer = {}
+        self._diisfile.store(key, value)
 
-        # save the error vector if filename is given, this file can be used to
-        # restore the DIIS state
-        if value.size >= INCORE_SIZE or isinstance(self.filename, str):
-            if self._diisfile is None:
-                self._diisfile = misc.H5TmpFile(self.filename)
-            if key in self._diisfile:
-                self._diisfile[key][:] = value
-            else:
-                self._diisfile[key] = value
-# to avoid "Unable to find a valid file signature" error when reopen from crash
-            self._diisfile.flush()
+    def _save_state(self):
+        '''Save the bookkeeping so that the DIIS object can be recovered from
+        the file after a crash (see :func:`restore`)'''
+        if self._diisfile is not None and isinstance(self.filename, str):
+            self._diisfile.save_meta(self)
 
     def push_err_vec(self, xerr):
         self._err_vec_touched = True
@@ -144,7 +147,7 @@ class DIIS(object):
 # If push_err_vec is not called in advance, the error vector is generated
 # as the diff of the current vec and previous returned vec (._xprev)
 # So store the first trial vec as the previous returned vec
-            self._xprev = x
+            self._set_xprev(x)
 
         else:
             if self._head >= self.space:
@@ -153,28 +156,33 @@ class DIIS(object):
             ekey = 'e%d'%self._head
             xkey = 'x%d'%self._head
             self._store(xkey, x)
-            if x.size < INCORE_SIZE:
+            if self._diisfile is None:
                 self._buffer[ekey] = x - self._xprev
-                if isinstance(self.filename, str):
-                    self._store(ekey, self._buffer[ekey])
             else:
-                if ekey not in self._diisfile:
-                    self._diisfile.create_dataset(ekey, (x.size,), x.dtype)
+                e = self._diisfile.empty(ekey, x.size, x.dtype)
                 for p0,p1 in prange(0, x.size, BLOCK_SIZE):
-                    self._diisfile[ekey][p0:p1] = x[p0:p1] - self._xprev[p0:p1]
+                    e[p0:p1] = x[p0:p1] - self._xprev[p0:p1]
             self._head += 1
+        self._save_state()
+
+    def _set_xprev(self, x):
+        if self._diisfile is None:
+            self._xprev = x
+        else:
+            self._diisfile.store('xprev', x)
+            self._xprev = self._diisfile.get('xprev')
 
     def get_err_vec(self, idx):
-        if self._buffer:
+        if self._diisfile is None:
             return self._buffer['e%d'%idx]
         else:
-            return self._diisfile['e%d'%idx]
+            return self._diisfile.get('e%d'%idx)
 
     def get_vec(self, idx):
-        if self._buffer:
+        if self._diisfile is None:
             return self._buffer['x%d'%idx]
         else:
-            return self._diisfile['x%d'%idx]
+            return self._diisfile.get('x%d'%idx)
 
     def get_num_vec(self):
         return len(self._bookkeep)
@@ -197,18 +205,20 @@ class DIIS(object):
         if nd < self.min_space:
             return x
 
-        dt = numpy.array(self.get_err_vec(self._head-1), copy=False)
+        # Only the new row of the error overlap matrix is computed.  The error
+        # vectors are streamed in blocks so that they are not loaded in memory
+        dt = self.get_err_vec(self._head-1)
         if self._H is None:
             self._H = numpy.zeros((self.space+1,self.space+1), dt.dtype)
             self._H[0,1:] = self._H[1:,0] = 1
-        for i in range(nd):
-            tmp = 0
-            dti = self.get_err_vec(i)
-            for p0,p1 in prange(0, dt.size, BLOCK_SIZE):
-                tmp += numpy.dot(dt[p0:p1].conj(), dti[p0:p1])
-            self._H[self._head,i+1] = tmp
-            self._H[i+1,self._head] = tmp.conjugate()
-        dt = None
+        row = numpy.zeros(nd, dtype=self._H.dtype)
+        for p0,p1 in prange(0, dt.size, BLOCK_SIZE):
+            dt_blk = numpy.asarray(dt[p0:p1]).conj()
+            for i in range(nd):
+                row[i] += numpy.dot(dt_blk, self.get_err_vec(i)[p0:p1])
+        dt = dt_blk = None
+        self._H[self._head,1:nd+1] = row
+        self._H[1:nd+1,self._head] = row.conj()
         h = self._H[:nd+1,:nd+1]
         g = numpy.zeros(nd+1, x.dtype)
         g[0] = 1
@@ -223,18 +233,152 @@ class DIIS(object):
             c = numpy.dot(v[:,idx]*(1/w[idx]), numpy.dot(v[:,idx].T.conj(), g))
         logger.debug1(self, 'diis-c %s', c)
 
-        if self._xprev is None:
-            xnew = numpy.zeros_like(x.ravel())
-        else:
-            self._xprev = None # release memory first
-            self._xprev = xnew = numpy.zeros_like(x.ravel())
-
+        xnew = numpy.zeros_like(x.ravel())
         for i, ci in enumerate(c[1:]):
             xi = self.get_vec(i)
             for p0,p1 in prange(0, x.size, BLOCK_SIZE):
                 xnew[p0:p1] += xi[p0:p1] * ci
+
+        if self._xprev is not None:
+            self._xprev = None # release memory first
+            self._set_xprev(xnew)
+        self._save_state()
         return xnew.reshape(x.shape)
 
+    def restore(self, filename, inplace=True):
+        '''Read the DIIS subspace from the file (the filename of an earlier
+        DIIS object) and continue the extrapolation from there.'''
+        if inplace:
+            dev = self
+        else:
+            dev = copy.copy(self)
+        _DIISFile.load(filename, dev)
+        return dev
+
+
+def restore(filename):
+    '''Create a DIIS object from the file of an earlier DIIS object, e.g. to
+    resume an iterative solver after a crash.
+
+    Examples:
+
+    >>> adiis = lib.diis.DIIS(filename='diis.dat')
+    >>> ... crash ...
+    >>> adiis = lib.diis.restore('diis.dat')
+    '''
+    return DIIS().restore(filename)
+
+
+class _DIISFile(object):
+    '''DIIS vectors kept in a preallocated numpy.memmap ring buffer.
+
+    The vectors x_i, the error vectors e_i and the previous vector are stored
+    in separate regions of one file.  The regions are allocated when the
+    first vector of each kind is stored.  Dirty pages are written back by the
+    OS, no flush is needed for each push.  The bookkeeping (ring head,
+    subspace and error overlap matrix) is saved to filename + '.meta'.
+    '''
+    def __init__(self, filename, space):
+        if filename is None:
+            self._tmpfile = tempfile.NamedTemporaryFile(dir=parameters.TMPDIR)
+            filename = self._tmpfile.name
+        else:
+            open(filename, 'wb').close()
+        self.filename = filename
+        self.space = space
+        self.regions = {}
+        self._maps = {}
+
+    def _region(self, kind, size, dtype):
+        dtype = numpy.dtype(dtype)
+        if kind in self.regions:
+            offset, dtype0, size0 = self.regions[kind]
+            if size0 == size and numpy.dtype(dtype0) == dtype:
+                return self._maps[kind]
+        nrow = 1 if kind == 'xprev' else self.space
+        offset = os.path.getsize(self.filename)
+        self.regions[kind] = (offset, dtype.str, size)
+        self._maps[kind] = self._open(offset, dtype, nrow, size)
+        return self._maps[kind]
+
+    def _open(self, offset, dtype, nrow, size):
+        return numpy.memmap(self.filename, dtype=dtype, mode='r+',
+                            offset=offset, shape=(nrow,size))
+
+    def empty(self, key, size, dtype):
+        kind, row = _parse_key(key)
+        return self._region(kind, size, dtype)[row]
+
+    def store(self, key, value):
+        value = numpy.asarray(value).ravel()
+        buf = self.empty(key, value.size, value.dtype)
+        for p0,p1 in prange(0, value.size, BLOCK_SIZE):
+            buf[p0:p1] = value[p0:p1]
+
+    def get(self, key):
+        kind, row = _parse_key(key)
+        return self._maps[kind][row]
+
+    def save_meta(self, dev):
+        regions = [(k,) + v for k, v in self.regions.items()]
+        tmpname = self.filename + '.meta.tmp'
+        with open(tmpname, 'wb') as f:
+            numpy.savez(f, space=self.space, min_space=dev.min_space,
+                        head=dev._head, bookkeep=numpy.asarray(dev._bookkeep, dtype=int),
+                        err_vec_touched=dev._err_vec_touched,
+                        has_xprev=dev._xprev is not None,
+                        regions=numpy.array(repr(regions)))
+        os.rename(tmpname, self.filename + '.meta')
+
+    @classmethod
+    def load(cls, filename, dev):
+        with open(filename + '.meta', 'rb') as f:
+            meta = dict(numpy.load(f).items())
+        self = cls.__new__(cls)
+        self.filename = filename
+        self.space = int(meta['space'])
+        self.regions = {}
+        self._maps = {}
+        for kind, offset, dtype, size in ast.literal_eval(str(meta['regions'])):
+            nrow = 1 if kind == 'xprev' else self.space
+            self.regions[kind] = (offset, dtype, size)
+            self._maps[kind] = self._open(offset, numpy.dtype(dtype), nrow, size)
+
+        dev.filename = filename
+        dev.space = self.space
+        dev.min_space = int(meta['min_space'])
+        dev._diisfile = self
+        dev._buffer = {}
+        dev._head = int(meta['head'])
+        dev._bookkeep = [int(i) for i in meta['bookkeep']]
+        dev._err_vec_touched = bool(meta['err_vec_touched'])
+        if len(dev._bookkeep) == dev.space:
+            # The slot at the ring head may have been partially overwritten
+            # when the program was interrupted
+            dev._bookkeep.remove(dev._head % dev.space)
+        if bool(meta['has_xprev']):
+            dev._xprev = self.get('xprev')
+        else:
+            dev._xprev = None
+
+        # Rebuild the error overlap matrix
+        dev._H = None
+        if 'e' in self._maps and dev._bookkeep:
+            errs = self._maps['e']
+            n = max(dev._bookkeep) + 1
+            dev._H = numpy.zeros((dev.space+1,dev.space+1), errs.dtype)
+            dev._H[0,1:] = dev._H[1:,0] = 1
+            for p0,p1 in prange(0, errs.shape[1], BLOCK_SIZE):
+                blk = numpy.asarray(errs[:n,p0:p1])
+                dev._H[1:n+1,1:n+1] += numpy.dot(blk.conj(), blk.T)
+        return self
+
+def _parse_key(key):
+    if key == 'xprev':
+        return key, 0
+    else:
+        return key[0], int(key[1:])
+
 def prange(start, end, step):
     for i in range(start, end, step):
         yield i, min(i+step, end)
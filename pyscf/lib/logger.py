@@ -62,10 +62,34 @@ control which level to output the timing.  It is 5 (DEBUG) by default.
 >>> log.timer('test', t0)
     CPU time for test      0.00 sec
 
+
+profile
+-------
+The regions measured by :func:`timer` and :func:`timer_debug1` can be
+recorded in a :class:`Profiler`, independent of the verbose level.  The
+profile holds the nested regions with their call counts, CPU and wall time,
+the peak memory (from :func:`lib.current_memory`) and the bytes of HDF5 IO
+reported through :func:`count_io`.  It can be exported in JSON or in the
+Chrome trace format (chrome://tracing).
+
+>>> from pyscf import lib
+>>> prof = lib.logger.enable_profile()
+>>> mf = scf.RHF(mol).run()
+>>> prof.dump_json('profile.json')
+>>> prof.dump_chrome_trace('profile.trace.json')
+
+Setting the environment variable PYSCF_PROFILE=filename enables the profiler
+at import and writes the profile to the file at exit.
+
 '''
 
+import os
+import re
 import sys
 import time
+import json
+import bisect
+import threading
 
 from pyscf.lib import parameters as param
 
@@ -148,12 +172,16 @@ def timer(rec, msg, cpu0=None, wall0=None):
         cpu0 = rec._t0
     if wall0:
         rec._t0, rec._w0 = time.clock(), time.time()
+        if profiler is not None:
+            profiler.record(msg, cpu0, rec._t0, wall0, rec._w0)
         if rec.verbose >= TIMER_LEVEL:
             flush(rec, '    CPU time for %s %9.2f sec, wall time %9.2f sec'
                   % (msg, rec._t0-cpu0, rec._w0-wall0))
         return rec._t0, rec._w0
     else:
         rec._t0 = time.clock()
+        if profiler is not None:
+            profiler.record(msg, cpu0, rec._t0)
         if rec.verbose >= TIMER_LEVEL:
             flush(rec, '    CPU time for %s %9.2f sec' % (msg, rec._t0-cpu0))
         return rec._t0
@@ -163,9 +191,13 @@ def timer_debug1(rec, msg, cpu0=None, wall0=None):
         return timer(rec, msg, cpu0, wall0)
     elif wall0:
         rec._t0, rec._w0 = time.clock(), time.time()
+        if profiler is not None:
+            profiler.record(msg, cpu0, rec._t0, wall0, rec._w0)
         return rec._t0, rec._w0
     else:
         rec._t0 = time.clock()
+        if profiler is not None:
+            profiler.record(msg, cpu0, rec._t0)
         return rec._t0
 
 class Logger(object):
@@ -188,6 +220,189 @@ class Logger(object):
     timer = timer
     timer_debug1 = timer_debug1
 
+
+class Profiler(object):
+    '''Registry of the timing regions measured by :func:`timer`.
+
+    A region is recorded when the timer is called at the end of the region.
+    The nesting of the regions is determined by the wall time intervals.
+    For the regions timed with CPU time only, the wall time is unknown and
+    recorded as 0.  Counters for memory and IO are sampled in the records
+    and in :func:`count_io`.
+    '''
+    def __init__(self):
+        self.t_start = time.time()
+        # (name, cpu time, wall start, wall end, thread id) of each region
+        self.regions = []
+        # Cumulative counters (wall time, bytes read, bytes written) and
+        # memory samples (wall time, rss in MB), ordered by time
+        self._io = [(self.t_start, 0, 0)]
+        self._mem = [(self.t_start, _current_rss())]
+        self._lock = threading.Lock()
+
+    def record(self, name, cpu0, cpu1, wall0=None, wall1=None):
+        if wall1 is None:
+            wall1 = time.time()
+        if wall0 is None:
+            wall0 = wall1
+        rss = _current_rss()
+        with self._lock:
+            self.regions.append((name, cpu1-cpu0, wall0, wall1,
+                                 threading.current_thread().ident))
+            self._mem.append((max(wall1, self._mem[-1][0]), rss))
+
+    def count_io(self, nread=0, nwritten=0):
+        with self._lock:
+            t, r, w = self._io[-1]
+            self._io.append((max(t, time.time()), r+nread, w+nwritten))
+
+    def _counters(self):
+        '''Functions to evaluate the IO and the peak memory in a time interval'''
+        io = list(self._io)
+        mem = list(self._mem)
+        io_times = [x[0] for x in io]
+        mem_times = [x[0] for x in mem]
+        def io_between(t0, t1):
+            i0 = max(bisect.bisect_right(io_times, t0) - 1, 0)
+            i1 = max(bisect.bisect_right(io_times, t1) - 1, 0)
+            return io[i1][1] - io[i0][1], io[i1][2] - io[i0][2]
+        def peak_rss(t0, t1):
+            i0 = bisect.bisect_left(mem_times, t0)
+            i1 = bisect.bisect_right(mem_times, t1)
+            return max([x[1] for x in mem[i0:i1]] or [0])
+        return io_between, peak_rss
+
+    def events(self):
+        '''All recorded regions with their counters, ordered by the start
+        time.  Each event is a dict with keys name, cpu, wall, start, end,
+        tid, peak_rss (MB), read and written (bytes).
+        '''
+        io_between, peak_rss = self._counters()
+        events = []
+        for name, cpu, t0, t1, tid in list(self.regions):
+            nread, nwritten = io_between(t0, t1)
+            events.append({'name': name, 'cpu': cpu, 'wall': t1-t0,
+                           'start': t0, 'end': t1, 'tid': tid,
+                           'peak_rss': peak_rss(t0, t1),
+                           'read': nread, 'written': nwritten})
+        events.sort(key=lambda e: (e['tid'], e['start'], -e['end']))
+        return events
+
+    def tree(self):
+        '''Aggregate the regions into a tree.  Regions of the same name
+        (ignoring the numbers in the name, eg the cycle counter) under the
+        same parent region are merged.  Each node is a dict with keys name,
+        count, cpu, wall, peak_rss, read, written and children.
+        '''
+        def new_node(name):
+            return {'name': name, 'count': 0, 'cpu': 0., 'wall': 0.,
+                    'peak_rss': 0., 'read': 0, 'written': 0, 'children': []}
+
+        # Link each region to its innermost enclosing region
+        events = self.events()
+        parents = [None] * len(events)
+        stack = []
+        for i, e in enumerate(events):
+            while stack and (events[stack[-1]]['tid'] != e['tid'] or
+                             events[stack[-1]]['end'] < e['end']):
+                stack.pop()
+            if stack:
+                parents[i] = stack[-1]
+            stack.append(i)
+
+        root = new_node('total')
+        nodes = [None] * len(events)
+        for i, e in enumerate(events):
+            if parents[i] is None:
+                parent = root
+            else:
+                parent = nodes[parents[i]]
+            key = _NUMBERS.sub('#', e['name'])
+            for node in parent['children']:
+                if node['name'] == key:
+                    break
+            else:
+                node = new_node(key)
+                parent['children'].append(node)
+            node['count'] += 1
+            node['cpu'] += e['cpu']
+            node['wall'] += e['wall']
+            node['peak_rss'] = max(node['peak_rss'], e['peak_rss'])
+            node['read'] += e['read']
+            node['written'] += e['written']
+            nodes[i] = node
+
+        io_between, peak_rss = self._counters()
+        t1 = time.time()
+        root['count'] = 1
+        root['wall'] = t1 - self.t_start
+        root['cpu'] = sum(x['cpu'] for x in root['children'])
+        root['peak_rss'] = peak_rss(self.t_start, t1)
+        root['read'], root['written'] = io_between(self.t_start, t1)
+        return root
+
+    def dump_json(self, filename):
+        '''Write the region tree (see :meth:`tree`) in JSON format'''
+        with open(filename, 'w') as f:
+            json.dump(self.tree(), f, indent=1)
+
+    def dump_chrome_trace(self, filename):
+        '''Write the regions in the Chrome trace event format'''
+        pid = os.getpid()
+        trace = []
+        for e in self.events():
+            trace.append({'name': e['name'], 'ph': 'X', 'pid': pid,
+                          'tid': e['tid'],
+                          'ts': (e['start']-self.t_start) * 1e6,
+                          'dur': e['wall'] * 1e6,
+                          'args': {'cpu': e['cpu'], 'peak_rss': e['peak_rss'],
+                                   'read': e['read'], 'written': e['written']}})
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+
+    def dump(self, filename):
+        '''Write the profile in the Chrome trace format if filename ends with
+        .trace or .trace.json, otherwise in JSON format.'''
+        if filename.endswith(('.trace', '.trace.json')):
+            self.dump_chrome_trace(filename)
+        else:
+            self.dump_json(filename)
+
+_NUMBERS = re.compile(r'\b\d+\b')
+
+def _current_rss():
+    from pyscf.lib.misc import current_memory
+    return current_memory()[0]
+
+# The active Profiler.  Timing regions are not recorded if it is None.
+profiler = None
+
+def enable_profile():
+    '''Start to record the timing regions in a new :class:`Profiler`'''
+    global profiler
+    profiler = Profiler()
+    return profiler
+
+def disable_profile():
+    '''Stop recording the timing regions.  Returns the last Profiler.'''
+    global profiler
+    prof, profiler = profiler, None
+    return prof
+
+def count_io(nread=0, nwritten=0):
+    '''Report the bytes read from or written to HDF5 files to the profiler'''
+    if profiler is not None:
+        profiler.count_io(nread, nwritten)
+
+if param.PROFILE:
+    import atexit
+    enable_profile()
+    def _dump_profile():
+        if profiler is not None:
+            profiler.dump(param.PROFILE)
+    atexit.register(_dump_profile)
+
+
 def new_logger(rec=None, verbose=None):
     if isinstance(verbose, Logger):
         log = verbose
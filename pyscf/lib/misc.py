@@ -13,10 +13,15 @@ import tempfile
 import shutil
 import functools
 import itertools
+import collections
 import math
 import ctypes
 import numpy
 import h5py
+try:
+    import queue
+except ImportError:  # python2
+    import Queue as queue
 from pyscf.lib import param
 
 c_double_p = ctypes.POINTER(ctypes.c_double)
@@ -398,6 +403,7 @@ def izip(*args):
     else:
         return zip(*args)
 
+import threading
 from threading import Thread
 from multiprocessing import Queue, Process
 class ProcessWithReturnValue(Process):
@@ -464,6 +470,60 @@ def ndpointer(*args, **kwargs):
     return type(base.__name__, (base,), {'from_param': from_param})
 
 
+def _sync_mode():
+    '''Whether to disable the asynchronous mode'''
+# Some modules like nosetests, coverage etc
+#   python -m unittest test_xxx.py  or  nosetests test_xxx.py
+# hang when Python multi-threading was used in the import stage due to (Python
+# import lock) bug in the threading module.  See also
+# https://github.com/paramiko/paramiko/issues/104
+# https://docs.python.org/2/library/threading.html#importing-in-threaded-code
+# Disable the asynchoronous mode for safe importing
+    return imp.lock_held()
+
+class _BackgroundWorker(Thread):
+    '''A thread to execute the submitted tasks in the order of submission.
+    At most depth tasks are outstanding.  The first exception raised by the
+    tasks is re-raised in the caller at the next submit or at shutdown.
+    '''
+    def __init__(self, depth=1):
+        Thread.__init__(self)
+        self.daemon = True
+        self.tasks = queue.Queue()
+        self.slots = threading.Semaphore(depth)
+        self.error = None
+        self.start()
+
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            fn, args, kwargs = task
+            try:
+                if self.error is None:
+                    fn(*args, **kwargs)
+            except BaseException as err:
+                self.error = err
+            finally:
+                self.slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        self.slots.acquire()
+        self.check_error()
+        self.tasks.put((fn, args, kwargs))
+
+    def check_error(self):
+        if self.error is not None:
+            err, self.error = self.error, None
+            raise err
+
+    def shutdown(self, check_error=True):
+        self.tasks.put(None)
+        self.join()
+        if check_error:
+            self.check_error()
+
 class call_in_background(object):
     '''Asynchonously execute the given function
 
@@ -479,30 +539,34 @@ class call_in_background(object):
             do_something_else()
             afun1(a, b)
             do_something_else()
+
+    The calls are executed in one background thread in the order they were
+    made.  By default a call waits for the previous call to finish, so
+    that the buffers of the previous call can be reused.  The kwarg depth
+    allows up to depth outstanding calls (depth=0 calls the function
+    synchronously).  The caller should not modify the
+    arguments of the outstanding calls.  Exceptions raised in the
+    background are re-raised by the next call or at the end of the with
+    statement.
+
+        with call_in_background(save, depth=4) as async_save:
+            for i in range(n):
+                async_save(i, compute(i))
     '''
-    def __init__(self, *fns):
+    def __init__(self, *fns, **kwargs):
         self.fns = fns
+        self.depth = kwargs.get('depth', 1)
         self.handler = None
 
     def __enter__(self):
-        if imp.lock_held():
-# Some modules like nosetests, coverage etc
-#   python -m unittest test_xxx.py  or  nosetests test_xxx.py
-# hang when Python multi-threading was used in the import stage due to (Python
-# import lock) bug in the threading module.  See also
-# https://github.com/paramiko/paramiko/issues/104
-# https://docs.python.org/2/library/threading.html#importing-in-threaded-code
-# Disable the asynchoronous mode for safe importing
+        if _sync_mode() or self.depth < 1:
             def def_async_fn(fn):
                 return fn
         else:
+            self.handler = _BackgroundWorker(self.depth)
             def def_async_fn(fn):
                 def async_fn(*args, **kwargs):
-                    if self.handler is not None:
-                        self.handler.join()
-                    self.handler = Thread(target=fn, args=args, kwargs=kwargs)
-                    self.handler.start()
-                    return self.handler
+                    self.handler.submit(fn, *args, **kwargs)
                 return async_fn
 
         if len(self.fns) == 1:
@@ -512,7 +576,109 @@ class call_in_background(object):
 
     def __exit__(self, type, value, traceback):
         if self.handler is not None:
-            self.handler.join()
+            self.handler.shutdown(check_error=(type is None))
+            self.handler = None
+
+
+_PREFETCH_END = object()
+
+def prefetch_iter(iterable, depth=2):
+    '''Iterate over iterable in a background thread, keeping up to depth items
+    ahead of the consumer in a bounded queue.  Items are yielded in order.
+    An exception raised by the iterable is re-raised in the consumer.
+
+    Usage:
+        def load():
+            for p0, p1 in prange(0, n, blksize):
+                yield h5dat[p0:p1]
+        for buf in prefetch_iter(load(), depth=2):
+            compute(buf)
+
+    Each item should be a new object (or a buffer not reused within
+    depth+2 items) because the producer runs ahead of the consumer.
+    '''
+    if _sync_mode() or depth < 1:
+        for x in iterable:
+            yield x
+        return
+
+    items = queue.Queue(depth)
+    stop = threading.Event()
+    def put(item):
+        # Give up when the consumer is closed, otherwise the producer may
+        # block forever on a full queue
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    def producer():
+        try:
+            for x in iterable:
+                if not put((x, None)):
+                    return
+            put((_PREFETCH_END, None))
+        except BaseException as err:
+            put((_PREFETCH_END, err))
+
+    thread = Thread(target=producer)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            x, err = items.get()
+            if x is _PREFETCH_END:
+                if err is not None:
+                    raise err
+                break
+            yield x
+    finally:
+        stop.set()
+        thread.join()
+
+def map_in_background(fn, iterable, depth=2, nworkers=1, process=False):
+    '''Apply fn to each item of iterable in background workers.  The results
+    are yielded in the order of iterable.  At most depth tasks are submitted
+    ahead of the consumer.  An exception raised by fn is re-raised in the
+    consumer.
+
+    Kwargs:
+        depth : int
+            Number of tasks computed ahead of the consumer
+        nworkers : int
+            Number of threads (or processes) to evaluate fn
+        process : bool
+            Whether to use worker processes.  fn, the items and the results
+            must be picklable in this case.
+
+    Usage:
+        for eri in map_in_background(load_block, prange(0, n, blksize), depth=4):
+            compute(eri)
+    '''
+    if _sync_mode() or depth < 1:
+        for args in iterable:
+            yield fn(args)
+        return
+
+    if process:
+        from multiprocessing import Pool
+        pool = Pool(nworkers)
+    else:
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(nworkers)
+    pending = collections.deque()
+    try:
+        for args in iterable:
+            pending.append(pool.apply_async(fn, (args,)))
+            if len(pending) > depth:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
 
 
 if __name__ == '__main__':
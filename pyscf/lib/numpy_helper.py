@@ -7,7 +7,7 @@ import string
 import ctypes
 import numpy
 import math
-import re
+import itertools
 from pyscf.lib import misc
 
 '''
@@ -750,147 +750,243 @@ def einsum(idx_str, *tensors):
     Current differences compared to numpy.einsum:
     This assumes that each repeated index is actually summed (i.e. no 'i,i->i')
     and appears only twice (i.e. no 'ij,ik,il->jkl'). The output indices must
-    be explicitly specified (i.e. 'ij,j->i' and not 'ij,j').
-    '''
+    be explicitly specified (i.e. 'ij,j->i' and not 'ij,j').  Other cases are
+    passed to numpy.einsum.
 
-    DEBUG = False
-
-    idx_str = idx_str.replace(' ','')
-    indices  = "".join(re.split(',|->',idx_str))
-    if '->' not in idx_str or any(indices.count(x)>2 for x in set(indices)):
-        return numpy.einsum(idx_str,*tensors)
-
-    if idx_str.count(',') > 1:
-        indices  = re.split(',|->',idx_str)
-        indices_in = indices[:-1]
-        idx_final = indices[-1]
-        n_shared_max = 0
-        for i in range(len(indices_in)):
-            for j in range(i):
-                tmp = list(set(indices_in[i]).intersection(indices_in[j]))
-                n_shared_indices = len(tmp)
-                if n_shared_indices > n_shared_max:
-                    n_shared_max = n_shared_indices
-                    shared_indices = tmp
-                    [a,b] = [i,j]
-        tensors = list(tensors)
-        A, B = tensors[a], tensors[b]
-        idxA, idxB = indices[a], indices[b]
-        idx_out = list(idxA+idxB)
-        idx_out = "".join([x for x in idx_out if x not in shared_indices])
-        C = einsum(idxA+","+idxB+"->"+idx_out, A, B)
-        indices_in.pop(a)
-        indices_in.pop(b)
-        indices_in.append(idx_out)
-        tensors.pop(a)
-        tensors.pop(b)
-        tensors.append(C)
-        return einsum(",".join(indices_in)+"->"+idx_final,*tensors)
-
-    A, B = tensors
-    # Split the strings into a list of idx char's
-    idxA, idxBC = idx_str.split(',')
-    idxB, idxC = idxBC.split('->')
-    idxA, idxB, idxC = [list(x) for x in [idxA,idxB,idxC]]
-
-    if DEBUG:
-        print("*** Einsum for", idx_str)
-        print(" idxA =", idxA)
-        print(" idxB =", idxB)
-        print(" idxC =", idxC)
-
-    # Get the range for each index and put it in a dictionary
-    rangeA = dict()
-    rangeB = dict()
-    #rangeC = dict()
-    for idx,rnge in zip(idxA,A.shape):
-        rangeA[idx] = rnge
-    for idx,rnge in zip(idxB,B.shape):
-        rangeB[idx] = rnge
-    #for idx,rnge in zip(idxC,C.shape):
-    #    rangeC[idx] = rnge
-
-    if DEBUG:
-        print("rangeA =", rangeA)
-        print("rangeB =", rangeB)
-
-    # Find the shared indices being summed over
-    shared_idxAB = list(set(idxA).intersection(idxB))
-    #if len(shared_idxAB) == 0:
-    #    return np.einsum(idx_str,A,B)
-    idxAt = list(idxA)
-    idxBt = list(idxB)
-    inner_shape = 1
-    insert_B_loc = 0
-    for n in shared_idxAB:
-        if rangeA[n] != rangeB[n]:
-            print("ERROR: In index string", idx_str, ", the range of index", n, "is different in A (%d) and B (%d)"%(
-                    rangeA[n], rangeB[n]))
-            raise SystemExit
-
-        # Bring idx all the way to the right for A
-        # and to the left (but preserve order) for B
-        idxA_n = idxAt.index(n)
-        idxAt.insert(len(idxAt)-1, idxAt.pop(idxA_n))
-
-        idxB_n = idxBt.index(n)
-        idxBt.insert(insert_B_loc, idxBt.pop(idxB_n))
-        insert_B_loc += 1
-
-        inner_shape *= rangeA[n]
-
-    if DEBUG:
-        print("shared_idxAB =", shared_idxAB)
-        print("inner_shape =", inner_shape)
-
-    if (not numpy.any(A)) or (not numpy.any(B)):
-        Cshape = list()
-        for idx in idxC:
-            if idx in idxA:
-                Cshape.append(rangeA[idx])
-            else:
-                Cshape.append(rangeB[idx])
-        return numpy.zeros(tuple(Cshape), dtype=numpy.result_type(A,B))
-
-    # Transpose the tensors into the proper order and reshape into matrices
-    new_orderA = list()
-    for idx in idxAt:
-        new_orderA.append(idxA.index(idx))
-    new_orderB = list()
-    for idx in idxBt:
-        new_orderB.append(idxB.index(idx))
-
-    if DEBUG:
-        print("Transposing A as", new_orderA)
-        print("Transposing B as", new_orderB)
-        print("Reshaping A as (-1,", inner_shape, ")")
-        print("Reshaping B as (", inner_shape, ",-1)")
-
-    # A or B might be HDF5 Datasets 
-    A = numpy.array(A, copy=False)
-    B = numpy.array(B, copy=False)
-
-    At = A.transpose(new_orderA).reshape(-1,inner_shape)
-    Bt = B.transpose(new_orderB).reshape(inner_shape,-1)
-
-    shapeCt = list()
-    idxCt = list()
-    for idx in idxAt:
-        if idx in shared_idxAB:
-            break
-        shapeCt.append(rangeA[idx])
-        idxCt.append(idx)
-    for idx in idxBt:
-        if idx in shared_idxAB:
-            continue
-        shapeCt.append(rangeB[idx])
-        idxCt.append(idx)
-
-    new_orderCt = list()
-    for idx in idxC:
-        new_orderCt.append(idxCt.index(idx))
-
-    return numpy.dot(At,Bt).reshape(shapeCt).transpose(new_orderCt)
+    The contraction order of more than two tensors is chosen to minimize the
+    FLOP count, and the tensors are laid out for GEMM with as few transposes
+    as possible.  The plan is cached for each (subscripts, shapes, dtypes).
+    '''
+    # A or B might be HDF5 Datasets
+    tensors = [numpy.asarray(t) for t in tensors]
+    key = (idx_str, tuple([t.shape for t in tensors]),
+           tuple([t.dtype.char for t in tensors]))
+    plan = _EINSUM_PLANS.get(key)
+    if plan is None:
+        plan = _einsum_plan(idx_str, [t.shape for t in tensors])
+        if len(_EINSUM_PLANS) >= EINSUM_PLAN_CACHE_SIZE:
+            _EINSUM_PLANS.clear()
+        _EINSUM_PLANS[key] = plan
+
+    if plan is None:
+        return numpy.einsum(idx_str, *tensors)
+
+    for i, j, pair in plan:
+        a = tensors[i]
+        b = tensors[j]
+        # remove the larger position first
+        tensors.pop(max(i, j))
+        tensors.pop(min(i, j))
+        tensors.append(_contract_pair(a, b, pair))
+    return tensors[0]
+
+# Cache of the contraction plans. The entries are keyed by the subscripts,
+# shapes and dtypes of the operands.
+EINSUM_PLAN_CACHE_SIZE = 4096
+_EINSUM_PLANS = {}
+
+def _einsum_plan(idx_str, shapes):
+    '''Contraction path and GEMM layouts.  None if the subscripts are not
+    supported (numpy.einsum is called in that case).'''
+    subscripts = idx_str.replace(' ', '')
+    if '->' not in subscripts or '.' in subscripts:
+        return None
+    inputs, output = subscripts.split('->')
+    inputs = inputs.split(',')
+    if len(inputs) != len(shapes) or len(inputs) < 2:
+        return None
+
+    indices = ''.join(inputs) + output
+    if any(indices.count(x) != 2 for x in set(indices)):
+        return None
+    if any(len(set(x)) != len(x) for x in inputs + [output]):
+        return None
+    if any(len(x) != len(shape) for x, shape in zip(inputs, shapes)):
+        return None
+    if any(_shape_size(shape) == 0 for shape in shapes):
+        return None
+
+    dims = {}
+    for idx, shape in zip(inputs, shapes):
+        for x, n in zip(idx, shape):
+            if dims.setdefault(x, n) != n:
+                raise ValueError('In index string %s, the range of index %s is '
+                                 'different (%d and %d)' % (idx_str, x, dims[x], n))
+
+    path = _optimal_path(inputs, output, dims)
+
+    operands = list(inputs)
+    plan = []
+    for i, j in path:
+        idxA, idxB = operands[i], operands[j]
+        operands.pop(max(i, j))
+        operands.pop(min(i, j))
+        if operands:
+            idx_out = None
+        else:
+            idx_out = output
+        pair, idxC = _pair_plan(idxA, idxB, idx_out, dims)
+        operands.append(idxC)
+        plan.append((i, j, pair))
+    return plan
+
+def _shape_size(shape):
+    n = 1
+    for x in shape:
+        n *= x
+    return n
+
+def _optimal_path(inputs, output, dims):
+    '''Pairwise contraction order with the minimal FLOP count.  Returns the
+    positions of the two operands in the list of remaining operands for each
+    step (the intermediate is appended to the end of the list), as the path
+    of numpy.einsum_path.'''
+    n = len(inputs)
+    if n == 2:
+        return [(0, 1)]
+
+    # The indices of the intermediate of a subset of operands are those shared
+    # with the other operands or the output
+    def subset_indices(subset):
+        inner = set(''.join(inputs[k] for k in subset))
+        outer = set(output + ''.join(inputs[k] for k in range(n)
+                                     if k not in subset))
+        return inner.intersection(outer)
+
+    def flops(indices):
+        c = 1
+        for x in indices:
+            c *= dims[x]
+        return c
+
+    best = {}
+    for k in range(n):
+        best[(k,)] = (0, None)
+
+    if n <= 6:
+        # dynamic programming over all subsets
+        for size in range(2, n+1):
+            for subset in itertools.combinations(range(n), size):
+                cost = None
+                for r in range(1, size//2+1):
+                    for left in itertools.combinations(subset, r):
+                        right = tuple(k for k in subset if k not in left)
+                        if r*2 == size and left > right:
+                            continue
+                        c = (best[left][0] + best[right][0] +
+                             flops(subset_indices(left) | subset_indices(right)))
+                        if cost is None or c < cost:
+                            cost = c
+                            split = (left, right)
+                best[subset] = (cost, split)
+        tree = tuple(range(n))
+    else:
+        # greedy, contract the pair with the lowest cost first
+        nodes = [(k,) for k in range(n)]
+        while len(nodes) > 1:
+            pairs = [(flops(subset_indices(a) | subset_indices(b)), ia, ib)
+                     for ia, a in enumerate(nodes)
+                     for ib, b in enumerate(nodes) if ia < ib]
+            c, ia, ib = min(pairs)
+            a, b = nodes[ia], nodes[ib]
+            best[tuple(sorted(a+b))] = (c, (a, b))
+            nodes = [x for k, x in enumerate(nodes) if k not in (ia, ib)]
+            nodes.append(tuple(sorted(a+b)))
+        tree = nodes[0]
+
+    # Convert the tree to the positions in the list of remaining operands
+    path = []
+    operands = [(k,) for k in range(n)]
+    def walk(node):
+        split = best[node][1]
+        if split is None:
+            return
+        walk(split[0])
+        walk(split[1])
+        i = operands.index(split[0])
+        j = operands.index(split[1])
+        operands.remove(split[0])
+        operands.remove(split[1])
+        operands.append(node)
+        path.append((i, j))
+    walk(tree)
+    return path
+
+def _pair_plan(idxA, idxB, idx_out, dims):
+    '''GEMM layout to contract A and B.  The shared indices are summed.  If
+    idx_out is None the order of the output indices is chosen to avoid
+    transposing the result.'''
+    shared = [x for x in idxA if x in idxB]
+    candidates = []
+    for swap in (False, True):
+        if swap:
+            idx1, idx2 = idxB, idxA
+        else:
+            idx1, idx2 = idxA, idxB
+        kept1 = [x for x in idx1 if x not in shared]
+        kept2 = [x for x in idx2 if x not in shared]
+        idxC = ''.join(kept1 + kept2)
+        if idx_out is None or idx_out == idxC:
+            perm_out = None
+        else:
+            perm_out = tuple(idxC.index(x) for x in idx_out)
+        for order in (shared, [x for x in idx2 if x in shared]):
+            layout1, cost1 = _gemm_layout(idx1, kept1, order, True)
+            layout2, cost2 = _gemm_layout(idx2, kept2, order, False)
+            ncopy = cost1 + cost2 + (perm_out is not None)
+            candidates.append((ncopy, swap, layout1, layout2, perm_out, idxC))
+    ncopy, swap, layout1, layout2, perm_out, idxC = min(candidates,
+                                                       key=lambda x: x[0])
+
+    k = _shape_size([dims[x] for x in shared])
+    shapeC = tuple(dims[x] for x in idxC)
+    pair = (swap, layout1[0], layout1[2], layout2[0], layout2[2],
+            k, shapeC, perm_out)
+    if idx_out is not None:
+        idxC = idx_out
+    return pair, idxC
+
+def _gemm_layout(idx, kept, order, left):
+    '''How to view the tensor as the matrix (kept, shared) for the left
+    operand or (shared, kept) for the right operand.  Returns the permutation
+    (None if the tensor is not transposed), the kept indices, the flag to
+    transpose the matrix, and the number of copies needed.'''
+    idx = list(idx)
+    if left:
+        if idx == kept + order:
+            return (None, kept, False), 0
+        elif idx == order + kept:
+            return (None, kept, True), 0
+        perm = tuple(idx.index(x) for x in kept + order)
+        return (perm, kept, False), 1
+    else:
+        if idx == order + kept:
+            return (None, kept, False), 0
+        elif idx == kept + order:
+            return (None, kept, True), 0
+        perm = tuple(idx.index(x) for x in order + kept)
+        return (perm, kept, False), 1
+
+def _contract_pair(a, b, pair):
+    swap, perm1, trans1, perm2, trans2, k, shapeC, perm_out = pair
+    if swap:
+        a, b = b, a
+    if perm1 is not None:
+        a = a.transpose(perm1)
+    if perm2 is not None:
+        b = b.transpose(perm2)
+    if trans1:
+        a = a.reshape(k,-1).T
+    else:
+        a = a.reshape(-1,k)
+    if trans2:
+        b = b.reshape(-1,k).T
+    else:
+        b = b.reshape(k,-1)
+    c = numpy.dot(a, b).reshape(shapeC)
+    if perm_out is not None:
+        c = c.transpose(perm_out)
+    return c
 
 
 class NPArrayWithTag(numpy.ndarray):
@@ -7,6 +7,11 @@ L_MAX      = 8
 MAX_MEMORY = int(os.environ.get('PYSCF_MAX_MEMORY', 4000)) # MB
 TMPDIR = os.environ.get('TMPDIR', '.')
 TMPDIR = os.environ.get('PYSCF_TMPDIR', TMPDIR)
+# Directory to keep the parsed basis sets.  Disk cache is disabled if it is None
+BASIS_CACHE_DIR = os.environ.get('PYSCF_BASIS_CACHE_DIR', None)
+# Directory to keep the atomic SCF results of the initial guess.  Disk cache is
+# disabled if it is None
+ATOM_SCF_CACHE_DIR = os.environ.get('PYSCF_ATOM_SCF_CACHE_DIR', None)
 
 LIGHT_SPEED = 137.03599967994  #http://physics.nist.gov/cgi-bin/cuu/Value?alph
 #LIGHT_SPEED = 137.0359895
@@ -209,6 +214,9 @@ VERBOSE_CRIT   = -1
 VERBOSE_ALERT  = -2
 VERBOSE_PANIC  = -3
 TIMER_LEVEL    = VERBOSE_DEBUG
+# File to export the timing profile at exit, see lib.logger.Profiler.  The
+# Chrome trace format is used if the filename ends with .trace or .trace.json
+PROFILE = os.environ.get('PYSCF_PROFILE', None)
 
 POSX = 1
 POSY = 2
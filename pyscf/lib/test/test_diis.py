@@ -0,0 +1,77 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy
+from pyscf import lib
+
+def fn(x):
+    # fixed point of x = a*x + b
+    a = numpy.diag(numpy.linspace(.1, .9, x.size))
+    a[0,1:] = .05
+    b = numpy.arange(x.size) * .1
+    return numpy.dot(a, x) + b
+
+class KnowValues(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_diis(self, adiis, x, niter, with_err):
+        for i in range(niter):
+            x1 = fn(x)
+            if with_err:
+                x = adiis.update(x1, xerr=x1-x)
+            else:
+                x = adiis.update(x1)
+        return x
+
+    def test_memmap(self):
+        x0 = numpy.zeros(20)
+        for with_err in (True, False):
+            ref = self.run_diis(lib.diis.DIIS(), x0, 9, with_err)
+            filename = os.path.join(self.tmpdir, 'diis%d' % with_err)
+            adiis = lib.diis.DIIS(filename=filename)
+            x = self.run_diis(adiis, x0, 9, with_err)
+            self.assertTrue(adiis._diisfile is not None)
+            self.assertEqual(adiis._buffer, {})
+            self.assertAlmostEqual(abs(x-ref).max(), 0, 12)
+            self.assertTrue(os.path.isfile(filename + '.meta'))
+
+    def test_large_vector_tmpfile(self):
+        incore_size = lib.diis.INCORE_SIZE
+        block_size = lib.diis.BLOCK_SIZE
+        try:
+            lib.diis.INCORE_SIZE = 10
+            lib.diis.BLOCK_SIZE = 7
+            x0 = numpy.zeros(20)
+            ref = self.run_diis(lib.diis.DIIS(), x0, 8, False)
+            adiis = lib.diis.DIIS()
+            x = self.run_diis(adiis, x0, 8, False)
+            self.assertTrue(isinstance(adiis.get_vec(0), numpy.memmap))
+        finally:
+            lib.diis.INCORE_SIZE = incore_size
+            lib.diis.BLOCK_SIZE = block_size
+        self.assertAlmostEqual(abs(x-ref).max(), 0, 12)
+
+    def test_restore(self):
+        x0 = numpy.zeros(20)
+        for with_err in (True, False):
+            filename = os.path.join(self.tmpdir, 'diis%d' % with_err)
+            adiis = lib.diis.DIIS(filename=filename)
+            x = self.run_diis(adiis, x0, 4, with_err)
+            del adiis
+
+            adiis = lib.diis.restore(filename)
+            self.assertEqual(adiis.get_num_vec(), 4 if with_err else 3)
+            x_restore = self.run_diis(adiis, x, 3, with_err)
+            x_ref = self.run_diis(lib.diis.DIIS(filename=filename+'ref'),
+                                  x0, 7, with_err)
+            self.assertAlmostEqual(abs(x_restore-x_ref).max(), 0, 9)
+
+
+if __name__ == "__main__":
+    print("Full Tests for lib.diis")
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import json
+import time
+import tempfile
+import numpy
+from pyscf import lib
+from pyscf.lib import logger
+
+class KnowValues(unittest.TestCase):
+    def test_profile(self):
+        log = logger.Logger(verbose=0)
+        prof = logger.enable_profile()
+        try:
+            t0 = (time.clock(), time.time())
+            for i in range(3):
+                t1 = (time.clock(), time.time())
+                ftmp = tempfile.NamedTemporaryFile()
+                lib.chkfile.save(ftmp.name, 'a', numpy.ones(100))
+                lib.chkfile.load(ftmp.name, 'a')
+                log.timer_debug1('step %d' % i, *t1)
+            log.timer('outer', *t0)
+        finally:
+            logger.disable_profile()
+        log.timer('not recorded', *t0)
+
+        self.assertEqual(len(prof.regions), 4)
+        tree = prof.tree()
+        self.assertEqual(len(tree['children']), 1)
+        outer = tree['children'][0]
+        self.assertEqual(outer['name'], 'outer')
+        self.assertEqual(outer['count'], 1)
+        self.assertEqual(outer['read'], 2400)
+        self.assertEqual(outer['written'], 2400)
+        self.assertEqual(len(outer['children']), 1)
+        step = outer['children'][0]
+        self.assertEqual(step['name'], 'step #')
+        self.assertEqual(step['count'], 3)
+        self.assertTrue(step['wall'] <= outer['wall'])
+
+        ftmp = tempfile.NamedTemporaryFile(suffix='.trace.json')
+        prof.dump(ftmp.name)
+        with open(ftmp.name) as f:
+            trace = json.load(f)['traceEvents']
+        self.assertEqual([e['name'] for e in trace],
+                         ['outer', 'step 0', 'step 1', 'step 2'])
+
+        ftmp = tempfile.NamedTemporaryFile(suffix='.json')
+        prof.dump(ftmp.name)
+        with open(ftmp.name) as f:
+            self.assertEqual(json.load(f)['children'][0]['name'], 'outer')
+
+
+if __name__ == "__main__":
+    print("Full Tests for lib.logger")
+    unittest.main()
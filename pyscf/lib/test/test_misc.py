@@ -0,0 +1,85 @@
+import unittest
+import time
+import threading
+import numpy
+from pyscf import lib
+
+def square(x):
+    return x * x
+
+class KnowValues(unittest.TestCase):
+    def test_call_in_background(self):
+        out = []
+        def save(i, dat):
+            time.sleep(.002)
+            out.append((i, dat))
+        with lib.call_in_background(save, depth=3) as async_save:
+            for i in range(10):
+                async_save(i, i*2)
+        self.assertEqual(out, [(i, i*2) for i in range(10)])
+
+        def fail(i):
+            if i == 2:
+                raise ValueError
+        def run():
+            with lib.call_in_background(fail, depth=2) as async_fail:
+                for i in range(5):
+                    async_fail(i)
+        self.assertRaises(ValueError, run)
+
+    def test_prefetch_iter(self):
+        def load():
+            for i in range(20):
+                time.sleep(.001)
+                yield i
+        self.assertEqual(list(lib.prefetch_iter(load(), 3)), list(range(20)))
+
+        def load_fail():
+            yield 1
+            raise KeyError
+        self.assertRaises(KeyError, list, lib.prefetch_iter(load_fail()))
+
+        # Stop the producer when the consumer quits early
+        for i in lib.prefetch_iter(load(), 2):
+            if i == 4:
+                break
+        self.assertEqual(i, 4)
+
+    def test_prefetch_iter_early_close(self):
+        # The producer has finished and the queue is full when the consumer
+        # is closed
+        def consume():
+            it = lib.prefetch_iter(iter(range(3)), 1)
+            next(it)
+            next(it)
+            time.sleep(.2)
+            it.close()
+        t = threading.Thread(target=consume)
+        t.daemon = True
+        t.start()
+        t.join(5)
+        self.assertFalse(t.is_alive())
+
+        def fail_in_body():
+            for i in lib.prefetch_iter(iter(range(3)), 1):
+                time.sleep(.2)
+                if i == 1:
+                    raise KeyError
+        t = threading.Thread(target=self.assertRaises, args=(KeyError, fail_in_body))
+        t.daemon = True
+        t.start()
+        t.join(5)
+        self.assertFalse(t.is_alive())
+
+    def test_map_in_background(self):
+        ref = [x*x for x in range(30)]
+        self.assertEqual(list(lib.map_in_background(square, range(30), 4, 3)), ref)
+        self.assertEqual(list(lib.map_in_background(square, range(30), 2, 2,
+                                                    process=True)), ref)
+        self.assertRaises(TypeError, list,
+                          lib.map_in_background(square, [1, None, 2]))
+
+
+if __name__ == "__main__":
+    print("Full Tests for lib.misc")
+    unittest.main()
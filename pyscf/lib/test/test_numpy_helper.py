@@ -0,0 +1,42 @@
+import unittest
+import numpy
+from pyscf import lib
+
+class KnowValues(unittest.TestCase):
+    def test_einsum(self):
+        numpy.random.seed(1)
+        a = numpy.random.random((5,6,7))
+        b = numpy.random.random((7,5,4))
+        c = numpy.random.random((4,3))
+        d = numpy.random.random((3,6))
+        for idx, args in (('ijk,kil->jl', (a, b)),
+                          ('ijk,kil->lj', (a, b)),
+                          ('kil,ijk->jl', (b, a)),
+                          ('ijk,ijk->', (a, a)),
+                          ('ijk,lm->ijklm', (a, c)),
+                          ('ijk,kil,lm,mj->', (a, b, c, d)),
+                          ('ijk,kil,lm->ijm', (a, b, c)),
+                          ('ijk,ijk->ijk', (a, a)),
+                          ('iij,jk->ik', (numpy.ones((3,3,4)), c)),
+                          ('ijk,jl', (a, numpy.ones((6,2))))):
+            ref = numpy.einsum(idx, *args)
+            self.assertAlmostEqual(abs(lib.einsum(idx, *args) - ref).max(), 0, 12)
+        # Hit the cached plan
+        self.assertAlmostEqual(abs(lib.einsum('ijk,kil->lj', a, b) -
+                                   numpy.einsum('ijk,kil->lj', a, b)).max(), 0, 12)
+
+        z = lib.einsum('ij,jk->ik', numpy.zeros((3,0)), numpy.zeros((0,4)))
+        self.assertEqual(z.shape, (3,4))
+        self.assertRaises(ValueError, lib.einsum, 'ij,jk->ik', a[0], c)
+
+    def test_einsum_path(self):
+        dims = {'i': 2, 'j': 20, 'k': 2, 'l': 20}
+        # (A*B)*C is cheaper than A*(B*C) here
+        path = lib.numpy_helper._optimal_path(['ij', 'jk', 'kl'], 'il', dims)
+        self.assertEqual(path, [(0, 1), (0, 1)])
+        path = lib.numpy_helper._optimal_path(['kl', 'ij', 'jk'], 'il', dims)
+        self.assertEqual(path, [(1, 2), (0, 1)])
+
+if __name__ == "__main__":
+    print("Full Tests for numpy_helper")
+    unittest.main()
@@ -103,6 +103,49 @@ int CVHFnrs8_prescreen(int *shls, CVHFOpt *opt,
             || (  opt->dm_cond[i*n+l] > dmin));
 }
 
+/*
+ * For integrals which have different Schwarz bounds for bra and ket, e.g. the
+ * derivative integrals (nabla i j|kl).  opt->q_cond[:nbas*nbas] are the
+ * bounds of bra and opt->q_cond[nbas*nbas:] are the bounds of ket.  The
+ * density matrices (if available) are screened without assuming any
+ * permutation symmetry.
+ */
+#define DMCOND(i, j)    MAX(opt->dm_cond[(i)*n+(j)], opt->dm_cond[(j)*n+(i)])
+int CVHFnr_braket_prescreen(int *shls, CVHFOpt *opt,
+                            int *atm, int *bas, double *env)
+{
+        if (!opt) {
+                return 1; // no screen
+        }
+        int i = shls[0];
+        int j = shls[1];
+        int k = shls[2];
+        int l = shls[3];
+        int n = opt->nbas;
+        assert(opt->q_cond);
+        assert(i < n);
+        assert(j < n);
+        assert(k < n);
+        assert(l < n);
+        double *q_ket = opt->q_cond + n*n;
+        double qijkl = opt->q_cond[i*n+j] * q_ket[k*n+l];
+        if (qijkl <= opt->direct_scf_cutoff) {
+                return 0;
+        } else if (!opt->dm_cond) {
+                return 1;
+        }
+        // factor 2 for the contributions of both (kl| and (lk| when
+        // permutation symmetry is used in the integral loops
+        double dmin = opt->direct_scf_cutoff / qijkl * .5;
+        return ((DMCOND(i, j) > dmin)
+             || (DMCOND(k, l) > dmin)
+             || (DMCOND(j, k) > dmin)
+             || (DMCOND(j, l) > dmin)
+             || (DMCOND(i, k) > dmin)
+             || (DMCOND(i, l) > dmin));
+}
+#undef DMCOND
+
 // return flag to decide whether transpose01324
 int CVHFr_vknoscreen(int *shls, CVHFOpt *opt,
                      double **dms_cond, int n_dm, double *dm_atleast,
@@ -178,6 +221,84 @@ void CVHFsetnr_direct_scf(CVHFOpt *opt, int *atm, int natm,
 }
 }
 
+/*
+ * Schwarz bounds sqrt(max|(ij|ij)|) of all shell pairs for the given
+ * two-electron integrals.  For derivative integrals which have ncomp = m*m
+ * components, e.g. int2e_ip1ip2 (nabla i j|nabla k l), the bounds are
+ * computed with the diagonal components (nabla_x i j|nabla_x i j).
+ * If hermi != 0, q_cond[i,j] is assumed to be equal to q_cond[j,i].
+ */
+void CVHFnr_int2e_q_cond(int (*intor)(), CINTOpt *cintopt, double *q_cond,
+                         int *ao_loc, int ncomp, int hermi,
+                         int *atm, int natm, int *bas, int nbas, double *env)
+{
+        int shls_slice[] = {0, nbas};
+        const int cache_size = GTOmax_cache_size(intor, shls_slice, 1,
+                                                 atm, natm, bas, nbas, env);
+        const int nd = (int)(sqrt(ncomp) + .5);
+#pragma omp parallel default(none) \
+        shared(intor, cintopt, q_cond, ao_loc, ncomp, hermi, \
+               atm, natm, bas, nbas, env)
+{
+        double qtmp, tmp;
+        int ij, i, j, di, dj, ish, jsh, ic;
+        int shls[4];
+        double *cache = malloc(sizeof(double) * cache_size);
+        di = 0;
+        for (ish = 0; ish < nbas; ish++) {
+                dj = ao_loc[ish+1] - ao_loc[ish];
+                di = MAX(di, dj);
+        }
+        double *buf = malloc(sizeof(double) * di*di*di*di*ncomp);
+        double *pbuf;
+#pragma omp for schedule(dynamic, 4)
+        for (ij = 0; ij < nbas*nbas; ij++) {
+                ish = ij / nbas;
+                jsh = ij % nbas;
+                if (hermi && jsh > ish) {
+                        continue;
+                }
+                di = ao_loc[ish+1] - ao_loc[ish];
+                dj = ao_loc[jsh+1] - ao_loc[jsh];
+                shls[0] = ish;
+                shls[1] = jsh;
+                shls[2] = ish;
+                shls[3] = jsh;
+                qtmp = 1e-100;
+                if (0 != (*intor)(buf, NULL, shls, atm, natm, bas, nbas, env,
+                                  cintopt, cache)) {
+                        for (ic = 0; ic < nd; ic++) {
+                                pbuf = buf + di*dj*di*dj * (ic*nd+ic);
+                                for (i = 0; i < di; i++) {
+                                for (j = 0; j < dj; j++) {
+                                        tmp = fabs(pbuf[i+di*j+di*dj*i+di*dj*di*j]);
+                                        qtmp = MAX(qtmp, tmp);
+                                } }
+                        }
+                        qtmp = sqrt(qtmp);
+                }
+                q_cond[ish*nbas+jsh] = qtmp;
+                if (hermi) {
+                        q_cond[jsh*nbas+ish] = qtmp;
+                }
+        }
+        free(buf);
+        free(cache);
+}
+}
+
+/*
+ * Replace opt->q_cond by the given array which has len elements.
+ */
+void CVHFset_q_cond(CVHFOpt *opt, double *q_cond, int len)
+{
+        if (opt->q_cond) {
+                free(opt->q_cond);
+        }
+        opt->q_cond = (double *)malloc(sizeof(double) * len);
+        memcpy(opt->q_cond, q_cond, sizeof(double) * len);
+}
+
 void CVHFsetnr_direct_scf_dm(CVHFOpt *opt, double *dm, int nset, int *ao_loc,
                              int *atm, int natm, int *bas, int nbas, double *env)
 {
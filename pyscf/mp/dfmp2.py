@@ -75,13 +75,13 @@ class MP2(lib.StreamObject):
         mo = numpy.asarray(mo_coeff, order='F')
         nmo = mo.shape[1]
         ijslice = (0, nocc, nocc, nmo)
-        Lov = None
         if self.with_df is None:
             with_df = self._scf.with_df
         else:
             with_df = self.with_df
+        buf = numpy.empty((with_df.blockdim,nocc*(nmo-nocc)))
         for eri1 in with_df.loop():
-            Lov = _ao2mo.nr_e2(eri1, mo, ijslice, aosym='s2', out=Lov)
+            Lov = _ao2mo.nr_e2(eri1, mo, ijslice, aosym='s2', out=buf)
             yield Lov
 
 #    def make_rdm1(self, t2=None):
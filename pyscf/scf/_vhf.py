@@ -3,6 +3,8 @@
 import sys
 import ctypes
 import _ctypes
+import weakref
+import hashlib
 import numpy
 import pyscf.lib
 from pyscf import gto
@@ -41,7 +43,7 @@ class VHFOpt(object):
                                    c_env.ctypes.data_as(ctypes.c_void_p))
         self._this.contents.fprescreen = _fpointer(prescreen)
 
-        if prescreen != 'CVHFnoscreen':
+        if prescreen != 'CVHFnoscreen' and qcondname is not None:
             fsetqcond = getattr(libcvhf, qcondname)
             fsetqcond(self._this,
                       c_atm.ctypes.data_as(ctypes.c_void_p), natm,
@@ -55,6 +57,13 @@ class VHFOpt(object):
     def direct_scf_tol(self, v):
         self._this.contents.direct_scf_cutoff = v
 
+    def set_q_cond(self, q_cond):
+        '''Assign the Schwarz bounds (see :func:`get_q_cond`) to the
+        optimizer'''
+        q_cond = numpy.asarray(q_cond, dtype=numpy.double, order='C')
+        libcvhf.CVHFset_q_cond(self._this, q_cond.ctypes.data_as(ctypes.c_void_p),
+                               ctypes.c_int(q_cond.size))
+
     def set_dm(self, dm, atm, bas, env):
         if self._dmcondname is not None:
             c_atm = numpy.asarray(atm, dtype=numpy.int32, order='C')
@@ -85,6 +94,99 @@ class _CVHFOpt(ctypes.Structure):
                 ('fprescreen', ctypes.c_void_p),
                 ('r_vkscreen', ctypes.c_void_p)]
 
+################################################
+# Schwarz screening tables
+################################################
+# The Schwarz bounds of shell pairs are cached for each Mole object.  They are
+# shared by SCF, gradients and Hessian, and are recomputed when the basis or
+# the geometry of the molecule is changed.
+_Q_COND_CACHE = weakref.WeakKeyDictionary()
+
+# For the derivative integrals, the integrals to bound the bra and the ket.
+# |(nabla i j|kl)| <= sqrt(max|(nabla i j|nabla i j)|) * sqrt(max|(kl|kl)|)
+_SCHWARZ_BOUNDS = {
+    'int2e_ip1'   : ('int2e_ip1ip2', 'int2e'       ),
+    'int2e_ip1ip2': ('int2e_ip1ip2', 'int2e_ip1ip2'),
+}
+
+def get_q_cond(mol, intor='int2e', hermi=None):
+    '''Schwarz bounds q[i,j] = sqrt(max|(ij|ij)|) of all shell pairs.
+
+    For the derivative integrals like int2e_ip1ip2 (nabla i j|nabla k l), the
+    bounds are computed from the diagonal components
+    (nabla_x i j|nabla_x i j).  The results are cached for the given Mole
+    object.
+
+    Kwargs:
+        hermi : bool
+            Whether q[i,j] == q[j,i].  By default, it is True for the integrals
+            without derivatives.
+    '''
+    intor = ascint3(mol._add_suffix(intor))
+    if hermi is None:
+        hermi = intor.startswith('int2e_sph') or intor.startswith('int2e_cart')
+
+    atm = numpy.asarray(mol._atm, dtype=numpy.int32, order='C')
+    bas = numpy.asarray(mol._bas, dtype=numpy.int32, order='C')
+    env = numpy.asarray(mol._env, dtype=numpy.double, order='C')
+    stamp = hashlib.md5(atm.tobytes() + bas.tobytes() + env.tobytes()).digest()
+    try:
+        cached_stamp, tables = _Q_COND_CACHE[mol]
+        if cached_stamp != stamp:
+            tables = {}
+    except KeyError:
+        tables = {}
+    _Q_COND_CACHE[mol] = (stamp, tables)
+    if intor in tables:
+        return tables[intor]
+
+    natm = atm.shape[0]
+    nbas = bas.shape[0]
+    ncomp = _INT2E_NCOMP.get(intor.rsplit('_', 1)[0], 1)
+    ao_loc = make_loc(bas, intor)
+    cintopt = make_cintopt(atm, bas, env, intor)
+    q_cond = numpy.empty((nbas,nbas))
+    libcvhf.CVHFnr_int2e_q_cond(_fpointer(intor), cintopt,
+                                q_cond.ctypes.data_as(ctypes.c_void_p),
+                                ao_loc.ctypes.data_as(ctypes.c_void_p),
+                                ctypes.c_int(ncomp), ctypes.c_int(hermi),
+                                atm.ctypes.data_as(ctypes.c_void_p), ctypes.c_int(natm),
+                                bas.ctypes.data_as(ctypes.c_void_p), ctypes.c_int(nbas),
+                                env.ctypes.data_as(ctypes.c_void_p))
+    tables[intor] = q_cond
+    return q_cond
+
+_INT2E_NCOMP = {
+    'int2e'       : 1,
+    'int2e_ip1ip2': 9,
+}
+
+def nr_deriv_vhfopt(mol, intor='int2e_ip1', dm=None, direct_scf_tol=1e-13):
+    '''Create a VHFOpt for the direct contraction of the derivative
+    integrals (e.g. int2e_ip1) which screens the shell quartets with the
+    cached Schwarz bounds of bra and ket.
+
+    If dm is given, the screening also takes into account the magnitude of
+    the density matrix (or a list of density matrices).  Otherwise, the
+    density matrices passed to :func:`direct_mapdm` are used.
+    '''
+    intor = ascint3(mol._add_suffix(intor))
+    bra, ket = _SCHWARZ_BOUNDS[intor.rsplit('_', 1)[0]]
+    opt = VHFOpt(mol, intor, 'CVHFnr_braket_prescreen', None,
+                 'CVHFsetnr_direct_scf_dm')
+    opt.set_q_cond(numpy.vstack((get_q_cond(mol, bra), get_q_cond(mol, ket))))
+    opt.direct_scf_tol = direct_scf_tol
+    if dm is not None:
+        dm = numpy.asarray(dm)
+        if dm.ndim == 3:
+            dm = abs(dm).max(axis=0)
+        opt.set_dm(dm, mol._atm, mol._bas, mol._env)
+        # Keep the DM condition.  It should not be overwritten by the DMs of
+        # the integral contraction functions.
+        opt._dmcondname = None
+    return opt
+
+
 ################################################
 # for general DM
 # hermi = 0 : arbitary
@@ -266,6 +266,127 @@ def project_mo_r2r(mol1, mo1, mol2):
                          numpy.dot(ps, mo1[n2c:])))
 
 
+def aspc_coefficients(n):
+    '''Coefficients of the always stable predictor-corrector (ASPC) predictor
+    of J. Kolafa, J. Comput. Chem. 25, 335 (2004) for n previous steps.  The
+    first coefficient is for the most recent step.  n = 2 gives the linear
+    extrapolation (2, -1).
+    '''
+    k = n - 2
+    return numpy.array([(-1)**(j+1) * j * _binom(2*k+4, k+2-j) /
+                        float(_binom(2*k+2, k+1)) for j in range(1, n+1)])
+
+def _binom(n, k):
+    if k < 0 or k > n:
+        return 0
+    c = 1
+    for i in range(min(k, n-k)):
+        c = c * (n-i) // (i+1)
+    return c
+
+def occupied_orbitals(mf, mo_coeff=None, mo_occ=None):
+    '''Occupied orbitals of each spin density, in the form accepted by
+    :func:`extrapolate_dm`.  Returns None for the methods which do not use
+    scalar non-relativistic orbitals (GHF, DHF, X2C).
+
+    Returns:
+        A list of (orbitals, occupancies) for RHF, or for the alpha and beta
+        densities of ROHF and UHF.
+    '''
+    if mo_coeff is None: mo_coeff = mf.mo_coeff
+    if mo_occ is None: mo_occ = mf.mo_occ
+    mo_coeff = numpy.asarray(mo_coeff)
+    mo_occ = numpy.asarray(mo_occ)
+    if (numpy.iscomplexobj(mo_coeff) or
+        mo_coeff.shape[-2] != mf.mol.nao_nr()):
+        return None
+    if mo_coeff.ndim == 3:
+        return [(c[:,occ>0], occ[occ>0]) for c, occ in zip(mo_coeff, mo_occ)]
+    elif numpy.asarray(mf.make_rdm1(mo_coeff[:,:1], mo_occ[:1])).ndim == 3:
+        # ROHF
+        ones = numpy.ones(mo_occ.size)
+        return [(mo_coeff[:,mo_occ>0], ones[mo_occ>0]),
+                (mo_coeff[:,mo_occ==2], ones[mo_occ==2])]
+    else:
+        return [(mo_coeff[:,mo_occ>0], mo_occ[mo_occ>0])]
+
+def extrapolate_dm(mol, mols, orbitals, method='aspc'):
+    '''Predict the density matrix of mol from the occupied orbitals of the
+    previous geometries.  The orbitals of each geometry are projected to the
+    AO basis of mol with :func:`project_mo_nr2nr` and orthonormalized.
+
+    Args:
+        mol : Mole
+            The new geometry
+        mols : list of Mole
+            Previous geometries, the most recent first.  The steps are
+            assumed to be equally spaced (as in MD).
+        orbitals : list
+            The output of :func:`occupied_orbitals` for each of mols
+
+    Kwargs:
+        method : str
+            'aspc' extrapolates the density matrices with the ASPC
+            coefficients.  'grassmann' extrapolates the occupied orbitals on
+            the Grassmann manifold in the tangent space of the most recent
+            geometry, which keeps the density matrix idempotent.
+
+    Returns:
+        Density matrix, 2D ndarray for RHF, (dma, dmb) otherwise
+    '''
+    s = mol.intor_symmetric('int1e_ovlp')
+    coeff = aspc_coefficients(len(mols))
+    dms = []
+    for k in range(len(orbitals[0])):
+        occ = orbitals[0][k][1]
+        cs = [_orthonormalize(project_mo_nr2nr(m, orb[k][0], mol), s)
+              for m, orb in zip(mols, orbitals)]
+        if method.lower() == 'aspc':
+            dm = 0
+            for b, c, orb in zip(coeff, cs, orbitals):
+                dm = dm + b * numpy.dot(c*orb[k][1], c.T)
+        elif method.lower() == 'grassmann':
+            c = _grassmann_extrapolate(s, cs, coeff)
+            dm = numpy.dot(c*occ, c.T)
+        else:
+            raise ValueError('Unknown extrapolation method %s' % method)
+        dms.append(dm)
+    if len(dms) == 1:
+        return dms[0]
+    else:
+        return numpy.array(dms)
+
+def _orthonormalize(c, s):
+    e, v = numpy.linalg.eigh(reduce(numpy.dot, (c.T, s, c)))
+    return numpy.dot(c, numpy.dot(v/numpy.sqrt(e), v.T))
+
+def _grassmann_extrapolate(s, cs, coeff):
+    '''Extrapolate the subspaces spanned by cs (the most recent first) in the
+    orthonormal basis s^{1/2} on the Grassmann manifold'''
+    e, v = numpy.linalg.eigh(s)
+    x = numpy.dot(v*numpy.sqrt(e), v.T)
+    xinv = numpy.dot(v/numpy.sqrt(e), v.T)
+    y0 = numpy.dot(x, cs[0])
+    gamma = 0
+    for b, c in zip(coeff[1:], cs[1:]):
+        gamma = gamma + b * _grassmann_log(y0, numpy.dot(x, c))
+    return numpy.dot(xinv, _grassmann_exp(y0, gamma))
+
+def _grassmann_log(y0, y):
+    y0y = numpy.dot(y0.T, y)
+    p = y - numpy.dot(y0, y0y)
+    u, sig, vt = numpy.linalg.svd(numpy.linalg.solve(y0y.T, p.T).T,
+                                  full_matrices=False)
+    return numpy.dot(u*numpy.arctan(sig), vt)
+
+def _grassmann_exp(y0, gamma):
+    if isinstance(gamma, int):  # single point
+        return y0
+    u, sig, vt = numpy.linalg.svd(gamma, full_matrices=False)
+    return (numpy.dot(numpy.dot(y0, vt.T)*numpy.cos(sig), vt) +
+            numpy.dot(u*numpy.sin(sig), vt))
+
+
 def remove_linear_dep_(mf, threshold=1e-8):
     def eigh(h, s):
         d, t = numpy.linalg.eigh(s)
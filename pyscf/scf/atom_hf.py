@@ -3,8 +3,15 @@
 # Author: Qiming Sun <osirpt.sun@gmail.com>
 #
 
+import os
+import hashlib
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 import numpy
 from pyscf import gto
+from pyscf.gto.basis import _dump_cache_file
 from pyscf.lib import logger
 import pyscf.lib.parameters as param
 from pyscf.scf import hf
@@ -16,28 +23,91 @@ def get_atm_nrhf(mol):
 
     atm_scf_result = {}
     for a, b in mol._basis.items():
-        atm = gto.Mole()
-        atm.stdout = mol.stdout
-        atm.atom = atm._atom = [[a, (0, 0, 0)]]
-        atm._basis = {a: b}
-        atm.nelectron = gto.mole._charge(a)
-        atm.spin = atm.nelectron % 2
-        atm._atm, atm._bas, atm._env = \
-                atm.make_env(atm._atom, atm._basis, atm._env)
-        atm._built = True
-        if atm.nelectron == 0:  # GHOST
-            nao = atm.nao_nr()
-            mo_occ = mo_energy = numpy.zeros(nao)
-            mo_coeff = numpy.zeros((nao,nao))
-            atm_scf_result[a] = (0, mo_energy, mo_coeff, mo_occ)
-        else:
-            atm_hf = AtomSphericAverageRHF(atm)
-            atm_hf.verbose = 0
-            atm_scf_result[a] = atm_hf.scf()[1:]
-            atm_hf._eri = None
+        atm_scf_result[a] = _atm_nrhf_with_cache(mol, a, b)
     mol.stdout.flush()
     return atm_scf_result
 
+def _atm_nrhf(mol, a, b):
+    atm = gto.Mole()
+    atm.stdout = mol.stdout
+    atm.atom = atm._atom = [[a, (0, 0, 0)]]
+    atm._basis = {a: b}
+    atm.nelectron = gto.mole._charge(a)
+    atm.spin = atm.nelectron % 2
+    atm._atm, atm._bas, atm._env = \
+            atm.make_env(atm._atom, atm._basis, atm._env)
+    atm._built = True
+    if atm.nelectron == 0:  # GHOST
+        nao = atm.nao_nr()
+        mo_occ = mo_energy = numpy.zeros(nao)
+        mo_coeff = numpy.zeros((nao,nao))
+        return (0, mo_energy, mo_coeff, mo_occ)
+    else:
+        atm_hf = AtomSphericAverageRHF(atm)
+        atm_hf.verbose = 0
+        return atm_hf.scf()[1:]
+
+
+# The atomic SCF results are kept in _ATM_SCF_CACHE.  The key of each entry is
+# made of the element symbol (including the ghost prefix) and the formatted
+# basis of the element.  If param.ATOM_SCF_CACHE_DIR (environment variable
+# PYSCF_ATOM_SCF_CACHE_DIR) is set, the entries are also pickled to that
+# directory so that they can be shared between processes.  Bump
+# _CACHE_VERSION when the atomic SCF model changes.
+_CACHE_VERSION = 1
+_ATM_SCF_CACHE = {}
+
+def clear_cache(disk=False):
+    '''Remove the cached atomic SCF results from memory.  If disk is True, the
+    cache files in param.ATOM_SCF_CACHE_DIR are removed as well.
+    '''
+    _ATM_SCF_CACHE.clear()
+    cachedir = param.ATOM_SCF_CACHE_DIR
+    if disk and cachedir and os.path.isdir(cachedir):
+        for f in os.listdir(cachedir):
+            if f.startswith('pyscf-atm-scf-') and f.endswith('.pkl'):
+                try:
+                    os.remove(os.path.join(cachedir, f))
+                except OSError:
+                    pass
+
+def _atm_nrhf_with_cache(mol, a, b):
+    key = (_CACHE_VERSION, a, repr(b))
+    if key in _ATM_SCF_CACHE:
+        return _copy_result(_ATM_SCF_CACHE[key])
+
+    cachefile = _cache_file(key)
+    res = None
+    if cachefile is not None and os.path.isfile(cachefile):
+        try:
+            with open(cachefile, 'rb') as f:
+                key1, res = pickle.load(f)
+            if key1 != key:
+                res = None
+        except Exception:
+            res = None
+
+    if res is None:
+        res = _atm_nrhf(mol, a, b)
+        if cachefile is not None:
+            _dump_cache_file(cachefile, key, res)
+    else:
+        logger.debug1(mol, 'Atomic SCF of %s loaded from %s', a, cachefile)
+
+    _ATM_SCF_CACHE[key] = res
+    return _copy_result(res)
+
+def _cache_file(key):
+    cachedir = param.ATOM_SCF_CACHE_DIR
+    if not cachedir:
+        return None
+    h = hashlib.md5(repr(key).encode()).hexdigest()
+    return os.path.join(cachedir, 'pyscf-atm-scf-%s.pkl' % h)
+
+def _copy_result(res):
+    e_hf, mo_energy, mo_coeff, mo_occ = res
+    return e_hf, mo_energy.copy(), mo_coeff.copy(), mo_occ.copy()
+
 class AtomSphericAverageRHF(hf.RHF):
     def __init__(self, mol):
         self._eri = None
@@ -30,25 +30,11 @@ class CDIIS(lib.diis.DIIS):
         self.space = 8
 
     def update(self, s, d, f, *args, **kwargs):
-        if isinstance(f, numpy.ndarray) and f.ndim == 2:
-            sdf = reduce(numpy.dot, (s,d,f))
-            errvec = sdf.T.conj() - sdf
-
-        elif isinstance(f, numpy.ndarray) and f.ndim == 3 and s.ndim == 3:
-            errvec = []
-            for i in range(f.shape[0]):
-                sdf = reduce(numpy.dot, (s[i], d[i], f[i]))
-                errvec.append((sdf.T.conj() - sdf))
-            errvec = numpy.vstack(errvec)
-
-        elif f.ndim == s.ndim+1 and f.shape[0] == 2:  # for UHF
-            nao = s.shape[-1]
-            s = lib.asarray((s,s)).reshape(-1,nao,nao)
-            fnew = self.update(s, d.reshape(s.shape), f.reshape(s.shape))
-            return fnew.reshape(f.shape)
-        else:
-            raise RuntimeError('Unknown SCF DIIS type')
+        errvec = get_err_vec(s, d, f)
         logger.debug1(self, 'diis-norm(errvec)=%g', numpy.linalg.norm(errvec))
+        return self._cdiis_update(f, errvec)
+
+    def _cdiis_update(self, f, errvec):
         xnew = lib.diis.DIIS.update(self, f, xerr=errvec)
         if self.rollback > 0 and len(self._bookkeep) == self.space:
             self._bookkeep = self._bookkeep[-self.rollback:]
@@ -62,31 +48,122 @@ class CDIIS(lib.diis.DIIS):
 
 SCFDIIS = SCF_DIIS = DIIS = CDIIS
 
+def get_err_vec(s, d, f):
+    '''error vector = SDF - FDS'''
+    if isinstance(f, numpy.ndarray) and f.ndim == 2:
+        sdf = reduce(numpy.dot, (s,d,f))
+        errvec = sdf.T.conj() - sdf
+
+    elif isinstance(f, numpy.ndarray) and f.ndim == 3 and s.ndim == 3:
+        errvec = []
+        for i in range(f.shape[0]):
+            sdf = reduce(numpy.dot, (s[i], d[i], f[i]))
+            errvec.append((sdf.T.conj() - sdf))
+        errvec = numpy.vstack(errvec)
+
+    elif f.ndim == s.ndim+1 and f.shape[0] == 2:  # for UHF
+        errvec = numpy.vstack((get_err_vec(s, d[0], f[0]),
+                               get_err_vec(s, d[1], f[1])))
+    else:
+        raise RuntimeError('Unknown SCF DIIS type')
+    return errvec
+
+
+class _EnergyDIIS(CDIIS):
+    '''Abstract base class of the energy-based DIIS (EDIIS, ADIIS) combined
+    with CDIIS.  Subclasses define the model energy _energy and its
+    minimizer _minimize.  This class cannot be instantiated.
+
+    Far from convergence (max error > ediis_threshold) the Fock matrix is
+    interpolated with the coefficients which minimize a model energy of the
+    interpolated density.  Near convergence (max error < cdiis_threshold)
+    CDIIS is used.  In between, the two Fock matrices are mixed linearly in
+    the max error (JCP 137, 054110).  The CDIIS subspace is updated in every
+    iteration so that the switch to CDIIS is smooth.
+
+    Attributes:
+        ediis_threshold : float
+            Above this max(|SDF-FDS|), use the energy-based interpolation only.
+            Default is 0.1
+        cdiis_threshold : float
+            Below this max(|SDF-FDS|), use CDIIS only.  Default is 1e-4
+    '''
+    def __init__(self, mf=None, filename=None):
+        if self.__class__ is _EnergyDIIS:
+            raise TypeError('_EnergyDIIS is an abstract class.  '
+                            'Use EDIIS or ADIIS')
+        CDIIS.__init__(self, mf, filename)
+        self.ediis_threshold = .1
+        self.cdiis_threshold = 1e-4
+        self._dms = []
+        self._focks = []
+        self._etots = []
+        self._df = None
+
+    def update(self, s, d, f, mf=None, h1e=None, vhf=None):
+        errvec = get_err_vec(s, d, f)
+        err = abs(errvec).max()
+        logger.debug1(self, 'diis-norm(errvec)=%g  max(errvec)=%g',
+                      numpy.linalg.norm(errvec), err)
+        f_cdiis = self._cdiis_update(f, errvec)
+        if not self._energy_model_available(mf, f, vhf):
+            return f_cdiis
+
+        self._push(s, d, f, mf, h1e, vhf)
+        if err < self.cdiis_threshold or len(self._dms) < 2:
+            return f_cdiis
+
+        etot, c = self._minimize()
+        logger.debug1(self, '%s E %s  diis-c %s', self.__class__.__name__,
+                      etot, c)
+        f_e = numpy.einsum('i,i...->...', c, numpy.asarray(self._focks))
+        if err > self.ediis_threshold:
+            return f_e
+        else:
+            w = err / self.ediis_threshold
+            return w * f_e + (1-w) * f_cdiis
+
+    def _energy_model_available(self, mf, f, vhf):
+        # ROHF passes the Roothaan effective Fock matrix which does not
+        # correspond to the energy gradients of the total density
+        return (mf is not None and vhf is not None and
+                numpy.asarray(vhf).shape == f.shape)
+
+    def _push(self, s, d, f, mf, h1e, vhf):
+        if len(self._dms) >= self.space:
+            self._dms.pop(0)
+            self._focks.pop(0)
+            self._etots.pop(0)
+            self._df[:-1,:-1] = self._df[1:,1:]
+        d = numpy.asarray(d)
+        self._dms.append(d)
+        self._focks.append(f)
+        self._etots.append(self._energy(d, f, mf, h1e, vhf))
+
+        nx = len(self._dms)
+        if self._df is None:
+            self._df = numpy.zeros((self.space,self.space))
+        # tr(D_i F_j).  For k-points, the energy is the average over k-points
+        nk = s.shape[0] if s.ndim == 3 else 1
+        for i in range(nx):
+            self._df[i,nx-1] = _trace_dot(self._dms[i], f) / nk
+            self._df[nx-1,i] = _trace_dot(d, self._focks[i]) / nk
 
-class EDIIS(lib.diis.DIIS):
-    '''SCF-EDIIS
+def _trace_dot(d, f):
+    return numpy.dot(numpy.asarray(d).ravel(), numpy.asarray(f).ravel().conj()).real
+
+
+class EDIIS(_EnergyDIIS):
+    '''SCF-EDIIS, switching to CDIIS near convergence.  See
+    :class:`_EnergyDIIS` for the attributes.
     Ref: JCP 116, 8255
     '''
-    def update(self, s, d, f, mf, h1e, vhf):
-        if self._head >= self.space:
-            self._head = 0
-        if not self._buffer:
-            shape = (self.space,) + f.shape
-            self._buffer['dm'  ] = numpy.zeros(shape, dtype=f.dtype)
-            self._buffer['fock'] = numpy.zeros(shape, dtype=f.dtype)
-            self._buffer['etot'] = numpy.zeros(self.space)
-        self._buffer['dm'  ][self._head] = d
-        self._buffer['fock'][self._head] = f
-        self._buffer['etot'][self._head] = mf.energy_elec(d, h1e, vhf)[0]
-        self._head += 1
-
-        ds = self._buffer['dm'  ]
-        fs = self._buffer['fock']
-        es = self._buffer['etot']
-        etot, c = ediis_minimize(es, ds, fs)
-        logger.debug1(self, 'E %s  diis-c %s', etot, c)
-        fock = numpy.einsum('i,i...pq->...pq', c, fs)
-        return fock
+    def _energy(self, d, f, mf, h1e, vhf):
+        return mf.energy_elec(d, h1e, vhf)[0]
+
+    def _minimize(self):
+        nx = len(self._dms)
+        return _ediis_minimize(numpy.asarray(self._etots), self._df[:nx,:nx])
 
 def ediis_minimize(es, ds, fs):
     nx = es.size
@@ -94,8 +171,14 @@ def ediis_minimize(es, ds, fs):
     ds = ds.reshape(nx,-1,nao,nao)
     fs = fs.reshape(nx,-1,nao,nao)
     df = numpy.einsum('inpq,jnqp->ij', ds, fs).real
+    return _ediis_minimize(es, df)
+
+def _ediis_minimize(es, df):
+    # E(sum_i c_i D_i) = sum_i c_i E_i - 1/4 sum_ij c_i c_j Tr[(D_i-D_j)(F_i-F_j)]
+    # for E = Tr(hD) + 1/2 Tr(DG[D]) and F = h + G[D]
+    nx = es.size
     diag = df.diagonal()
-    df = diag[:,None] + diag - df - df.T
+    df = (diag[:,None] + diag - df - df.T) * .25
 
     def costf(x):
         c = x**2 / (x**2).sum()
@@ -123,29 +206,21 @@ def ediis_minimize(es, ds, fs):
     return res.fun, (res.x**2)/(res.x**2).sum()
 
 
-class ADIIS(lib.diis.DIIS):
-    '''
+class ADIIS(_EnergyDIIS):
+    '''ADIIS, switching to CDIIS near convergence.  See :class:`_EnergyDIIS`
+    for the attributes.
     Ref: JCP, 132, 054109
     '''
-    def update(self, s, d, f, mf, h1e, vhf):
-        if self._head >= self.space:
-            self._head = 0
-        if not self._buffer:
-            shape = (self.space,) + f.shape
-            self._buffer['dm'  ] = numpy.zeros(shape, dtype=f.dtype)
-            self._buffer['fock'] = numpy.zeros(shape, dtype=f.dtype)
-        self._buffer['dm'  ][self._head] = d
-        self._buffer['fock'][self._head] = f
-
-        ds = self._buffer['dm'  ]
-        fs = self._buffer['fock']
-        fun, c = adiis_minimize(ds, fs, self._head)
+    def _minimize(self):
+        nx = len(self._dms)
+        fun, c = _adiis_minimize(self._df[:nx,:nx], nx-1)
+        return self._etots[-1] + fun, c
+
+    def _energy(self, d, f, mf, h1e, vhf):
         if self.verbose >= logger.DEBUG1:
-            etot = mf.energy_elec(d, h1e, vhf)[0] + fun
-            logger.debug1(self, 'E %s  diis-c %s ', etot, c)
-        fock = numpy.einsum('i,i...pq->...pq', c, fs)
-        self._head += 1
-        return fock
+            return mf.energy_elec(d, h1e, vhf)[0]
+        else:
+            return 0
 
 def adiis_minimize(ds, fs, idnewest):
     nx = ds.shape[0]
@@ -153,21 +228,27 @@ def adiis_minimize(ds, fs, idnewest):
     ds = ds.reshape(nx,-1,nao,nao)
     fs = fs.reshape(nx,-1,nao,nao)
     df = numpy.einsum('inpq,jnqp->ij', ds, fs).real
+    return _adiis_minimize(df, idnewest)
+
+def _adiis_minimize(df, idnewest):
+    # E(D) = E(D_n) + sum_i c_i Tr[(D_i-D_n)F_n]
+    #      + 1/2 sum_ij c_i c_j Tr[(D_i-D_n)(F_j-F_n)]
+    nx = df.shape[0]
     d_fn = df[:,idnewest]
     dn_f = df[idnewest]
     dn_fn = df[idnewest,idnewest]
     dd_fn = d_fn - dn_fn
-    df = df - d_fn[:,None] - dn_f + dn_fn
+    df = (df - d_fn[:,None] - dn_f + dn_fn) * .5
 
     def costf(x):
         c = x**2 / (x**2).sum()
-        return (numpy.einsum('i,i', c, dd_fn) * 2 +
+        return (numpy.einsum('i,i', c, dd_fn) +
                 numpy.einsum('i,ij,j', c, df, c))
 
     def grad(x):
         x2sum = (x**2).sum()
         c = x**2 / x2sum
-        fc = 2*dd_fn
+        fc = dd_fn.copy()
         fc+= numpy.einsum('j,kj->k', c, df)
         fc+= numpy.einsum('i,ik->k', c, df)
         cx = numpy.diag(x*x2sum) - numpy.einsum('k,n->kn', x**2, x)
@@ -186,4 +267,3 @@ def adiis_minimize(ds, fs, idnewest):
     res = scipy.optimize.minimize(costf, numpy.ones(nx), method='BFGS',
                                   jac=grad, tol=1e-9)
     return res.fun, (res.x**2)/(res.x**2).sum()
-
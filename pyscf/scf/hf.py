@@ -109,7 +109,7 @@ Keyword argument "init_dm" is replaced by "dm0"''')
     if isinstance(mf.diis, lib.diis.DIIS):
         mf_diis = mf.diis
     elif mf.diis:
-        mf_diis = diis.SCF_DIIS(mf, mf.diis_file)
+        mf_diis = mf.DIIS(mf, mf.diis_file)
         mf_diis.space = mf.diis_space
         mf_diis.rollback = mf.diis_space_rollback
     else:
@@ -942,13 +942,24 @@ def as_scanner(mf):
     '''Generating a scanner/solver for HF PES.
 
     The returned solver is a function. This function requires one argument
-    "mol" as input and returns total HF energy.
+    "mol" as input and returns total HF energy.  The argument can also be the
+    new geometry (in the format of :attr:`Mole.atom` or an array of atomic
+    coordinates).  The geometry is then applied to the molecule of the last
+    calculation by :meth:`Mole.set_geom_` which avoids the full rebuild of
+    the Mole object if only the coordinates are changed.
 
     The solver will automatically use the results of last calculation as the
     initial guess of the new calculation.  All parameters assigned in the
     SCF object (DIIS, conv_tol, max_memory etc) are automatically applied in
     the solver.
 
+    If the attribute ``extrapolate`` of the solver is set to 'aspc' or
+    'grassmann', the initial guess is extrapolated from the orbitals of the
+    last ``extrapolate_order`` geometries (see :func:`addons.extrapolate_dm`)
+    instead.  The extrapolation assumes equally spaced steps, such as in
+    Born-Oppenheimer MD.  The history is reset when the atoms or the basis
+    change.
+
     Note scanner has side effects.  It may change many underlying objects
     (_scf, with_df, with_x2c, ...) during calculation.
 
@@ -960,13 +971,19 @@ def as_scanner(mf):
         -98.552190448277955
         >>> hf_scanner(gto.M(atom='H 0 0 0; F 0 0 1.5'))
         -98.414750424294368
+        >>> hf_scanner.extrapolate = 'aspc'
     '''
     import copy
     logger.info(mf, 'Create scanner for %s', mf.__class__)
 
     class SCF_Scanner(mf.__class__):
+        extrapolate = None
+        extrapolate_order = 3
+
         def __init__(self, mf_obj):
             self.__dict__.update(mf_obj.__dict__)
+            self._mo_history = []
+            self._keys = self._keys.union(['extrapolate', 'extrapolate_order'])
             mf_obj = self
             # partial deepcopy to avoid overwriting existing object
             while mf_obj is not None:
@@ -983,7 +1000,12 @@ def as_scanner(mf):
                 else:
                     break
 
-        def __call__(self, mol):
+        def __call__(self, mol_or_geom):
+            if isinstance(mol_or_geom, gto.Mole):
+                mol = mol_or_geom
+            else:
+                mol = self.mol.set_geom_(mol_or_geom, inplace=False)
+
             mf_obj = self
             while mf_obj is not None:
                 mf_obj.mol = mol
@@ -1002,17 +1024,48 @@ def as_scanner(mf):
                     mf_obj._dm_last = None
                 mf_obj = getattr(mf_obj, '_scf', None)
 
+            history = [h for h in self._mo_history[:self.extrapolate_order]
+                       if _same_basis(h[0], mol)]
             if self.mo_coeff is None:
                 dm0 = None
-            elif mol.natm > 0:
-                dm0 = self.from_chk(self.chkfile)
-            else:
+            elif mol.natm == 0:
                 dm0 = self.make_rdm1()
+            elif self.extrapolate and len(history) > 1:
+                from pyscf.scf import addons
+                logger.debug(self, 'Extrapolate initial guess (%s) from %d '
+                             'geometries', self.extrapolate, len(history))
+                dm0 = addons.extrapolate_dm(mol, [h[0] for h in history],
+                                            [h[1] for h in history],
+                                            self.extrapolate)
+            else:
+                dm0 = self.from_chk(self.chkfile)
             e_tot = self.kernel(dm0=dm0)
+
+            if self.extrapolate and mol.natm > 0:
+                from pyscf.scf import addons
+                orbs = addons.occupied_orbitals(self)
+                if orbs is None:
+                    self._mo_history = []
+                else:
+                    shapes = [c.shape for c, occ in orbs]
+                    self._mo_history = [(mol, orbs)]
+                    for h in history[:self.extrapolate_order-1]:
+                        if [c.shape for c, occ in h[1]] != shapes:
+                            break
+                        self._mo_history.append(h)
+            else:
+                self._mo_history = []
             return e_tot
 
     return SCF_Scanner(mf)
 
+def _same_basis(mol1, mol2):
+    '''Whether mol1 and mol2 have the same atoms and basis sets'''
+    return (mol1.natm == mol2.natm and mol1.cart == mol2.cart and
+            all(mol1.atom_symbol(i) == mol2.atom_symbol(i)
+                for i in range(mol1.natm)) and
+            mol1._basis == mol2._basis)
+
 ############
 
 
@@ -1038,6 +1091,11 @@ class SCF(lib.StreamObject):
             Default is 'minao'
         diis : boolean or object of DIIS class listed in :mod:`scf.diis`
             Default is :class:`diis.SCF_DIIS`. Set it to None to turn off DIIS.
+        DIIS : DIIS class
+            The class to create the DIIS object if diis is True.  Default is
+            :class:`diis.SCF_DIIS`.  :class:`diis.EDIIS` and
+            :class:`diis.ADIIS` start with the energy-based interpolation and
+            switch to CDIIS near convergence.
         diis_space : int
             DIIS space size.  By default, 8 Fock matrices and errors vector are stored.
         diis_start_cycle : int
@@ -1080,6 +1138,8 @@ class SCF(lib.StreamObject):
     >>> mf.scf()
     -1.0811707843775884
     '''
+    DIIS = diis.SCF_DIIS
+
     def __init__(self, mol):
         if not mol._built:
             sys.stderr.write('Warning: mol.build() is not called in input\n')
@@ -1144,7 +1204,7 @@ class SCF(lib.StreamObject):
             logger.info(self, 'DIIS start cycle = %d', self.diis_start_cycle)
             logger.info(self, 'DIIS space = %d', self.diis.space)
         elif self.diis:
-            logger.info(self, 'DIIS = %s', diis.SCF_DIIS)
+            logger.info(self, 'DIIS = %s', self.DIIS)
             logger.info(self, 'DIIS start cycle = %d', self.diis_start_cycle)
             logger.info(self, 'DIIS space = %d', self.diis_space)
         logger.info(self, 'SCF tol = %g', self.conv_tol)
@@ -1322,9 +1382,10 @@ class SCF(lib.StreamObject):
             intor = 'int2e_cart'
         else:
             intor = 'int2e_sph'
-        opt = _vhf.VHFOpt(mol, intor, 'CVHFnrs8_prescreen',
-                          'CVHFsetnr_direct_scf',
+        opt = _vhf.VHFOpt(mol, intor, 'CVHFnrs8_prescreen', None,
                           'CVHFsetnr_direct_scf_dm')
+        # Schwarz bounds are shared with gradients and Hessian
+        opt.set_q_cond(_vhf.get_q_cond(mol, intor))
         opt.direct_scf_tol = self.direct_scf_tol
         return opt
 
@@ -1407,6 +1468,11 @@ class SCF(lib.StreamObject):
         import pyscf.df.df_jk
         return pyscf.df.df_jk.density_fit(self, auxbasis, with_df)
 
+    def sgx_fit(self, with_df=None):
+        import pyscf.sgx.sgx
+        return pyscf.sgx.sgx.sgx_fit(self, with_df)
+    COSX = sgx_fit
+
     def x2c1e(self):
         import pyscf.scf.x2c
         return pyscf.scf.x2c.sfx2c1e(self)
@@ -45,6 +45,8 @@ def grad_elec(grad_mf, mo_energy=None, mo_coeff=None, mo_occ=None, atmlst=None):
         de[k] += numpy.einsum('xij,ij->x', f1[:,p0:p1], dm0[p0:p1]) * 2
         de[k] += numpy.einsum('xij,ij->x', vrinv, dm0) * 2
         de[k] -= numpy.einsum('xij,ij->x', s1[:,p0:p1], dme0[p0:p1]) * 2
+        if hasattr(vhf, 'aux'):
+            de[k] += vhf.aux[ia]
     log.debug('gradients of electronic part')
     log.debug(str(de))
     return de
@@ -75,22 +77,30 @@ def get_hcore(mol):
 def get_ovlp(mol):
     return -mol.intor('int1e_ipovlp', comp=3)
 
-def get_jk(mol, dm):
+def get_jk(mol, dm, vhfopt=None):
     '''J = ((-nabla i) j| kl) D_lk
     K = ((-nabla i) j| kl) D_jk
+
+    Kwargs:
+        vhfopt : VHFOpt
+            To screen the integrals, see :func:`_vhf.nr_deriv_vhfopt`
     '''
     intor = mol._add_suffix('int2e_ip1')
     vj, vk = _vhf.direct_mapdm(intor,  # (nabla i,j|k,l)
                                's2kl', # ip1_sph has k>=l,
                                ('lk->s1ij', 'jk->s1il'),
                                dm, 3, # xyz, 3 components
-                               mol._atm, mol._bas, mol._env)
+                               mol._atm, mol._bas, mol._env, vhfopt)
     return -vj, -vk
 
 def get_veff(mf_grad, mol, dm):
     '''NR Hartree-Fock Coulomb repulsion'''
     vj, vk = mf_grad.get_jk(mol, dm)
-    return vj - vk * .5
+    vhf = vj - vk * .5
+    if hasattr(vj, 'aux'):
+        # Response of the auxiliary basis in density fitting
+        vhf = lib.tag_array(vhf, aux=vj.aux - vk.aux * .5)
+    return vhf
 
 def make_rdm1e(mo_energy, mo_coeff, mo_occ):
     '''Energy weighted density matrix'''
@@ -104,6 +114,8 @@ def as_scanner(grad_mf):
 
     The returned solver is a function. This function requires one argument
     "mol" as input and returns energy and first order nuclear derivatives.
+    The argument can also be the new geometry of the molecule (see
+    :func:`pyscf.scf.hf.as_scanner`).
 
     The solver will automatically use the results of last calculation as the
     initial guess of the new calculation.  All parameters assigned in the
@@ -126,10 +138,10 @@ def as_scanner(grad_mf):
         def __init__(self, g):
             self.__dict__.update(g.__dict__)
             self._scf = g._scf.as_scanner()
-        def __call__(self, mol):
+        def __call__(self, mol_or_geom):
             mf_scanner = self._scf
-            e_tot = mf_scanner(mol)
-            self.mol = mol
+            e_tot = mf_scanner(mol_or_geom)
+            self.mol = mf_scanner.mol
             de = self.kernel()
             return e_tot, de
     return SCF_GradScanner(grad_mf)
@@ -173,24 +185,57 @@ class Gradients(lib.StreamObject):
         if mol is None: mol = self.mol
         if dm is None: dm = self._scf.make_rdm1()
         cpu0 = (time.clock(), time.time())
-        #TODO: direct_scf opt
-        vj, vk = get_jk(mol, dm)
+        with_df = self._get_df()
+        if with_df is None:
+            vj, vk = get_jk(mol, dm, self.init_direct_scf(mol))
+        else:
+            from pyscf.df import df_grad
+            vj, vk = df_grad.get_jk(with_df, dm, max_memory=self.max_memory)
         logger.timer(self, 'vj and vk', *cpu0)
         return vj, vk
 
     def get_j(self, mol=None, dm=None, hermi=0):
         if mol is None: mol = self.mol
         if dm is None: dm = self._scf.make_rdm1()
+        with_df = self._get_df()
+        if with_df is not None:
+            from pyscf.df import df_grad
+            return df_grad.get_jk(with_df, dm, with_k=False,
+                                  max_memory=self.max_memory)[0]
         intor = mol._add_suffix('int2e_ip1')
         return -_vhf.direct_mapdm(intor, 's2kl', 'lk->s1ij', dm, 3,
-                                  mol._atm, mol._bas, mol._env)
+                                  mol._atm, mol._bas, mol._env,
+                                  self.init_direct_scf(mol))
 
     def get_k(self, mol=None, dm=None, hermi=0):
         if mol is None: mol = self.mol
         if dm is None: dm = self._scf.make_rdm1()
+        with_df = self._get_df()
+        if with_df is not None:
+            from pyscf.df import df_grad
+            return df_grad.get_jk(with_df, dm, with_j=False,
+                                  max_memory=self.max_memory)[1]
         intor = mol._add_suffix('int2e_ip1')
         return -_vhf.direct_mapdm(intor, 's2kl', 'jk->s1il', dm, 3,
-                                  mol._atm, mol._bas, mol._env)
+                                  mol._atm, mol._bas, mol._env,
+                                  self.init_direct_scf(mol))
+
+    def init_direct_scf(self, mol=None):
+        '''Schwarz screening for the derivative integrals.  Screening is
+        enabled if the SCF object enables direct_scf'''
+        if mol is None: mol = self.mol
+        if getattr(self._scf, 'direct_scf', False):
+            return _vhf.nr_deriv_vhfopt(mol, 'int2e_ip1', None,
+                                        self._scf.direct_scf_tol)
+
+    def _get_df(self):
+        '''The density fitting object of the underlying SCF.  If the SCF was
+        solved with density fitting (see :func:`df.df_jk.density_fit`), the
+        gradients of J and K are evaluated with the 3-center integrals'''
+        from pyscf import df
+        with_df = getattr(self._scf, 'with_df', None)
+        if isinstance(with_df, df.DF) and not isinstance(with_df, df.DF4C):
+            return with_df
 
     def get_veff(self, mol=None, dm=None):
         if mol is None: mol = self.mol
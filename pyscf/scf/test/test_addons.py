@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import unittest
+from functools import reduce
 import numpy
 import scipy.linalg
 from pyscf import gto
@@ -20,6 +21,35 @@ mol.build()
 
 
 class KnowValues(unittest.TestCase):
+    def test_aspc_coefficients(self):
+        self.assertTrue(numpy.allclose(scf.addons.aspc_coefficients(1), [1]))
+        self.assertTrue(numpy.allclose(scf.addons.aspc_coefficients(2), [2, -1]))
+        self.assertTrue(numpy.allclose(scf.addons.aspc_coefficients(3),
+                                       [2.5, -2, .5]))
+        self.assertAlmostEqual(scf.addons.aspc_coefficients(6).sum(), 1, 12)
+
+    def test_extrapolate_dm(self):
+        mf = scf.UHF(mol).run()
+        orbs = scf.addons.occupied_orbitals(mf)
+        self.assertEqual([c.shape[1] for c, occ in orbs], [5, 5])
+        dm0 = mf.make_rdm1()
+        for method in ('aspc', 'grassmann'):
+            dm1 = scf.addons.extrapolate_dm(mol, [mol]*3, [orbs]*3, method)
+            self.assertAlmostEqual(abs(dm1-dm0).max(), 0, 9)
+
+        mol1 = mol.set_geom_('O 0 0 .1; H 0 -.757 .587; H 0 .757 .587',
+                             inplace=False)
+        mf1 = scf.RHF(mol1).run()
+        mf = scf.RHF(mol).run()
+        s = mol1.intor('int1e_ovlp')
+        dm = scf.addons.extrapolate_dm(mol1, [mol, mol1],
+                                       [scf.addons.occupied_orbitals(mf1),
+                                        scf.addons.occupied_orbitals(mf)],
+                                       'grassmann')
+        # idempotent
+        self.assertAlmostEqual(abs(reduce(numpy.dot, (dm, s, dm)) - dm*2).max(), 0, 9)
+        self.assertEqual(scf.addons.occupied_orbitals(scf.GHF(mol).run()), None)
+
     def test_project_mo_nr2nr(self):
         nao = mol.nao_nr()
         c = numpy.random.random((nao,nao))
@@ -2,6 +2,7 @@
 
 import unittest
 import numpy
+from pyscf import gto, scf
 from pyscf.scf import diis
 
 class KnowValues(unittest.TestCase):
@@ -11,7 +12,7 @@ class KnowValues(unittest.TestCase):
         fs = numpy.random.random((4,2,2))
         es = numpy.random.random(4)
         v, x = diis.adiis_minimize(ds, fs, -1)
-        self.assertAlmostEqual(v, -0.44797757916272785, 9)
+        self.assertAlmostEqual(v, -0.22398878958136392, 9)
 
     def test_eddis_minimize(self):
         numpy.random.seed(1)
@@ -21,6 +22,42 @@ class KnowValues(unittest.TestCase):
         v, x = diis.ediis_minimize(es, ds, fs)
         self.assertAlmostEqual(v, 0.31551563100606295, 9)
 
+    def test_ediis_model_energy(self):
+        # The EDIIS model energy is exact for HF
+        mol = gto.M(atom='O 0 0 0; H 0 -.757 .587; H 0 .757 .587',
+                    basis='631g', verbose=0)
+        mf = scf.RHF(mol)
+        h1e = mf.get_hcore()
+        dm1 = mf.get_init_guess(key='1e')
+        dm2 = mf.get_init_guess(key='minao')
+        es = []
+        fs = []
+        for dm in (dm1, dm2):
+            vhf = mf.get_veff(mol, dm)
+            es.append(mf.energy_elec(dm, h1e, vhf)[0])
+            fs.append(h1e + vhf)
+        e, c = diis.ediis_minimize(numpy.array(es), numpy.array((dm1,dm2)),
+                                   numpy.array(fs))
+        dm = c[0] * dm1 + c[1] * dm2
+        self.assertAlmostEqual(e, mf.energy_elec(dm)[0], 9)
+
+    def test_scf_ediis(self):
+        mol = gto.M(atom='Fe 0 0 0; O 0 0 1.62', basis='6-31g', spin=4,
+                    verbose=0)
+        for cls in (diis.EDIIS, diis.ADIIS):
+            mf = scf.UHF(mol)
+            mf.init_guess = '1e'
+            mf.DIIS = cls
+            self.assertAlmostEqual(mf.kernel(), -1337.0325574866092, 7)
+
+        mf = scf.ROHF(mol)
+        mf.diis = diis.EDIIS(mf)
+        mf.max_cycle = 5
+        mf.kernel()  # ROHF falls back to CDIIS
+        self.assertEqual(len(mf.diis._dms), 0)
+
+        self.assertRaises(TypeError, diis._EnergyDIIS, mf)
+
 
 if __name__ == "__main__":
     print("Full Tests for DIIS")
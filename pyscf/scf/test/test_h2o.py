@@ -3,6 +3,8 @@
 # Author: Qiming Sun <osirpt.sun@gmail.com>
 #
 
+import os
+import shutil
 import unittest
 import numpy
 import scipy.linalg
@@ -210,6 +212,34 @@ class KnowValues(unittest.TestCase):
         dm = scf.hf.init_guess_by_atom(pmol)
         self.assertAlmostEqual(numpy.linalg.norm(dm), 0.86450726178750226, 8)
 
+    def test_init_guess_atom_cache(self):
+        from pyscf.scf import atom_hf
+        cachedir = tempfile.mkdtemp()
+        cachedir_bak = lib.param.ATOM_SCF_CACHE_DIR
+        try:
+            lib.param.ATOM_SCF_CACHE_DIR = cachedir
+            atom_hf.clear_cache()
+            dm0 = scf.hf.init_guess_by_atom(mol)
+            self.assertEqual(len(atom_hf._ATM_SCF_CACHE), 2)
+            self.assertEqual(len(os.listdir(cachedir)), 2)
+            res = atom_hf.get_atm_nrhf(mol)
+            res['O'][2][:] = 0  # should not change the cache
+            dm1 = scf.hf.init_guess_by_atom(mol)
+            self.assertAlmostEqual(abs(dm0-dm1).max(), 0, 12)
+
+            atom_hf.clear_cache()
+            dm1 = scf.hf.init_guess_by_atom(mol)
+            self.assertAlmostEqual(abs(dm0-dm1).max(), 0, 12)
+
+            pmol = gto.M(atom=mol.atom, basis={'O': '6-31g', 'H': 'sto3g'})
+            scf.hf.init_guess_by_atom(pmol)
+            self.assertEqual(len(atom_hf._ATM_SCF_CACHE), 3)
+            atom_hf.clear_cache(disk=True)
+            self.assertEqual(len(os.listdir(cachedir)), 0)
+        finally:
+            lib.param.ATOM_SCF_CACHE_DIR = cachedir_bak
+            shutil.rmtree(cachedir)
+
     def test_init_guess_1e(self):
         dm = scf.hf.init_guess_by_1e(mol)
         s = scf.hf.get_ovlp(mol)
@@ -292,6 +322,28 @@ class KnowValues(unittest.TestCase):
         self.assertAlmostEqual(mf_scanner(molsym), -76.385043416002361, 9)
         self.assertAlmostEqual(mf_scanner(mol1), -76.372784697245777, 9)
 
+    def test_scanner_extrapolate(self):
+        geoms = ['O 0 0 %f; H 0 -.757 .587; H 0 .757 .587' % (i*.02)
+                 for i in range(5)]
+        for cls in (scf.RHF, scf.UHF):
+            ref = cls(mol).as_scanner()
+            eref = [ref(g) for g in geoms]
+            for method in ('aspc', 'grassmann'):
+                mf_scanner = cls(mol).as_scanner()
+                mf_scanner.extrapolate = method
+                for g, e in zip(geoms, eref):
+                    self.assertAlmostEqual(mf_scanner(g), e, 9)
+                self.assertEqual(len(mf_scanner._mo_history), 3)
+
+        mf_scanner = scf.RHF(mol).as_scanner()
+        mf_scanner.extrapolate = 'aspc'
+        self.assertTrue('extrapolate_order' in mf_scanner._keys)
+        mf_scanner(geoms[0])
+        mf_scanner(geoms[1])
+        pmol = gto.M(atom=geoms[2], basis='sto3g', verbose=0)
+        mf_scanner(pmol)
+        self.assertEqual(len(mf_scanner._mo_history), 1)
+
 
 
 if __name__ == "__main__":
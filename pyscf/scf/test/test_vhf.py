@@ -78,6 +78,45 @@ class KnowValues(unittest.TestCase):
         self.assertTrue(numpy.allclose(vj0,vj1))
         self.assertTrue(numpy.allclose(vk0,vk1))
 
+    def test_q_cond(self):
+        q_cond = _vhf.get_q_cond(mol, 'int2e')
+        self.assertTrue(q_cond is _vhf.get_q_cond(mol, 'int2e_sph'))
+        q_ip = _vhf.get_q_cond(mol, 'int2e_ip1ip2')
+        c_atm = numpy.array(mol._atm, dtype=numpy.int32)
+        c_bas = numpy.array(mol._bas, dtype=numpy.int32)
+        c_env = numpy.array(mol._env)
+        for i, j, k, l in [(0,1,2,3), (4,4,0,5), (7,3,6,1), (5,9,9,5)]:
+            buf = gto.getints_by_shell('int2e_sph', (i,j,i,j),
+                                       c_atm, c_bas, c_env, 1)
+            di, dj = buf.shape[:2]
+            diag = buf.reshape(di*dj,di*dj).diagonal()
+            self.assertAlmostEqual(q_cond[i,j], numpy.sqrt(abs(diag).max()), 12)
+            buf = gto.getints_by_shell('int2e_ip1_sph', (i,j,k,l),
+                                       c_atm, c_bas, c_env, 3)
+            self.assertTrue(abs(buf).max() <= q_ip[i,j]*q_cond[k,l])
+
+        mol1 = mol.copy().set_geom_('O 0 0 0; H 0 -.7 .5; H 0 .7 .5')
+        self.assertTrue(abs(_vhf.get_q_cond(mol1) - q_cond).max() > 1e-3)
+
+    def test_nr_deriv_vhfopt(self):
+        dm = mf.make_rdm1()
+        vj0, vk0 = _vhf.direct_mapdm('int2e_ip1_sph', 's2kl',
+                                     ('lk->s1ij', 'jk->s1il'),
+                                     dm, 3, mol._atm, mol._bas, mol._env)
+        opt = _vhf.nr_deriv_vhfopt(mol, 'int2e_ip1', direct_scf_tol=1e-13)
+        vj1, vk1 = _vhf.direct_mapdm('int2e_ip1_sph', 's2kl',
+                                     ('lk->s1ij', 'jk->s1il'),
+                                     dm, 3, mol._atm, mol._bas, mol._env, opt)
+        self.assertTrue(abs(vj0-vj1).max() < 1e-11)
+        self.assertTrue(abs(vk0-vk1).max() < 1e-11)
+
+        opt = _vhf.nr_deriv_vhfopt(mol, 'int2e_ip1', dm, direct_scf_tol=1e-13)
+        vj1, vk1 = _vhf.direct_bindm('int2e_ip1_sph', 's2kl',
+                                     ('lk->s1ij', 'jk->s1il'), (dm, dm),
+                                     3, mol._atm, mol._bas, mol._env, opt)
+        self.assertTrue(abs(vj0-vj1).max() < 1e-11)
+        self.assertTrue(abs(vk0-vk1).max() < 1e-11)
+
     def test_rdirect_mapdm(self):
         numpy.random.seed(1)
         n2c = nao*2
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+'''
+Non-relativistic unrestricted Hartree-Fock analytical nuclear gradients
+'''
+
+import time
+import numpy
+from pyscf import lib
+from pyscf.lib import logger
+from pyscf.scf import rhf_grad
+
+
+def grad_elec(grad_mf, mo_energy=None, mo_coeff=None, mo_occ=None, atmlst=None):
+    mf = grad_mf._scf
+    mol = grad_mf.mol
+    if mo_energy is None: mo_energy = mf.mo_energy
+    if mo_occ is None:    mo_occ = mf.mo_occ
+    if mo_coeff is None:  mo_coeff = mf.mo_coeff
+    log = logger.Logger(grad_mf.stdout, grad_mf.verbose)
+
+    h1 = grad_mf.get_hcore(mol)
+    s1 = grad_mf.get_ovlp(mol)
+    dm0 = mf.make_rdm1(mo_coeff, mo_occ)
+    dm0t = dm0[0] + dm0[1]
+
+    t0 = (time.clock(), time.time())
+    log.debug('Compute Gradients of NR Hartree-Fock Coulomb repulsion')
+    vhf = grad_mf.get_veff(mol, dm0)
+    log.timer('gradients of 2e part', *t0)
+
+    dme0 = grad_mf.make_rdm1e(mo_energy, mo_coeff, mo_occ)
+
+    if atmlst is None:
+        atmlst = range(mol.natm)
+    offsetdic = mol.offset_nr_by_atom()
+    de = numpy.zeros((len(atmlst),3))
+    for k, ia in enumerate(atmlst):
+        shl0, shl1, p0, p1 = offsetdic[ia]
+# h1, s1, vhf are \nabla <i|h|j>, the nuclear gradients = -\nabla
+        vrinv = grad_mf._grad_rinv(mol, ia)
+        de[k] += numpy.einsum('xij,ij->x', h1[:,p0:p1], dm0t[p0:p1]) * 2
+        de[k] += numpy.einsum('sxij,sij->x', vhf[:,:,p0:p1], dm0[:,p0:p1]) * 2
+        de[k] += numpy.einsum('xij,ij->x', vrinv, dm0t) * 2
+        de[k] -= numpy.einsum('xij,ij->x', s1[:,p0:p1], dme0[p0:p1]) * 2
+        if hasattr(vhf, 'aux'):
+            de[k] += vhf.aux[ia]
+    log.debug('gradients of electronic part')
+    log.debug(str(de))
+    return de
+
+def get_veff(mf_grad, mol, dm):
+    '''NR Hartree-Fock Coulomb repulsion'''
+    vj, vk = mf_grad.get_jk(mol, dm)
+    vhf = vj[0] + vj[1] - vk
+    if hasattr(vj, 'aux'):
+        vhf = lib.tag_array(vhf, aux=vj.aux.sum(axis=(0,1)) - vk.aux.sum(axis=0))
+    return vhf
+
+def make_rdm1e(mo_energy, mo_coeff, mo_occ):
+    '''Energy weighted density matrix'''
+    return (rhf_grad.make_rdm1e(mo_energy[0], mo_coeff[0], mo_occ[0]) +
+            rhf_grad.make_rdm1e(mo_energy[1], mo_coeff[1], mo_occ[1]))
+
+
+class Gradients(rhf_grad.Gradients):
+    '''Non-relativistic unrestricted Hartree-Fock gradients'''
+
+    def get_veff(self, mol=None, dm=None):
+        if mol is None: mol = self.mol
+        if dm is None: dm = self._scf.make_rdm1()
+        return get_veff(self, mol, dm)
+
+    def make_rdm1e(self, mo_energy=None, mo_coeff=None, mo_occ=None):
+        if mo_energy is None: mo_energy = self._scf.mo_energy
+        if mo_coeff is None: mo_coeff = self._scf.mo_coeff
+        if mo_occ is None: mo_occ = self._scf.mo_occ
+        return make_rdm1e(mo_energy, mo_coeff, mo_occ)
+
+    grad_elec = grad_elec
+
+
+if __name__ == '__main__':
+    from pyscf import gto
+    from pyscf import scf
+
+    mol = gto.Mole()
+    mol.atom = [['O', (0., 0., 0.)],
+                [1  , (0., -0.757, 0.587)],
+                [1  , (0., 0.757 , 0.587)] ]
+    mol.basis = '631g'
+    mol.charge = 1
+    mol.spin = 1
+    mol.build()
+    mf = scf.UHF(mol)
+    mf.conv_tol = 1e-14
+    e0 = mf.scf()
+    g = Gradients(mf)
+    print(g.grad())
@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+
+'''
+Seminumerical exchange (chain-of-spheres, COSX)
+===============================================
+
+Simple usage::
+
+    >>> from pyscf import gto, scf, dft, sgx
+    >>> mol = gto.M(atom='N 0 0 0; N 0 0 1', basis='ccpvdz')
+    >>> mf = sgx.sgx_fit(scf.RHF(mol)).run()
+    >>> mf = scf.RHF(mol).COSX().run()
+    >>> mf = dft.RKS(mol).set(xc='b3lyp').COSX().run()
+'''
+
+from . import sgx_jk
+from .sgx import SGX
+
+def sgx_fit(obj, *args, **kwargs):
+    '''Given SCF object, replace the J, K builder by seminumerical exchange.'''
+    return obj.sgx_fit(*args, **kwargs)
+COSX = sgx_fit
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+
+'''
+Pseudo-spectral / seminumerical exchange (COSX) for SCF and hybrid DFT
+'''
+
+import numpy
+from pyscf import lib
+from pyscf.lib import logger
+from pyscf.dft import gen_grid
+from pyscf.sgx import sgx_jk
+
+
+def sgx_fit(mf, with_df=None):
+    '''For the given SCF object, update the J, K matrix constructor with
+    corresponding seminumerical (chain-of-spheres) integrals.
+
+    The SCF iterations are started on the coarse grids (with_df.grids_level_i).
+    When the change of density matrix drops below with_df.grids_switch_thrd,
+    the grids are switched to the fine grids (with_df.grids_level_f).  The
+    final SCF cycles are always carried out on the fine grids.
+
+    Args:
+        mf : an SCF object
+
+    Kwargs:
+        with_df : SGX object
+
+    Returns:
+        An SCF object with a modified J, K matrix constructor which uses
+        seminumerical integrals to compute J and K
+
+    Examples:
+
+    >>> mol = gto.M(atom='H 0 0 0; F 0 0 1', basis='ccpvdz', verbose=0)
+    >>> mf = sgx.sgx_fit(scf.RHF(mol))
+    >>> mf.scf()
+    -100.010061133431
+    '''
+    mf_class = mf.__class__
+    if mf_class.__doc__ is None:
+        doc = ''
+    else:
+        doc = mf_class.__doc__
+
+    if with_df is None:
+        with_df = SGX(mf.mol)
+        with_df.max_memory = mf.max_memory
+        with_df.stdout = mf.stdout
+        with_df.verbose = mf.verbose
+
+    class SGXHF(mf_class):
+        __doc__ = doc + \
+        '''
+        Attributes for seminumerical exchange SCF:
+            with_df : SGX object
+                It holds the mesh grids and the thresholds for SGX integrals.
+        '''
+        def __init__(self):
+            self.__dict__.update(mf.__dict__)
+            self._eri = None
+            self.with_df = with_df
+            # The quality of grids varies during the SCF iterations.  The HF
+            # potential cannot be constructed incrementally.
+            self.direct_scf = False
+            self._last_dm = 0
+            self._in_scf = False
+            self._keys = self._keys.union(['with_df'])
+
+        def dump_flags(self):
+            mf_class.dump_flags(self)
+            if self.with_df:
+                self.with_df.dump_flags()
+            return self
+
+        def scf(self, dm0=None):
+            if not self.with_df:
+                return mf_class.scf(self, dm0)
+
+            with_df = self.with_df
+            with_df.build(level=with_df.grids_level_i)
+            self._in_scf = True
+            self._last_dm = 0
+            try:
+                mf_class.scf(self, dm0)
+            finally:
+                self._in_scf = False
+                self._last_dm = 0
+
+            if with_df.grids_level_f != with_df.grids_level:
+                logger.info(self, 'SGX: SCF converged on coarse grids. '
+                            'Rerun SCF on fine grids (level %d)',
+                            with_df.grids_level_f)
+                with_df.build(level=with_df.grids_level_f)
+                dm0 = self.make_rdm1(self.mo_coeff, self.mo_occ)
+                mf_class.scf(self, dm0)
+            return self.e_tot
+        def kernel(self, dm0=None):
+            return self.scf(dm0)
+        kernel.__doc__ = mf_class.scf.__doc__
+
+        def get_jk(self, mol=None, dm=None, hermi=1):
+            if not self.with_df:
+                return mf_class.get_jk(self, mol, dm, hermi)
+            if dm is None: dm = self.make_rdm1()
+            self._switch_grids(dm)
+            return self.with_df.get_jk(dm, hermi, True, True,
+                                       self.direct_scf_tol)
+
+        def get_j(self, mol=None, dm=None, hermi=1):
+            if not self.with_df:
+                return mf_class.get_j(self, mol, dm, hermi)
+            if dm is None: dm = self.make_rdm1()
+            self._switch_grids(dm)
+            return self.with_df.get_jk(dm, hermi, True, False,
+                                       self.direct_scf_tol)[0]
+
+        def get_k(self, mol=None, dm=None, hermi=1):
+            if not self.with_df:
+                return mf_class.get_k(self, mol, dm, hermi)
+            if dm is None: dm = self.make_rdm1()
+            self._switch_grids(dm)
+            return self.with_df.get_jk(dm, hermi, False, True,
+                                       self.direct_scf_tol)[1]
+
+        def _switch_grids(self, dm):
+            with_df = self.with_df
+            if (self._in_scf and
+                with_df.grids_level != with_df.grids_level_f):
+                if numpy.linalg.norm(dm - self._last_dm) < with_df.grids_switch_thrd:
+                    logger.debug(self, 'SGX: switching to fine grids (level %d)',
+                                 with_df.grids_level_f)
+                    with_df.build(level=with_df.grids_level_f)
+                    self._in_scf = False
+                    self._last_dm = 0
+                else:
+                    self._last_dm = numpy.asarray(dm)
+            elif with_df.grids is None:
+                with_df.build(level=with_df.grids_level_f)
+
+    return SGXHF()
+
+
+class SGX(lib.StreamObject):
+    '''Seminumerical (chain-of-spheres) J, K builder
+
+    Attributes:
+        grids_level_i : int
+            Level of the coarse grids which are used in the early SCF cycles.
+            Default is 0.
+        grids_level_f : int
+            Level of the fine grids which are used in the final SCF cycles.
+            Default is 1.
+        grids_thrd : float
+            Grid points on which the density-matrix contracted AO values are
+            smaller than this threshold are skipped.  Default is 1e-10.
+        grids_switch_thrd : float
+            The SCF switches from the coarse grids to the fine grids when the
+            norm of the density matrix change is less than this threshold.
+            Default is 0.03.
+        blockdim : int
+            Max number of grid points in one block of the integral evaluation.
+    '''
+    def __init__(self, mol):
+        self.mol = mol
+        self.stdout = mol.stdout
+        self.verbose = mol.verbose
+        self.max_memory = mol.max_memory
+        self.grids_level_i = 0
+        self.grids_level_f = 1
+        self.grids_thrd = 1e-10
+        self.grids_switch_thrd = 0.03
+        self.blockdim = 1200
+
+##################################################
+# Following are not input options
+        self.grids = None
+        self._keys = set(self.__dict__.keys())
+
+    def dump_flags(self):
+        log = logger.Logger(self.stdout, self.verbose)
+        log.info('******** %s flags ********', self.__class__)
+        log.info('grids_level_i = %d', self.grids_level_i)
+        log.info('grids_level_f = %d', self.grids_level_f)
+        log.info('grids_thrd = %g', self.grids_thrd)
+        log.info('grids_switch_thrd = %g', self.grids_switch_thrd)
+        log.info('max_memory = %s', self.max_memory)
+        return self
+
+    @property
+    def grids_level(self):
+        '''Level of the grids currently in use'''
+        if self.grids is None:
+            return None
+        else:
+            return self.grids.level
+
+    def build(self, level=None):
+        if level is None:
+            level = self.grids_level_f
+        grids = gen_grid.Grids(self.mol)
+        grids.level = level
+        grids.verbose = self.verbose
+        grids.stdout = self.stdout
+        grids.build(with_non0tab=True)
+        self.grids = grids
+        return self
+
+    def kernel(self, *args, **kwargs):
+        return self.build(*args, **kwargs)
+
+    def reset(self):
+        '''Remove the grids so that they are regenerated for the current
+        geometry at next call'''
+        self.grids = None
+        return self
+
+    def get_jk(self, dm, hermi=1, with_j=True, with_k=True,
+               direct_scf_tol=1e-13):
+        return sgx_jk.get_jk(self, dm, hermi, with_j, with_k, direct_scf_tol)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+r'''
+Seminumerical J and K matrices (the chain-of-spheres approach)
+
+The integral (ij|kl) is evaluated numerically over the second electron
+coordinate and analytically over the first one
+
+    (ij|kl) ~ \sum_g w_g A_{ij}(r_g) phi_k(r_g) phi_l(r_g)
+
+    A_{ij}(r_g) = \int dr phi_i(r) phi_j(r) / |r - r_g|
+
+which reduces the formal cost of exchange from O(N^4) to O(N^2 N_grids).
+
+Ref: F. Neese, F. Wennmohs, A. Hansen, U. Becker, Chem. Phys. 356, 98 (2009)
+'''
+
+import time
+import numpy
+from pyscf import lib
+from pyscf import gto
+from pyscf.lib import logger
+from pyscf.dft.gen_grid import BLKSIZE
+
+
+def get_jk(sgx, dm, hermi=1, with_j=True, with_k=True, direct_scf_tol=1e-13):
+    '''Compute J, K matrices seminumerically on the grids of the SGX object
+
+    Args:
+        sgx : an instance of :class:`SGX`
+            It holds the mesh grids and the screening thresholds.
+        dm : ndarray or list of ndarrays
+            A density matrix or a list of density matrices
+
+    Kwargs:
+        hermi : int
+            Whether J, K matrix is hermitian
+
+            | 0 : no hermitian or symmetric
+            | 1 : hermitian
+            | 2 : anti-hermitian
+
+        direct_scf_tol : float
+            Grid points on which the (weighted) density-matrix contracted AO
+            values are all below this value are skipped.  The larger one of
+            direct_scf_tol and sgx.grids_thrd is used.
+
+    Returns:
+        Depending on the given dm, the function returns one J and one K matrix,
+        or a list of J matrices and a list of K matrices, corresponding to the
+        input density matrices.
+    '''
+    t0 = (time.clock(), time.time())
+    log = logger.new_logger(sgx, sgx.verbose)
+    mol = sgx.mol
+    if sgx.grids is None:
+        sgx.build()
+    grids = sgx.grids
+
+    dms = numpy.asarray(dm)
+    dm_shape = dms.shape
+    nao = dm_shape[-1]
+    dms = dms.reshape(-1,nao,nao)
+    nset = dms.shape[0]
+    vj = numpy.zeros((nset,nao,nao))
+    vk = numpy.zeros((nset,nao,nao))
+
+    if mol.cart:
+        feval = 'GTOval_cart'
+    else:
+        feval = 'GTOval_sph'
+    intor = mol._add_suffix('int3c2e')
+    ao_loc = mol.ao_loc_nr()
+    nbas = mol.nbas
+    gthrd = max(sgx.grids_thrd, direct_scf_tol)
+    non0tab = grids.non0tab
+
+    ngrids = grids.weights.size
+    max_memory = sgx.max_memory - lib.current_memory()[0]
+    # A_{ij}(r_g) of each grid block takes nao**2 words, plus about the same
+    # amount of scratch space for the contractions
+    blksize = int(max_memory*.5e6/8/(nao**2*2+nao*nset*3))
+    blksize = min(ngrids, sgx.blockdim, blksize)
+    blksize = max(BLKSIZE, blksize // BLKSIZE * BLKSIZE)
+
+    ngrids_skip = 0
+    for i0, i1 in lib.prange(0, ngrids, blksize):
+        coords = grids.coords[i0:i1]
+        weights = grids.weights[i0:i1]
+        if non0tab is None:
+            mask = None
+        else:
+            mask = non0tab[i0//BLKSIZE:]
+        ao = mol.eval_gto(feval, coords, non0tab=mask)
+        wao = ao * weights[:,None]
+        # fg[x,g,l] = w_g \sum_s D_{ls} phi_s(r_g)
+        fg = numpy.empty((nset,i1-i0,nao))
+        for i in range(nset):
+            lib.dot(wao, dms[i].T, c=fg[i])
+
+        # Skip the grid points on which the contracted AO values vanish
+        gmask = numpy.zeros(i1-i0, dtype=bool)
+        for i in range(nset):
+            gmask |= numpy.any(abs(fg[i]) > gthrd, axis=1)
+        if not numpy.all(gmask):
+            ngrids_skip += gmask.size - numpy.count_nonzero(gmask)
+            if not numpy.any(gmask):
+                continue
+            ao = ao[gmask]
+            fg = fg[:,gmask]
+            coords = coords[gmask]
+
+        if with_j:
+            ksh0, ksh1 = 0, nbas
+        else:
+            # Only the AO shells which have contributions to fg are needed in
+            # the exchange term.  The shell range for the integrals is the
+            # smallest contiguous range which covers all of them.
+            fmax = abs(fg).max(axis=(0,1))
+            bas_max = numpy.maximum.reduceat(fmax, ao_loc[:-1])
+            idx = numpy.where(bas_max > gthrd)[0]
+            if idx.size == 0:
+                continue
+            ksh0, ksh1 = idx[0], idx[-1] + 1
+        p0, p1 = ao_loc[ksh0], ao_loc[ksh1]
+
+        fakemol = gto.fakemol_for_charges(coords)
+        atm, bas, env = gto.conc_env(mol._atm, mol._bas, mol._env,
+                                     fakemol._atm, fakemol._bas, fakemol._env)
+        shls_slice = (0, nbas, ksh0, ksh1, nbas, nbas+fakemol.nbas)
+        # gbn[g,k,i] = A_{ik}(r_g)
+        gbn = gto.moleintor.getints3c(intor, atm, bas, env, shls_slice)
+        gbn = gbn.transpose(2,1,0)
+
+        if with_j:
+            rhog = numpy.einsum('xgi,gi->xg', fg, ao)
+            vj += lib.dot(rhog, gbn.reshape(-1,nao*nao)).reshape(nset,nao,nao)
+        if with_k:
+            for i in range(nset):
+                gv = numpy.einsum('gk,gki->gi', fg[i,:,p0:p1], gbn)
+                vk[i] += lib.dot(gv.T, ao)
+        gbn = fakemol = None
+
+    log.debug1('SGX: %d grids skipped out of %d', ngrids_skip, ngrids)
+    if with_j:
+        if hermi == 1:
+            vj = (vj + vj.transpose(0,2,1)) * .5
+        vj = vj.reshape(dm_shape)
+    else:
+        vj = None
+    if with_k:
+        if hermi == 1:
+            vk = (vk + vk.transpose(0,2,1)) * .5
+        elif hermi == 2:
+            vk = (vk - vk.transpose(0,2,1)) * .5
+        vk = vk.reshape(dm_shape)
+    else:
+        vk = None
+    log.timer('vj and vk', *t0)
+    return vj, vk
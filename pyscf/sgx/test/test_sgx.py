@@ -0,0 +1,60 @@
+import unittest
+import numpy
+from pyscf import gto
+from pyscf import scf
+from pyscf import dft
+from pyscf import sgx
+
+mol = gto.M(
+    verbose = 5,
+    output = '/dev/null',
+    atom = '''
+        O     0    0        0
+        H     0    -0.757   0.587
+        H     0    0.757    0.587''',
+    basis = 'cc-pvdz',
+)
+
+
+class KnowValues(unittest.TestCase):
+    def test_sgx_jk(self):
+        nao = mol.nao_nr()
+        numpy.random.seed(1)
+        dm = numpy.random.random((2,nao,nao)) - .5
+        dm = dm + dm.transpose(0,2,1)
+        vj0, vk0 = scf.hf.get_jk(mol, dm)
+        sgxobj = sgx.SGX(mol)
+        sgxobj.build(level=3)
+        vj, vk = sgxobj.get_jk(dm)
+        self.assertTrue(abs(vj-vj0).max() < 1e-4)
+        self.assertTrue(abs(vk-vk0).max() < 1e-4)
+
+        vk1 = sgxobj.get_jk(dm, with_j=False)[1]
+        self.assertTrue(abs(vk1-vk).max() < 1e-12)
+
+    def test_rhf(self):
+        e0 = scf.RHF(mol).kernel()
+        mf = sgx.sgx_fit(scf.RHF(mol))
+        e1 = mf.kernel()
+        self.assertTrue(mf.converged)
+        self.assertEqual(mf.with_df.grids_level, mf.with_df.grids_level_f)
+        self.assertAlmostEqual(e1, e0, 3)
+
+    def test_uhf(self):
+        e0 = scf.RHF(mol).kernel()
+        mf = scf.UHF(mol).COSX()
+        self.assertAlmostEqual(mf.kernel(), e0, 3)
+
+    def test_rks_b3lyp(self):
+        mf = dft.RKS(mol)
+        mf.xc = 'b3lyp'
+        e0 = mf.kernel()
+        mf = mf.COSX()
+        mf.with_df.grids_level_i = 1
+        mf.with_df.grids_level_f = 2
+        self.assertAlmostEqual(mf.kernel(), e0, 4)
+
+
+if __name__ == "__main__":
+    print("Full Tests for sgx")
+    unittest.main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+
+'''
+Benchmark suite for the hot kernels
+
+The kernels and their size presets are registered in
+:data:`kernels.KERNELS`.  Each kernel is set up once, run once to warm up,
+then timed ``repeat`` times.  The result records the minimum and median of
+CPU and wall time and the peak resident memory above the baseline, together
+with the git commit, numpy version and thread count, so that results saved
+from different commits can be compared with :func:`compare`.
+
+Command line::
+
+    python -m pyscf.tools.benchmark -s small -o new.json
+    python -m pyscf.tools.benchmark -s small -o new.json --compare old.json
+
+Examples:
+
+>>> from pyscf.tools import benchmark
+>>> res = benchmark.run(['scf.hf.get_jk'], 'small', repeat=3)
+>>> benchmark.save(res, 'bench.json')
+>>> for name, old, new, ratio in benchmark.compare(benchmark.load('ref.json'), res):
+...     print(name, ratio)
+'''
+
+import os
+import sys
+import time
+import json
+import socket
+import platform
+import threading
+import subprocess
+import numpy
+import pyscf
+from pyscf import lib
+from pyscf.lib import logger
+from pyscf.tools.benchmark import systems
+from pyscf.tools.benchmark.kernels import KERNELS
+
+# Regressions are reported when the new timing exceeds the reference by
+# this fraction
+THRESHOLD = .15
+
+class _MemorySampler(threading.Thread):
+    '''Sample the resident memory of the process until stopped'''
+    def __init__(self, interval=.005):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.interval = interval
+        self.base = self.peak = lib.current_memory()[0]
+        self._stop_event = threading.Event()
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, lib.current_memory()[0])
+            self._stop_event.wait(self.interval)
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, lib.current_memory()[0])
+        return self.peak - self.base
+
+def measure(fn, repeat=3, warmup=1):
+    '''Time the function fn without arguments.
+
+    Returns:
+        A dict of the CPU and wall time of each run, their minimum and
+        median, and the peak memory (MB) allocated during the runs.
+    '''
+    for i in range(warmup):
+        fn()
+    cpu = []
+    wall = []
+    sampler = _MemorySampler()
+    sampler.start()
+    try:
+        for i in range(repeat):
+            t0 = (time.clock(), time.time())
+            fn()
+            cpu.append(time.clock() - t0[0])
+            wall.append(time.time() - t0[1])
+    finally:
+        peak_mem = sampler.stop()
+    return {'cpu': cpu, 'wall': wall,
+            'cpu_min': min(cpu), 'cpu_median': float(numpy.median(cpu)),
+            'wall_min': min(wall), 'wall_median': float(numpy.median(wall)),
+            'peak_mem': peak_mem}
+
+def _git_commit():
+    path = os.path.dirname(os.path.dirname(pyscf.__file__))
+    try:
+        with open(os.devnull, 'w') as devnull:
+            out = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                          cwd=path, stderr=devnull)
+        return out.decode().strip()
+    except Exception:
+        return None
+
+def metadata():
+    return {'commit': _git_commit(),
+            'pyscf': pyscf.__version__,
+            'numpy': numpy.__version__,
+            'python': platform.python_version(),
+            'threads': lib.num_threads(),
+            'host': socket.gethostname(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+def run(names=None, size='small', repeat=3, verbose=logger.NOTE,
+        stdout=sys.stdout):
+    '''Run the benchmarks.
+
+    Args:
+        names : list of str
+            Kernels to run, the keys of KERNELS.  Default is all kernels.
+        size : str or dict
+            One of the presets 'small', 'medium', 'large', or a dict which
+            maps kernel names to the keyword arguments of their setup
+            functions.
+
+    Returns:
+        A dict with the metadata and a list of results.
+    '''
+    log = logger.Logger(stdout, verbose)
+    if names is None:
+        names = list(KERNELS.keys())
+    results = []
+    for name in names:
+        if name not in KERNELS:
+            raise KeyError('Unknown benchmark %s.  Available: %s' %
+                           (name, ', '.join(KERNELS)))
+        setup, presets = KERNELS[name]
+        if isinstance(size, dict):
+            params = size.get(name, {})
+        else:
+            params = presets[size]
+        t0 = time.time()
+        try:
+            fn, info = setup(**params)
+            t_setup = time.time() - t0
+            res = measure(fn, repeat)
+        except Exception as err:
+            log.warn('Benchmark %s failed: %s', name, err)
+            results.append({'name': name, 'params': params,
+                            'error': repr(err)})
+            continue
+        res.update({'name': name, 'params': params, 'info': info,
+                    'setup': t_setup})
+        results.append(res)
+        log.note('%-30s wall %9.4f s  cpu %9.4f s  mem %8.1f MB  %s',
+                 name, res['wall_min'], res['cpu_min'], res['peak_mem'],
+                 ' '.join('%s=%s' % x for x in sorted(info.items())))
+    return {'metadata': metadata(), 'results': results}
+
+def _to_json(obj):
+    if isinstance(obj, numpy.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, numpy.generic):
+        return obj.item()
+    raise TypeError('%s is not JSON serializable' % type(obj))
+
+def save(results, filename):
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=1, sort_keys=True, default=_to_json)
+
+def load(filename):
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+def _key(res):
+    return res['name'], json.dumps(res['params'], sort_keys=True)
+
+def compare(ref, new, threshold=THRESHOLD, key='wall_min'):
+    '''Compare two sets of benchmark results.
+
+    Returns:
+        A list of (name, ref_time, new_time, ratio) for the benchmarks which
+        are slower than the reference by more than the threshold.  Only
+        benchmarks with the same name and parameters are compared.
+    '''
+    ref_tab = dict((_key(res), res) for res in ref['results'])
+    regressions = []
+    for res in new['results']:
+        r = ref_tab.get(_key(res))
+        if r is None or key not in r or key not in res or r[key] <= 0:
+            continue
+        ratio = res[key] / r[key]
+        if ratio > 1 + threshold:
+            regressions.append((res['name'], r[key], res[key], ratio))
+    return regressions
+
+def report(ref, new, key='wall_min', stdout=sys.stdout):
+    '''Print the timings of new against ref side by side'''
+    ref_tab = dict((_key(res), res) for res in ref['results'])
+    stdout.write('%-30s %12s %12s %8s\n' % ('kernel', 'ref', 'new', 'ratio'))
+    for res in new['results']:
+        r = ref_tab.get(_key(res))
+        if key not in res:
+            stdout.write('%-30s %12s %12s %8s\n' % (res['name'], '-', 'failed', '-'))
+        elif r is None or key not in r:
+            stdout.write('%-30s %12s %12.4f %8s\n' %
+                         (res['name'], '-', res[key], '-'))
+        else:
+            stdout.write('%-30s %12.4f %12.4f %8.3f\n' %
+                         (res['name'], r[key], res[key],
+                          res[key] / max(r[key], 1e-9)))
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+
+'''
+Run the benchmark suite from the command line.  The exit status is 1 if any
+benchmark failed or regressed against the --compare reference.
+'''
+
+import sys
+import argparse
+from pyscf.tools import benchmark
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pyscf.tools.benchmark')
+    parser.add_argument('-k', '--kernel', action='append', dest='names',
+                        help='Kernel to run (repeatable).  Default is all of '
+                        + ', '.join(benchmark.KERNELS))
+    parser.add_argument('-s', '--size', default='small',
+                        choices=('small', 'medium', 'large'))
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', help='Save results to JSON file')
+    parser.add_argument('--compare', metavar='REF',
+                        help='Compare against the results in JSON file REF')
+    parser.add_argument('--threshold', type=float, default=benchmark.THRESHOLD)
+    args = parser.parse_args(argv)
+
+    res = benchmark.run(args.names, args.size, args.repeat)
+    if args.output:
+        benchmark.save(res, args.output)
+
+    status = 0
+    if args.compare:
+        ref = benchmark.load(args.compare)
+        benchmark.report(ref, res)
+        regressions = benchmark.compare(ref, res, args.threshold)
+        for name, t_ref, t_new, ratio in regressions:
+            sys.stdout.write('Regression %s: %.4f s -> %.4f s (x%.2f)\n' %
+                             (name, t_ref, t_new, ratio))
+        if regressions:
+            status = 1
+    for r in res['results']:
+        if 'error' in r:
+            sys.stdout.write('Failed %s: %s\n' % (r['name'], r['error']))
+            status = 1
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
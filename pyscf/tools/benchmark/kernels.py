@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+
+'''
+Hot kernels covered by the benchmark suite.
+
+Each entry of KERNELS maps a name to a setup function and a dict of size
+presets.  The setup function takes the keyword arguments of one preset and
+returns (run, info): a callable without arguments which executes the kernel
+once, and a dict describing the problem size.  Everything which is not part
+of the kernel (building molecules, SCF, integral files) is done in setup.
+'''
+
+import tempfile
+import collections
+import numpy
+from pyscf.tools.benchmark import systems
+
+def _random_dm(nao, seed=1):
+    numpy.random.seed(seed)
+    c = numpy.random.random((nao,nao)) - .5
+    return numpy.dot(c, c.T) / nao
+
+def _tmpfile():
+    from pyscf import lib
+    ftmp = tempfile.NamedTemporaryFile(dir=lib.param.TMPDIR)
+    return ftmp
+
+def get_jk(nwater=2, basis='6-31g'):
+    from pyscf import scf
+    mol = systems.water_cluster(nwater, basis)
+    dm = _random_dm(mol.nao_nr())
+    def run():
+        return scf.hf.get_jk(mol, dm)
+    return run, {'natm': mol.natm, 'nao': mol.nao_nr()}
+
+def nr_rks(nwater=2, basis='6-31g', xc='b3lyp', grids_level=3):
+    from pyscf import dft
+    mol = systems.water_cluster(nwater, basis)
+    grids = dft.gen_grid.Grids(mol)
+    grids.level = grids_level
+    grids.build()
+    ni = dft.numint._NumInt()
+    dm = _random_dm(mol.nao_nr())
+    def run():
+        return ni.nr_rks(mol, grids, xc, dm)
+    return run, {'natm': mol.natm, 'nao': mol.nao_nr(),
+                 'ngrids': grids.weights.size}
+
+def ao2mo_outcore(nwater=2, basis='6-31g', max_memory=2000):
+    from pyscf import ao2mo
+    mol = systems.water_cluster(nwater, basis)
+    nao = mol.nao_nr()
+    numpy.random.seed(2)
+    mo = numpy.random.random((nao,nao))
+    ftmp = _tmpfile()
+    def run():
+        ao2mo.outcore.general(mol, (mo,)*4, ftmp.name, max_memory=max_memory,
+                              verbose=0)
+    return run, {'natm': mol.natm, 'nao': nao}
+
+def cholesky_eri(nwater=2, basis='6-31g', auxbasis='weigend'):
+    from pyscf.df import outcore
+    mol = systems.water_cluster(nwater, basis)
+    ftmp = _tmpfile()
+    def run():
+        outcore.cholesky_eri(mol, ftmp.name, auxbasis=auxbasis, verbose=0)
+    return run, {'natm': mol.natm, 'nao': mol.nao_nr()}
+
+def ccsd_update_amps(nwater=1, basis='6-31g'):
+    from pyscf import scf, cc
+    mol = systems.water_cluster(nwater, basis)
+    mf = scf.RHF(mol)
+    mf.conv_tol = 1e-8
+    mf.kernel()
+    mycc = cc.ccsd.CCSD(mf)
+    eris = mycc.ao2mo()
+    emp2, t1, t2 = mycc.init_amps(eris)
+    def run():
+        return cc.ccsd.update_amps(mycc, t1, t2, eris)
+    return run, {'natm': mol.natm, 'nocc': t1.shape[0], 'nvir': t1.shape[1]}
+
+def fci_contract_2e(norb=8, nelec=8):
+    from pyscf import fci
+    from pyscf import ao2mo
+    numpy.random.seed(3)
+    h1e = numpy.random.random((norb,norb))
+    h1e = h1e + h1e.T
+    eri = numpy.random.random((norb,)*4)
+    eri = eri + eri.transpose(1,0,2,3)
+    eri = eri + eri.transpose(0,1,3,2)
+    eri = eri + eri.transpose(2,3,0,1)
+    eri = ao2mo.restore(8, eri, norb)
+    neleca = nelec // 2
+    nelecb = nelec - neleca
+    na = fci.cistring.num_strings(norb, neleca)
+    nb = fci.cistring.num_strings(norb, nelecb)
+    h2e = fci.direct_spin1.absorb_h1e(h1e, eri, norb, (neleca,nelecb), .5)
+    link_index = (fci.cistring.gen_linkstr_index(range(norb), neleca),
+                  fci.cistring.gen_linkstr_index(range(norb), nelecb))
+    ci0 = numpy.random.random((na,nb))
+    def run():
+        return fci.direct_spin1.contract_2e(h2e, ci0, norb, (neleca,nelecb),
+                                            link_index)
+    return run, {'norb': norb, 'nelec': nelec, 'ndet': na*nb}
+
+def pbc_get_k_kpts(gs=5, nk=2, basis='gth-szv'):
+    from pyscf.pbc import df
+    from pyscf.pbc.df import fft_jk
+    cell = systems.diamond(gs, basis)
+    kpts = cell.make_kpts([nk,1,1])
+    nao = cell.nao_nr()
+    numpy.random.seed(4)
+    dm = numpy.random.random((len(kpts),nao,nao)) - .5
+    dm = dm + dm.transpose(0,2,1)
+    mydf = df.FFTDF(cell)
+    def run():
+        return fft_jk.get_k_kpts(mydf, dm, 1, kpts)
+    return run, {'nao': nao, 'nkpts': len(kpts), 'ngs': cell.gs[0]*2+1}
+
+KERNELS = collections.OrderedDict((
+    ('scf.hf.get_jk', (get_jk, {
+        'small' : {'nwater': 2},
+        'medium': {'nwater': 4, 'basis': 'cc-pvdz'},
+        'large' : {'nwater': 8, 'basis': 'cc-pvdz'}})),
+    ('dft.numint.nr_rks', (nr_rks, {
+        'small' : {'nwater': 2, 'grids_level': 1},
+        'medium': {'nwater': 4, 'basis': 'cc-pvdz'},
+        'large' : {'nwater': 8, 'basis': 'cc-pvdz'}})),
+    ('ao2mo.outcore.general', (ao2mo_outcore, {
+        'small' : {'nwater': 2},
+        'medium': {'nwater': 3, 'basis': 'cc-pvdz'},
+        'large' : {'nwater': 5, 'basis': 'cc-pvdz'}})),
+    ('df.outcore.cholesky_eri', (cholesky_eri, {
+        'small' : {'nwater': 2},
+        'medium': {'nwater': 4, 'basis': 'cc-pvdz'},
+        'large' : {'nwater': 8, 'basis': 'cc-pvdz'}})),
+    ('cc.ccsd.update_amps', (ccsd_update_amps, {
+        'small' : {'nwater': 1},
+        'medium': {'nwater': 2, 'basis': 'cc-pvdz'},
+        'large' : {'nwater': 3, 'basis': 'cc-pvdz'}})),
+    ('fci.direct_spin1.contract_2e', (fci_contract_2e, {
+        'small' : {'norb': 8, 'nelec': 8},
+        'medium': {'norb': 12, 'nelec': 12},
+        'large' : {'norb': 14, 'nelec': 14}})),
+    ('pbc.df.fft_jk.get_k_kpts', (pbc_get_k_kpts, {
+        'small' : {'gs': 4, 'nk': 2},
+        'medium': {'gs': 8, 'nk': 3},
+        'large' : {'gs': 12, 'nk': 4}})),
+))
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+
+'''
+Parameterised molecules and crystals for the benchmarks
+'''
+
+import numpy
+from pyscf import gto
+
+def water_cluster(n, basis='6-31g', spacing=3.0, **kwargs):
+    '''n water molecules on a cubic lattice with the given spacing (Angstrom)'''
+    nside = int(numpy.ceil(n**(1./3) - 1e-9))
+    atoms = []
+    for i in range(n):
+        x, y, z = numpy.unravel_index(i, (nside,)*3)
+        r0 = numpy.array((x, y, z)) * spacing
+        atoms.append(('O', r0))
+        atoms.append(('H', r0 + (0., -0.757, 0.587)))
+        atoms.append(('H', r0 + (0.,  0.757, 0.587)))
+    kwargs.setdefault('verbose', 0)
+    return gto.M(atom=atoms, basis=basis, **kwargs)
+
+def diamond(gs=5, basis='gth-szv', pseudo='gth-pade', **kwargs):
+    '''Primitive cell of diamond.  The FFT mesh has 2*gs+1 points in each
+    direction.'''
+    from pyscf.pbc import gto as pbcgto
+    a = 3.5668
+    cell = pbcgto.Cell()
+    cell.a = numpy.array(((0., .5, .5), (.5, 0., .5), (.5, .5, 0.))) * a
+    cell.atom = [('C', (0., 0., 0.)), ('C', (a/4, a/4, a/4))]
+    cell.basis = basis
+    cell.pseudo = pseudo
+    cell.gs = [gs] * 3
+    cell.verbose = kwargs.pop('verbose', 0)
+    for key, val in kwargs.items():
+        setattr(cell, key, val)
+    cell.build()
+    return cell
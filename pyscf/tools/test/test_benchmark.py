@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+import unittest
+import tempfile
+from pyscf.tools import benchmark
+
+class KnowValues(unittest.TestCase):
+    def test_systems(self):
+        mol = benchmark.systems.water_cluster(3)
+        self.assertEqual(mol.natm, 9)
+        self.assertEqual(mol.nelectron, 30)
+
+    def test_run_compare(self):
+        size = {'fci.direct_spin1.contract_2e': {'norb': 6, 'nelec': 6},
+                'scf.hf.get_jk': {'nwater': 1, 'basis': 'sto-3g'}}
+        names = ['fci.direct_spin1.contract_2e', 'scf.hf.get_jk']
+        res = benchmark.run(names, size, repeat=2, verbose=0)
+        self.assertEqual(len(res['results']), 2)
+        self.assertEqual(res['results'][0]['info']['ndet'], 400)
+        self.assertEqual(len(res['results'][1]['wall']), 2)
+
+        ftmp = tempfile.NamedTemporaryFile(suffix='.json')
+        benchmark.save(res, ftmp.name)
+        ref = benchmark.load(ftmp.name)
+        self.assertEqual(ref['metadata']['pyscf'], res['metadata']['pyscf'])
+        self.assertEqual(benchmark.compare(ref, res), [])
+
+        ref['results'][1]['wall_min'] *= .5
+        regressions = benchmark.compare(ref, res)
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(regressions[0][0], 'scf.hf.get_jk')
+        self.assertAlmostEqual(regressions[0][3], 2, 9)
+
+        self.assertRaises(KeyError, benchmark.run, ['nonexist'])
+
+    def test_main_exit_status(self):
+        from pyscf.tools.benchmark import __main__
+        def setup():
+            raise RuntimeError
+        benchmark.KERNELS['fail'] = (setup, {'small': {}})
+        try:
+            ftmp = tempfile.NamedTemporaryFile(suffix='.json')
+            argv = ['-k', 'fci.direct_spin1.contract_2e', '-r', '1']
+            self.assertEqual(__main__.main(argv + ['-o', ftmp.name]), 0)
+            self.assertEqual(__main__.main(argv + ['--compare', ftmp.name]), 0)
+            argv += ['-k', 'fail']
+            self.assertEqual(__main__.main(argv), 1)
+            self.assertEqual(__main__.main(argv + ['--compare', ftmp.name]), 1)
+        finally:
+            del(benchmark.KERNELS['fail'])
+
+if __name__ == "__main__":
+    print("Full Tests for benchmark")
+    unittest.main()